@@ -15,3 +15,11 @@ def language_list(request):
         'language_choices': settings.LANGUAGE_CHOICES,
         'current_path': request.get_full_path(),
     }
+
+def notification_count(request):
+    if not request.user.is_authenticated:
+        return {}
+
+    return {
+        'notification_count': request.user.get_notification_count(),
+    }
@@ -74,6 +74,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.language_list',
+                'core.context_processors.notification_count',
             ],
         },
     },
@@ -113,7 +114,12 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'dashboard.tasks.updateDashboardTasksStats',
         'schedule': crontab(minute=0, hour='*/1'),
         'args': (),
-    }
+    },
+    'refresh-question-analytics': {
+        'task': 'dashboard.tasks.refreshQuestionAnalytics',
+        'schedule': crontab(minute=30, hour='*/1'),
+        'args': (),
+    },
 }
 
 # Custom Auth System settings
@@ -185,6 +191,9 @@ LANGUAGES = [
 #
 # TODO: move this elsewhere to make it database-based
 # and easily updatable
+#
+# Each language has its own partial search index on Question, so adding
+# a language needs a new migration (run makemigrations dashboard).
 CONTENT_LANGUAGES = [
     ('bn', 'বাংলা'),
     ('en', 'English'),
@@ -1,4 +1,4 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.contenttypes.models import ContentType
 from django.shortcuts import redirect
 from django.urls import reverse
@@ -6,6 +6,7 @@ from django.utils.http import urlencode
 from django.utils.translation import gettext as _
 
 from .models import (
+    QuestionArchive,
     Question,
     Answer,
     Article,
@@ -17,6 +18,7 @@ from .models import (
     AnswerTranslationCredit,
     ArticleTranslationCredit,
 )
+from .analytics import queue_question_analytics_refresh
 
 
 def make_bulk_updater(field_name):
@@ -54,6 +56,16 @@ def publish_status(obj):
 publish_status.short_description = 'Publish Status'
 
 
+def accept_questions(modeladmin, request, queryset):
+    accepted = queryset.accept(request.user)
+    queue_question_analytics_refresh()
+    modeladmin.message_user(request,
+        _('%s questions accepted.') % accepted,
+        messages.SUCCESS)
+
+accept_questions.short_description = _('Accept selected questions')
+
+
 class AnswerCreditInline(admin.TabularInline):
     model = AnswerCredit
     view_on_site = False
@@ -160,6 +172,17 @@ class QuestionAdmin(admin.ModelAdmin):
     change_context = make_bulk_updater('context')
     change_contributor_role = make_bulk_updater('contributor_role')
 
+@admin.register(QuestionArchive)
+class QuestionArchiveAdmin(admin.ModelAdmin):
+    search_fields = ['id', 'question_text', 'question_text_english']
+    list_filter = ['language', 'contributor_role', 'submitted_by']
+    list_display = ['id', 'question_text', 'question_text_english', 'language', 'submitted_by', 'created_on']
+    date_hierarchy = 'created_on'
+
+    actions = [
+        accept_questions,
+    ]
+
 @admin.register(Article)
 class ArticleAdmin(admin.ModelAdmin):
     search_fields = ['title', 'body']
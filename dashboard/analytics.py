@@ -0,0 +1,534 @@
+"""
+Question counts for the analytics page.
+
+The counts of every dimension (language, gender, year asked, state, ...)
+are kept in the question_analytics materialized view (see migration
+0047), computed by one pass over the question table and refreshed by the
+refreshQuestionAnalytics Celery task. The page reads the whole view, a
+few hundred rows, instead of counting the questions on each request.
+
+Computed analytics can be cached under the question data version, a
+database sequence that is bumped by a trigger whenever the analytics
+fields of questions change (see migration 0049) and on every refresh of
+the view. The context of the analytics page is cached that way, per
+language as its labels are translated (see get_analytics_page_context).
+
+The analytics API (get_question_cube) answers arbitrary group-by and
+filter combinations instead. It keeps the categorical columns of all
+questions in memory as a pandas frame with category columns (one small
+integer code per value) and counts with NumPy. The frame is kept per
+process and brought up to date from updated_on at most every
+CUBE_MAX_AGE seconds, so most requests don't touch the database. Deleted
+questions leave no updated_on behind, so the frame is rebuilt whenever
+the question delete version, bumped by a trigger on every delete (see
+migration 0050), has changed.
+"""
+
+import collections
+import json
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from kombu.exceptions import OperationalError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.translation import gettext as _
+from django.utils.translation import get_language, override as translation_override
+
+from dashboard.models import Question
+from public_website.lang import language_name
+
+logger = logging.getLogger(__name__)
+
+# Question fields that analytics can be grouped and filtered by, plus
+# year_asked, the year of question_asked_on
+CUBE_FIELDS = [
+    'language',
+    'student_gender',
+    'field_of_interest',
+    'state',
+    'curriculum_followed',
+    'medium_language',
+    'student_class',
+    'question_format',
+    'context',
+    'year_asked',
+]
+
+# Seconds between checks for changed questions
+CUBE_MAX_AGE = 60
+# Seconds between full rebuilds, which also catch questions changed by
+# queryset updates (these don't set updated_on)
+CUBE_REBUILD_AGE = 60 * 60
+
+
+class QuestionAnalytics:
+    """Question counts per value of each analytics dimension"""
+
+    def __init__(self, rows):
+        # dimension -> {(value, value2): number of questions}
+        self.counts = {}
+        for dimension, value, value2, count in rows:
+            self.counts.setdefault(dimension, {})[(value, value2)] = count
+
+    def get_count(self, dimension, value='', value2=''):
+        """Return the number of questions with the given value(s)"""
+
+        return self.counts.get(dimension, {}).get((value, value2), 0)
+
+    def get_values(self, dimension):
+        """
+        Return the values of a single dimension with their counts, as
+        [{dimension: value, 'count': count}, ...]
+        """
+
+        return [
+            {dimension: value, 'count': count}
+            for (value, value2), count in sorted(self.counts.get(dimension, {}).items())
+        ]
+
+    @property
+    def total(self):
+        return self.get_count('total')
+
+
+def get_question_analytics():
+    """Return the question counts of the last refresh"""
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT dimension, value, value2, count FROM question_analytics')
+        return QuestionAnalytics(cursor.fetchall())
+
+
+def refresh_question_analytics():
+    """Recount the questions; readers are not blocked meanwhile"""
+
+    with connection.cursor() as cursor:
+        cursor.execute('REFRESH MATERIALIZED VIEW CONCURRENTLY question_analytics')
+        cursor.execute("SELECT nextval('question_data_version')")
+
+
+def queue_question_analytics_refresh():
+    """
+    Refresh the question analytics in the background once the current
+    transaction commits, or right away if the task can't be queued,
+    e.g. as the broker is down
+    """
+
+    # imported here, as dashboard.tasks imports this module
+    from dashboard.tasks import refreshQuestionAnalytics
+
+    def queue():
+        try:
+            refreshQuestionAnalytics.delay()
+        except OperationalError:
+            logger.exception('Could not queue the analytics refresh, refreshing now')
+            refresh_question_analytics()
+
+    transaction.on_commit(queue)
+
+
+def get_sequence_version(sequence):
+    """Return the last value of a version sequence, 0 if it is unused"""
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT last_value, is_called FROM ' + sequence)
+        last_value, is_called = cursor.fetchone()
+        return last_value if is_called else 0
+
+
+def get_question_data_version():
+    """Return a number that changes whenever the question analytics do"""
+
+    return get_sequence_version('question_data_version')
+
+
+def get_question_delete_version():
+    """Return a number that changes whenever questions are deleted"""
+
+    return get_sequence_version('question_delete_version')
+
+
+class AnalyticsPageContext:
+    """The charts of the analytics page, from the question counts"""
+
+    #Dictionary to hold {state_name:state_ISO_code}
+    state_code = {'lakshadweep': 'LD', 'andaman and nicobar islands': 'AN', 'andaman & nicobar': 'AN', 'maharashtra': 'MH', 
+                'andhra pradesh': 'AP', 'meghalaya': 'ML', 'arunachal pradesh': 'AR', 'manipur': 'MN', 'assam': 'AS', 
+                'madhya pradesh': 'MP', 'bihar': 'BR', 'mizoram': 'MZ', 'chandigarh': 'CH', 'nagaland': 'NL', 
+                'chhattisgarh': 'CT', 'odisha': 'OR', 'daman and diu': 'DD', 'punjab': 'PB', 'delhi': 'DL', 
+                'puducherry': 'PY', 'dadra and nagar haveli': 'DN', 'rajasthan': 'RJ', 'goa': 'GA', 'sikkim': 'SK', 
+                'gujarat': 'GJ', 'telangana': 'TG', 'himachal pradesh': 'HP', 'tamil nadu': 'TN', 'haryana': 'HR', 
+                'tripura': 'TR', 'jharkhand': 'JH', 'uttar pradesh': 'UP', 'jammu and kashmir': 'JK', 'jammu & kashmir': 'JK', 'uttarakhand': 'UT', 
+                'karnataka': 'KA', 'west bengal': 'WB', 'kerala': 'KL'}
+
+    def __init__(self, analytics):
+        self.analytics = analytics
+
+    def get_context(self):
+        # Translators: For all the language names in the database we need tranlation 
+        # Each function getABC() returns the data for the ABC which is then added to context.
+
+        year_labels, year_counts = self.getYearAsked()
+        lang_names, lang_counts = self.getQuestionLanguages()
+        gender_labels, gender_counts = self.getGenderStat()
+        mlang_names, mlang_counts = self.getMediumLanguage()
+        class_labels, class_counts = self.getStudentClassStat()
+        # Stats for doughnut charts
+        format_labels, format_counts = self.getQuestionFormatStats()
+        curriculum_labels, curriculum_counts = self.getCurriculumStats()
+        context_labels, context_counts = self.getContextStats()
+        states, codes, counts = self.getMapStats()
+
+        return {"page_title": _('Analytics'), 
+            "question_counter": self.getQuestionCount(),
+            "lang_names" : self.fix(lang_names, apply_ = True),
+            "lang_counts" : self.fix(lang_counts),
+            "year_labels" : self.fix(year_labels, apply_ = True),
+            "year_counts" : self.fix(year_counts),
+            "gender_counts" : self.fix(gender_counts),
+            "gender_labels" : self.fix(gender_labels, apply_ = True),
+            "mlang_names" : self.fix(mlang_names, apply_ = True),
+            "mlang_counts" : self.fix(mlang_counts),
+            "class_labels" : self.fix(map(str, class_labels), apply_ = True),
+            "class_counts" : self.fix(class_counts),
+            "format_labels" : self.fix(format_labels, apply_ = True),
+            "format_counts" : self.fix(format_counts),
+            "curriculum_labels" : self.fix(curriculum_labels, apply_ = True),
+            "curriculum_counts" : self.fix(curriculum_counts),
+            "context_labels" : self.fix(context_labels, apply_ = True),
+            "context_counts" : self.fix(context_counts),
+            "state_names" : self.fix(states, apply_ = True),
+            "state_codes" : self.fix(codes),
+            "state_counts" : self.fix(counts),
+            "languageGenderDictionary": self.getLanguageGenderDictionary(),
+            "genderSubjectDictionary": self.getGenderSubjectDictionary(),
+            }
+
+
+    def getQuestionCount(self, params = None):
+        return self.analytics.total
+
+
+    def getQuestionLanguages(self, params=None):
+        distinct = self.analytics.get_values('language')
+        lang_names = []         # list to hold the name of the language
+        lang_counts = []        # list to hold the count of question for the language corresponding to name in lang_names 
+        for lang in distinct:
+            lang_code = lang['language']
+            if lang_code in language_name:
+                lang_name = language_name[lang_code]
+            else:
+                lang_name = lang_code
+
+            if lang_name in lang_names:
+                # if the language name is twice in the list for any reason then reject it. (Workaround)
+                # Note: This is caused due to nonuniform labelling of languages in Database. 
+                continue
+
+            lang_names.append(lang_name)
+            lang_counts.append(lang['count'])
+
+        return lang_names, lang_counts
+
+
+    def getYearAsked(self, params = None):
+        distinct = self.analytics.get_values('year_asked')
+        year_tuples = [(int(tple['year_asked']) if tple['year_asked'] else None, tple['count']) for tple in distinct ]
+        year_dict = {}
+        for year, count in year_tuples:
+            if year is None:  #Some tuples might be None due to null value in database
+                continue
+            if year not in year_dict:
+                year_dict[year] = count
+            else:
+                year_dict[year] += count
+        # Now we shall generate the lists of year labels and counts
+        year_label, year_count = [], []
+        ordered_tuples = collections.OrderedDict(sorted(year_dict.items()))
+        year_labels = list(map(str, ordered_tuples.keys()))
+        year_counts = list(ordered_tuples.values())
+        return year_labels, year_counts
+
+
+    def getGenderStat(self, params = None):
+        gender_list = ["Male", "Female", "Non-binary", ""]
+        gender_data = []
+        for gender in gender_list:
+                gender_data.append(self.analytics.get_count('student_gender', gender))
+        return ["Male", "Female", "Non-binary", "Not known"], gender_data
+
+    def getGenderSubjectDictionary(self, params= None):
+        gender_list = ["Male", "Female", "Non-binary", ""]
+        # following list is used due to inconsistent naming in database for history, philosophy and practice of science
+        history_and_philosophy = [
+                'History-Philosophy and Practice of Science', 
+                'History - Philosophy and Practice of Science', 
+                'History - Philosophy & Practice of Science', 
+                'History, Philosophy & Practice of Science'
+        ]
+
+        #dictionary to hold name of the subject as the key, and all its aliases in the database in a list as the value
+        non_stems_subjects = {
+                'Humans & Society': ['Humans & Society'], 
+                'Geography & History': ['Geography & History'], 
+                'Arts & Recreation':['Arts & Recreation'], 
+                'Language & Literature':['Language & Literature']
+        }
+        stems_subjects = {
+                'Mathematics':['Mathematics'], 
+                'Earth & Environment': ['Earth & Environment'], 
+                'Biology': ['Biology'], 
+                'Chemistry': ['Chemistry'], 
+                'Physics':['Physics'], 
+                'Technology & Applied Science':['Technology & Applied Science'], 
+                'History, Philosophy and Practice of Science': history_and_philosophy
+        }  # history/philosophy is part of STEMS : Update as per JR's comment on Zulip
+           # Earth & Environment is part of STEMS
+        
+        genderSubjectDictionary = {_(gender) if gender!='' else _("Not known"): {} for gender in gender_list}
+        for gender in gender_list:
+            for subject_name in stems_subjects:
+                genderSubjectDictionary[_(gender) if gender!='' else _("Not known")][_(subject_name)]  \
+                =  sum([self.analytics.get_count('gender_subject', gender, subject_alias) for subject_alias in stems_subjects[subject_name]])
+            
+            for subject_name in non_stems_subjects:
+                genderSubjectDictionary[_(gender) if gender!='' else _("Not known")][_(subject_name)]   \
+                =  sum([self.analytics.get_count('gender_subject', gender, subject_alias) for subject_alias in non_stems_subjects[subject_name]])
+
+        return genderSubjectDictionary
+
+    def getLanguageGenderDictionary(self, params = None):
+        gender_list = ["Male", "Female", "Non-binary", ""]
+        language_list = [lang['language'] for lang in self.analytics.get_values('language')]
+        lang_names = [language_name[lang] if lang in language_name else lang for lang in language_list]  # get the proper names of languages
+        languageGenderDictionary = {_(lang_name): {} for lang_name in lang_names}
+        for lang_index in range(len(language_list)):
+            for gender in gender_list:
+                lang = language_list[lang_index]
+                lang_name = lang_names[lang_index]
+                languageGenderDictionary[_(lang_name)][_(gender) if gender!='' else _("Not known")] = self.analytics.get_count('gender_language', gender, lang)
+        return languageGenderDictionary
+
+    def getMediumLanguage(self, params = None):
+        distinct = self.analytics.get_values('medium_language')
+        mlang_names = []         # list to hold the name of the language
+        mlang_counts = []        # list to hold the count of question for the language corresponding to name in lang_names 
+        for lang in distinct:
+            lang_code = lang['medium_language']
+            if lang_code in language_name:              # This won't work here because medium is not stored using language code
+                lang_name = language_name[lang_code]    # Might be useful if the database if updated and medium language is stored using code
+            else:
+                lang_name = lang_code
+            if lang_name in mlang_names:
+                # if the language name is twice in the list for any reason then reject it. (Workaround)
+                continue
+            if lang_name == "":         # null values for languages are captured as "Other" 
+                lang_name = "Other"  
+            mlang_names.append(lang_name)
+            mlang_counts.append(lang['count'])
+        return mlang_names, mlang_counts
+
+    def getStudentClassStat(self, params = None):
+        distinct = self.analytics.get_values('student_class')
+        class_tuples = sorted([(tple['student_class'] if tple['student_class'] else "Not known", tple['count']) for tple in distinct], key = lambda item : item[0])
+        # Cleaning tuples as classes are stored as 10, 10.0 ... etc
+        ## Can use: clases_names = {"4,5,6": "Primary", "10,11": "Secondary", "6,7,8": "Middle School" }.update({i:i for i in range(1,13)})
+        dct = {i:0 for i in range(1,13)}
+        for tple in class_tuples:
+            student_class = tple[0]
+            student_count = tple[1]
+            if student_count < 5 : # 5 is arbitrary here. Change it as per the requirements. 
+                # ignore if count of student from this class is less than 5
+                continue
+            try:
+                st_class = int(float(student_class))
+            except:
+                st_class = student_class
+            dct[st_class] = (dct[st_class] + student_count) if st_class in dct else student_count
+        return map(list, zip(*(dct.items())))
+
+
+    def getQuestionFormatStats(self):
+        distinct = self.analytics.get_values('question_format')
+        format_tuples = sorted([(tple['question_format'] if tple['question_format'] else "Other", tple['count']) for tple in distinct], key = lambda item : item[0])
+        return map(list, zip(*format_tuples))
+
+    def getCurriculumStats(self):
+        distinct = self.analytics.get_values('curriculum_followed')
+        curriculum_tuples = sorted([(tple['curriculum_followed'] if tple['curriculum_followed'] else "Other", tple['count']) for tple in distinct], key = lambda item : item[0])
+        return map(list, zip(*curriculum_tuples))
+
+    def getContextStats(self):
+        distinct = self.analytics.get_values('context')
+        context_tuples = sorted([
+                (tple['context'] 
+                if (tple['context'] and tple['context'] != "Other (elaborate in the Notes column)") 
+                else "Other", tple['count']) for tple in distinct],
+            key = lambda item : item[0])
+        return map(list, zip(*context_tuples))
+
+    def getMapStats(self):
+        distinct = self.analytics.get_values('state')    # place from where question is asked is in column state
+        states, codes, counts = list(), list(), list()
+        for stateCountPairDict in distinct:
+            state = stateCountPairDict['state']
+            if state.lower() not in self.state_code:
+                continue
+            states.append(state)
+            codes.append(self.state_code[state.lower()])
+            counts.append(stateCountPairDict['count'])
+        return states, codes, counts
+
+    def getCountryStats(self):
+        ###TODO: For World Map
+        pass
+
+    @staticmethod
+    def fix(lst, apply_ = False):
+        """
+        Method to convert the list into JSON list.
+        If apply_translation is True, then map _ function to all the string values
+        """
+        if apply_:
+            lst = list(map(_, lst))
+        return json.dumps(lst)
+
+
+def get_analytics_page_cache_key(version):
+    # labels are translated, so the context is cached per language
+    return 'analytics_page_{}_{}'.format(version, get_language())
+
+
+def cache_analytics_page_context(version):
+    """
+    Compute the context of the analytics page in the current language and
+    cache it under the given question data version. The version must be
+    read before, so that if the questions change meanwhile, the context is
+    cached under a version that is already outdated.
+    """
+
+    context = AnalyticsPageContext(get_question_analytics()).get_context()
+    cache.set(get_analytics_page_cache_key(version), context, 60 * 60 * 24)
+    return context
+
+
+def get_analytics_page_context():
+    """Return the context of the analytics page in the current language"""
+
+    version = get_question_data_version()
+    context = cache.get(get_analytics_page_cache_key(version))
+    if context is None:
+        context = cache_analytics_page_context(version)
+    return context
+
+
+def warm_analytics_page_cache():
+    """Cache the context of the analytics page in every site language"""
+
+    version = get_question_data_version()
+    for language, name in settings.LANGUAGES:
+        with translation_override(language):
+            cache_analytics_page_context(version)
+
+
+class QuestionCube:
+    """The analytics fields of all questions, indexed by question ID"""
+
+    def __init__(self):
+        self.frame = None
+        # latest updated_on of the loaded questions
+        self.updated_on = None
+        # question delete version the frame was built at
+        self.delete_version = None
+        self.checked_at = self.built_at = 0
+        self.lock = threading.Lock()
+
+    def load(self, questions):
+        """Return the frame of the analytics fields of some questions"""
+
+        database_fields = [field for field in CUBE_FIELDS if field != 'year_asked']
+        rows = questions.values_list('id', 'updated_on', 'question_asked_on', *database_fields)
+        frame = pd.DataFrame.from_records(
+            list(rows),
+            columns=['id', 'updated_on', 'question_asked_on'] + database_fields,
+            index='id')
+
+        frame['year_asked'] = [
+            str(asked_on.year) if asked_on else ''
+            for asked_on in frame.pop('question_asked_on')
+        ]
+        return frame
+
+    def refresh(self):
+        """Load the questions changed since the last refresh"""
+
+        now = time.monotonic()
+        # read before loading, so that deletions made meanwhile are
+        # caught by the next refresh
+        delete_version = get_question_delete_version()
+        if (self.frame is None
+                or self.updated_on is None
+                or delete_version != self.delete_version
+                or now - self.built_at > CUBE_REBUILD_AGE):
+            frame = self.load(Question.objects.all())
+            self.built_at = now
+            self.delete_version = delete_version
+        else:
+            # >= as questions saved in the same instant may have been
+            # committed after the last refresh
+            changed = self.load(Question.objects.filter(updated_on__gte=self.updated_on))
+            frame = self.frame
+            if len(changed):
+                frame = pd.concat([frame.drop(changed.index, errors='ignore'), changed])
+
+        if frame is not self.frame:
+            for field in CUBE_FIELDS:
+                frame[field] = frame[field].astype('category')
+            self.frame = frame
+            self.updated_on = frame['updated_on'].max() if len(frame) else None
+
+        self.checked_at = now
+
+    def get_counts(self, group_by=(), filters=None):
+        """
+        Count the questions matching the filters, a {field: [values]}
+        dict, per combination of values of the group_by fields. Returns
+        (number of questions matching the filters, [{field: value, ...,
+        'count': count}, ...]).
+        """
+
+        frame = self.frame
+        selected = np.ones(len(frame), dtype=bool)
+        for field, values in (filters or {}).items():
+            selected &= frame[field].isin(values).to_numpy()
+
+        total = int(selected.sum())
+        if not group_by:
+            return total, []
+
+        counts = frame[selected].groupby(list(group_by), observed=True).size().sort_index()
+        return total, [
+            dict(zip(group_by, key if isinstance(key, tuple) else (key,)), count=int(count))
+            for key, count in counts.items()
+            if count
+        ]
+
+
+question_cube = QuestionCube()
+
+
+def get_question_cube():
+    """Return the question cube of this process, brought up to date"""
+
+    with question_cube.lock:
+        if (question_cube.frame is None
+                or time.monotonic() - question_cube.checked_at > CUBE_MAX_AGE):
+            question_cube.refresh()
+
+    return question_cube
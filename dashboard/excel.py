@@ -0,0 +1,99 @@
+"""
+Read and write Excel workbooks one row at a time.
+
+Uploaded sheets are opened with openpyxl in read-only mode, which parses
+the worksheet lazily, so validating or importing a sheet needs memory for
+a single row instead of the whole workbook.
+"""
+
+from contextlib import contextmanager
+
+from openpyxl import Workbook, load_workbook
+
+
+@contextmanager
+def open_worksheet(path):
+    """
+    Open the first worksheet of a workbook in read-only mode. Read-only
+    workbooks keep their file open, so it is closed on exit.
+    """
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield workbook.worksheets[0]
+    finally:
+        workbook.close()
+
+
+def clean_cell(value):
+    """Strip strings and turn blank cells into None"""
+
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def read_header(path):
+    """Return the stripped column names of a sheet, skipping blank ones"""
+
+    with open_worksheet(path) as worksheet:
+        for row in worksheet.iter_rows(max_row=1, values_only=True):
+            return [str(column).strip() for column in row if column is not None]
+    return []
+
+
+def count_rows(path):
+    """
+    Return the number of data rows in a sheet. The dimensions stored in
+    the workbook are used when available, otherwise the rows are counted.
+    """
+
+    with open_worksheet(path) as worksheet:
+        if worksheet.max_row is not None:
+            return max(worksheet.max_row - 1, 0)
+        return sum(1 for row in worksheet.iter_rows(min_row=2, values_only=True))
+
+
+def iter_rows(path):
+    """
+    Yield every non-empty data row of a sheet as a dict of
+    column name -> cleaned value. Columns without a name are ignored.
+
+    The row number (1 for the first row after the header) is available
+    under the '_row' key.
+    """
+
+    with open_worksheet(path) as worksheet:
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, ())
+        columns = [
+            (position, str(column).strip())
+            for position, column in enumerate(header)
+            if column is not None
+        ]
+
+        for number, values in enumerate(rows, start=1):
+            row = {
+                column: clean_cell(values[position]) if position < len(values) else None
+                for position, column in columns
+            }
+            if all(value is None for value in row.values()):
+                continue
+
+            row['_row'] = number
+            yield row
+
+
+def write_rows(path, columns, rows):
+    """
+    Write rows (sequences of values, in the order of `columns`) to a new
+    workbook without keeping them in memory
+    """
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet('Sheet 1')
+    worksheet.append(columns)
+    for row in rows:
+        worksheet.append(row)
+    workbook.save(path)
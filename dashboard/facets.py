@@ -0,0 +1,163 @@
+"""
+Facet counts for the question filters of the search pages.
+
+All facet values with their counts, the number of questions and the
+number of questions left after the selected filters are computed by one
+GROUPING SETS query over the (de-duplicated) questions being searched.
+Results are cached per query, i.e. per filter signature, for a minute;
+CountedPaginator corrects the cached count of the page it shows.
+"""
+
+import hashlib
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
+
+# Question fields that results can be filtered by
+FACET_FIELDS = [
+    'field_of_interest',
+    'state',
+    'curriculum_followed',
+    'language',
+]
+
+FACETS_CACHE_TIMEOUT = 60
+
+
+class Facets:
+    """Facet values and counts of a set of questions"""
+
+    def __init__(self, counts, total, filtered_total):
+        # field -> {value: number of questions}
+        self.counts = counts
+        self.total = total
+        # number of questions matching the selected filters
+        self.filtered_total = filtered_total
+
+    def values(self, field):
+        """Return the non-empty values of a field, in alphabetical order"""
+
+        return sorted(value for value in self.counts[field] if value)
+
+
+def get_facets(questions, selected):
+    """
+    Count the questions per value of each facet field.
+
+    `selected` maps facet fields to the list of values the results are
+    filtered by; filtered_total is the number of questions matching all
+    of them.
+    """
+
+    counts = {field: {} for field in FACET_FIELDS}
+    total = filtered_total = 0
+
+    # de-duplicate questions repeated by joins (e.g. on answers)
+    try:
+        subquery, subquery_params = questions \
+            .order_by() \
+            .values('id', *FACET_FIELDS) \
+            .distinct() \
+            .query.sql_with_params()
+    except EmptyResultSet:
+        # e.g. Question.objects.none()
+        return Facets(counts, total, filtered_total)
+
+    conditions = ['TRUE']
+    filter_params = []
+    for field in FACET_FIELDS:
+        if selected.get(field):
+            conditions.append('{} = ANY(%s)'.format(field))
+            filter_params.append(list(selected[field]))
+
+    columns = ', '.join(FACET_FIELDS)
+    sql = '''
+        SELECT {columns},
+               {groupings},
+               COUNT(*),
+               COUNT(*) FILTER (WHERE {conditions})
+        FROM ({subquery}) AS questions
+        GROUP BY GROUPING SETS ({grouping_sets}, ())
+    '''.format(
+        columns=columns,
+        groupings=', '.join('GROUPING({})'.format(field) for field in FACET_FIELDS),
+        conditions=' AND '.join(conditions),
+        subquery=subquery,
+        grouping_sets=', '.join('({})'.format(field) for field in FACET_FIELDS),
+    )
+    params = filter_params + list(subquery_params)
+
+    cache_key = 'facets_' + hashlib.md5(
+        (sql + repr(params)).encode('utf-8')).hexdigest()
+    facets = cache.get(cache_key)
+    if facets is not None:
+        return facets
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for row in cursor.fetchall():
+            values = row[:len(FACET_FIELDS)]
+            groupings = row[len(FACET_FIELDS):2 * len(FACET_FIELDS)]
+            count, filtered_count = row[-2:]
+
+            if all(groupings):
+                # the empty grouping set: all questions
+                total = count
+                filtered_total = filtered_count
+                continue
+
+            for field, value, grouping in zip(FACET_FIELDS, values, groupings):
+                if not grouping:
+                    counts[field][value] = count
+
+    facets = Facets(counts, total, filtered_total)
+    cache.set(cache_key, facets, FACETS_CACHE_TIMEOUT)
+
+    return facets
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator for a queryset whose size is already known. The count may
+    be cached, and so out of date: it is corrected from the rows of the
+    page that is fetched.
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._count = count
+
+    @cached_property
+    def count(self):
+        return self._count
+
+    def set_count(self, count):
+        self._count = count
+        # recomputed from the new count
+        for name in ('count', 'num_pages'):
+            self.__dict__.pop(name, None)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+
+        # one extra row tells if there are more rows than counted
+        objects = list(self.object_list[bottom:bottom + self.per_page + 1])
+
+        if not objects and number > 1:
+            # past the end: rows were deleted since they were counted
+            self.set_count(self.object_list.count())
+            return self.page(self.num_pages)
+
+        if len(objects) <= self.per_page:
+            # the last page, so the exact count is known
+            count = bottom + len(objects)
+        else:
+            count = max(self.count, bottom + len(objects))
+        if count != self.count:
+            self.set_count(count)
+
+        return self._get_page(objects[:self.per_page], number, self)
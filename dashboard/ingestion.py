@@ -0,0 +1,292 @@
+"""
+Load submitted Excel datasets into the database in bulk.
+
+Rows streamed from the uploaded sheet are mapped to model fields and
+converted to the field types one at a time, and written with chunked
+bulk_create calls inside a single transaction.
+"""
+
+import logging
+import time
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.utils import timezone
+
+from dashboard.models import Dataset, Question, QuestionArchive
+
+logger = logging.getLogger(__name__)
+
+# Number of rows sent to the database per INSERT
+CHUNK_SIZE = 500
+
+# Excel template column -> QuestionArchive field
+QUESTION_COLUMN_MAPPING = {
+    'Question': 'question_text',
+    'Question Language': 'language',
+    'English translation of the question': 'question_text_english',
+    'How was the question originally asked?': 'question_format',
+    'Context': 'context',
+    'Date of asking the question': 'question_asked_on',
+    'Student Name': 'student_name',
+    'Gender': 'student_gender',
+    'Student Class': 'student_class',
+    'School Name': 'school',
+    'Curriculum followed': 'curriculum_followed',
+    'Medium of instruction': 'medium_language',
+    'Area': 'area',
+    'State': 'state',
+    'Published (Yes/No)': 'published',
+    'Publication Name': 'published_source',
+    'Publication Date': 'published_date',
+    'Notes': 'notes',
+    'Contributor Name': 'contributor',
+    'Contributor Role': 'contributor_role',
+}
+
+# Curated sheet column -> Question field
+CURATED_COLUMN_MAPPING = dict(QUESTION_COLUMN_MAPPING, **{
+    'Field of Interest': 'field_of_interest',
+    'dataset_id': 'dataset_id',
+    '_row': 'dataset_row',
+})
+
+# Question fields compared and overwritten when a curated sheet is
+# imported again
+CURATED_SHEET_FIELDS = [
+    field_name for field_name in CURATED_COLUMN_MAPPING.values()
+    if field_name not in ('dataset_id', 'dataset_row')
+]
+CURATED_UPDATE_FIELDS = CURATED_SHEET_FIELDS + ['curated_by', 'updated_on']
+
+
+class IngestionReport:
+    """Summary of a bulk ingestion run"""
+
+    def __init__(self, rows, seconds, chunks=None, overwritten_rows=None):
+        self.rows = rows
+        self.seconds = seconds
+        # (rows, seconds) of each chunk written
+        self.chunks = chunks or []
+        # sheet rows whose saved questions differed and were overwritten
+        self.overwritten_rows = overwritten_rows or []
+
+    @property
+    def rows_per_second(self):
+        if not self.seconds:
+            return float(self.rows)
+        return self.rows / self.seconds
+
+    def __str__(self):
+        return '{} rows in {:.2f}s ({:.0f} rows/s)'.format(
+            self.rows,
+            self.seconds,
+            self.rows_per_second,
+        )
+
+
+def to_field_value(field, value):
+    """
+    Convert a cell value to the Python type of a model field. Values that
+    cannot be converted are returned unchanged.
+    """
+
+    if isinstance(field, models.BooleanField):
+        return value == 'Yes'
+
+    # Excel stores every number as a float
+    if isinstance(field, models.CharField) and isinstance(value, float) and value.is_integer():
+        value = int(value)
+
+    try:
+        return field.to_python(value)
+    except ValidationError:
+        return value
+
+
+def iter_typed_rows(rows, column_mapping, model):
+    """
+    Turn rows read from a sheet (see dashboard.excel.iter_rows) into dicts
+    of model field values.
+
+    Columns missing from `column_mapping` and empty cells are left out so
+    that the model defaults apply.
+    """
+
+    fields = {
+        column: model._meta.get_field(field_name)
+        for column, field_name in column_mapping.items()
+    }
+
+    for row in rows:
+        yield {
+            fields[column].name: to_field_value(fields[column], value)
+            for column, value in row.items()
+            if column in fields and value is not None
+        }
+
+
+def bulk_create_in_chunks(model, rows, chunk_size=CHUNK_SIZE, progress=None, **common):
+    """
+    Create model instances from an iterable of field dicts, sending one
+    INSERT per chunk. Fields in `common` are set on every instance.
+
+    If given, `progress` is called with the number of rows created so
+    far after every chunk. Returns the number of rows created.
+    """
+
+    created = 0
+    chunk = []
+    for row in rows:
+        chunk.append(model(**row, **common))
+        if len(chunk) >= chunk_size:
+            model.objects.bulk_create(chunk)
+            created += len(chunk)
+            chunk = []
+            if progress:
+                progress(created)
+
+    if chunk:
+        model.objects.bulk_create(chunk)
+        created += len(chunk)
+        if progress:
+            progress(created)
+
+    return created
+
+
+def ingest_submitted_questions(rows, submitted_by, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Save the rows of an uploaded sheet of questions to the archive and
+    create the Dataset that tracks it, all in one transaction.
+
+    Returns a (dataset, IngestionReport) tuple.
+    """
+
+    start = time.perf_counter()
+    rows_read = 0
+
+    def questions():
+        nonlocal rows_read
+        for row in iter_typed_rows(rows, QUESTION_COLUMN_MAPPING, QuestionArchive):
+            rows_read += 1
+            # only save the question if the question field is non-empty
+            if 'question_text' in row:
+                yield row
+
+    with transaction.atomic():
+        dataset = Dataset.objects.create(
+            submitted_by=submitted_by,
+            status='new',
+        )
+        created = bulk_create_in_chunks(
+            QuestionArchive,
+            questions(),
+            chunk_size=chunk_size,
+            progress=progress,
+            submitted_by=submitted_by,
+        )
+        dataset.question_count = rows_read
+        dataset.save()
+
+    report = IngestionReport(created, time.perf_counter() - start)
+    logger.info('Ingested %s: %s', dataset, report)
+
+    return dataset, report
+
+
+def save_curated_chunk(rows, curated_by):
+    """
+    Insert the questions of a chunk of typed sheet rows that are new and
+    update the ones already imported from the same dataset row, if the
+    sheet changes them. Empty cells leave the saved values as they are,
+    rather than resetting them to the model defaults. Returns the dataset
+    rows of the questions that were updated.
+    """
+
+    questions = [Question(curated_by=curated_by, **row) for row in rows]
+    existing = {
+        saved['dataset_row']: saved
+        for saved in Question.objects
+            .filter(
+                dataset_id=questions[0].dataset_id,
+                dataset_row__in=[question.dataset_row for question in questions])
+            .values('pk', 'dataset_row', *CURATED_SHEET_FIELDS)
+    }
+
+    new_questions = []
+    updated_questions = []
+    now = timezone.now()
+    for row, question in zip(rows, questions):
+        saved = existing.get(question.dataset_row)
+        if saved is None:
+            new_questions.append(question)
+            continue
+
+        for field in CURATED_SHEET_FIELDS:
+            if field not in row:
+                setattr(question, field, saved[field])
+
+        if any(getattr(question, field) != saved[field] for field in CURATED_SHEET_FIELDS):
+            question.pk = saved['pk']
+            question.updated_on = now
+            updated_questions.append(question)
+
+    Question.objects.bulk_create(new_questions)
+    Question.objects.bulk_update(updated_questions, CURATED_UPDATE_FIELDS)
+
+    return [question.dataset_row for question in updated_questions]
+
+
+def curate_dataset(rows, dataset, curated_by, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Save the rows of a curated sheet as Questions and mark the dataset
+    as curated, all in one transaction.
+
+    Questions are keyed on (dataset_id, dataset_row), so importing the
+    sheet of a dataset again updates its questions instead of
+    duplicating them. Questions that differ from the non-empty cells of
+    the sheet, including any edits made since they were curated, are
+    overwritten and listed in the overwritten_rows of the returned
+    IngestionReport.
+    """
+
+    start = time.perf_counter()
+    chunks = []
+    overwritten_rows = []
+
+    def save_chunk(chunk):
+        chunk_start = time.perf_counter()
+        overwritten_rows.extend(save_curated_chunk(chunk, curated_by))
+        chunks.append((len(chunk), time.perf_counter() - chunk_start))
+        logger.info('Curated %s rows of %s in %.2fs', len(chunk), dataset, chunks[-1][1])
+        if progress:
+            progress(sum(size for size, seconds in chunks))
+
+    with transaction.atomic():
+        chunk = []
+        for row in iter_typed_rows(rows, CURATED_COLUMN_MAPPING, Question):
+            if row.get('field_of_interest') == 'History-Philosophy & Practice of Science':
+                row['field_of_interest'] = 'History, Philosophy & Practice of Science'
+            row['dataset_id'] = str(dataset.id)
+
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                save_chunk(chunk)
+                chunk = []
+
+        if chunk:
+            save_chunk(chunk)
+
+        # update status of the dataset
+        dataset.status = 'curated'
+        dataset.save()
+
+    report = IngestionReport(
+        sum(size for size, seconds in chunks),
+        time.perf_counter() - start,
+        chunks,
+        overwritten_rows)
+    logger.info('Curated %s: %s', dataset, report)
+
+    return report
@@ -0,0 +1,236 @@
+"""
+Process uploaded Excel sheets (validation, submission and curation of
+datasets) in the background, tracking their progress on a DatasetJob.
+"""
+
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.utils.translation import gettext as _
+from kombu.exceptions import OperationalError
+
+from dashboard.models import Dataset, DatasetJob, Question
+from dashboard.excel import read_header, count_rows, iter_rows, write_rows
+from dashboard.ingestion import ingest_submitted_questions, curate_dataset
+from dashboard.validation import validate_new_sheet, validate_curated_sheet
+
+SUBMISSIONS_DIR = os.path.join(settings.BASE_DIR, 'assets', 'submissions')
+
+logger = logging.getLogger(__name__)
+
+
+def submissions_path(*parts):
+    """Return the absolute path of a file in assets/submissions"""
+
+    return os.path.join(SUBMISSIONS_DIR, *parts)
+
+
+def create_dataset_job(kind, excel_file, submitted_by):
+    """
+    Store an uploaded Excel file on disk and create a queued job to
+    process it
+    """
+
+    job = DatasetJob.objects.create(kind=kind, submitted_by=submitted_by)
+
+    job.excel_file = os.path.join('jobs', 'job_{}.xlsx'.format(job.id))
+    os.makedirs(submissions_path('jobs'), exist_ok=True)
+    with open(submissions_path(job.excel_file), 'wb') as f:
+        for chunk in excel_file.chunks():
+            f.write(chunk)
+    job.save()
+
+    return job
+
+
+def remove_job_file(job):
+    """Delete the uploaded file of a job, if it is still on disk"""
+
+    path = submissions_path(job.excel_file)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def queue_dataset_job(job):
+    """
+    Queue a job to be processed by a Celery worker once the current
+    transaction commits. If it can't be queued, e.g. as the broker is
+    down, the job fails with a message its status page shows.
+    """
+
+    # imported here, as dashboard.tasks imports this module
+    from dashboard.tasks import processDatasetJob
+
+    def queue():
+        try:
+            processDatasetJob.delay(job.id)
+        except OperationalError:
+            logger.exception('Could not queue %s', job)
+            job.set_status(
+                DatasetJob.STATUS_FAILED,
+                message=_('We could not start processing your file. Please try again later.'))
+            remove_job_file(job)
+
+    transaction.on_commit(queue)
+
+
+def get_job_progress(job):
+    """
+    Return the number of rows processed so far. Imports run inside a
+    transaction, so running counts are kept in the cache where other
+    processes can see them.
+    """
+
+    if job.status == DatasetJob.STATUS_IMPORTING:
+        return cache.get(job.progress_cache_key, job.rows_processed)
+    return job.rows_processed
+
+
+def raw_sheet_path(dataset):
+    """Return the path of the sheet submitted for a dataset"""
+
+    return submissions_path('raw', 'dataset_' + str(dataset.id) + '_raw.xlsx')
+
+
+def uncurated_sheet_path(dataset):
+    """Return the path of the curation sheet of a dataset"""
+
+    return submissions_path('uncurated', 'dataset_' + str(dataset.id) + '_uncurated.xlsx')
+
+
+def get_uncurated_sheet(dataset):
+    """
+    Return the path of the curation sheet of a dataset: the submitted
+    sheet with the 'Field of Interest' and 'dataset_id' columns added.
+
+    The sheet is generated from the raw copy the first time it is needed
+    and kept on disk afterwards.
+    """
+
+    path = uncurated_sheet_path(dataset)
+    if os.path.exists(path):
+        return path
+
+    raw_path = raw_sheet_path(dataset)
+    header = read_header(raw_path)
+
+    # write to a temporary file first, so that a sheet that is still
+    # being generated is never served
+    fd, temporary_path = tempfile.mkstemp(suffix='.xlsx', dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        write_rows(
+            temporary_path,
+            header + ['Field of Interest', 'dataset_id'],
+            ([row[column] for column in header] + [None, dataset.id]
+             for row in iter_rows(raw_path)))
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+    return path
+
+
+def run_dataset_job(job):
+    """
+    Validate the job's sheet and, for submissions and curations, import
+    it. The job is updated as it moves through its statuses. The uploaded
+    file is deleted when the job is over; submitted sheets are kept in
+    raw/ for archiving.
+    """
+
+    try:
+        return process_job_sheet(job, submissions_path(job.excel_file))
+    finally:
+        remove_job_file(job)
+
+
+def process_job_sheet(job, path):
+    """Validate and import the sheet of a job, stored at path"""
+
+    job.set_status(DatasetJob.STATUS_VALIDATING, rows_total=count_rows(path))
+
+    if job.kind in (DatasetJob.KIND_VALIDATE_NEW, DatasetJob.KIND_SUBMIT):
+        errors = validate_new_sheet(read_header(path), iter_rows(path))
+    else:
+        errors = validate_curated_sheet(read_header(path), iter_rows(path))
+
+    if errors:
+        job.set_status(
+            DatasetJob.STATUS_DONE if job.is_validation else DatasetJob.STATUS_FAILED,
+            errors=errors,
+            message=_('We found some errors in your excel file.'))
+        return job
+
+    if job.is_validation:
+        job.set_status(DatasetJob.STATUS_DONE, rows_processed=job.rows_total)
+        return job
+
+    job.set_status(DatasetJob.STATUS_IMPORTING)
+    # warnings about the import, shown like the validation errors
+    errors = []
+
+    def progress(rows):
+        cache.set(job.progress_cache_key, rows)
+
+    if job.kind == DatasetJob.KIND_SUBMIT:
+        dataset, report = ingest_submitted_questions(
+            iter_rows(path),
+            job.submitted_by,
+            progress=progress)
+
+        # keep the uploaded file as it is for archiving; the curation
+        # sheet is generated from it later
+        os.replace(path, raw_sheet_path(dataset))
+
+    elif job.kind == DatasetJob.KIND_CURATE:
+        # verify the dataset_id
+        dataset_id = next(iter_rows(path), {}).get('dataset_id')
+
+        try:
+            dataset = Dataset.objects.get(id=dataset_id)
+        except ObjectDoesNotExist:
+            job.set_status(
+                DatasetJob.STATUS_FAILED,
+                message=_('We could not find that dataset by ID. Make sure you did not edit any other field except "Field of Interest".'))
+            return job
+
+        # questions curated before they were keyed on their sheet row
+        # can't be matched, and would be duplicated
+        if Question.objects.filter(dataset_id=str(dataset.id), dataset_row__isnull=True).exists():
+            job.set_status(
+                DatasetJob.STATUS_FAILED,
+                message=_('This dataset is already curated. Make sure you are uploading the correct file.'))
+            return job
+
+        # a dataset that is already curated gets its questions updated
+        report = curate_dataset(
+            iter_rows(path),
+            dataset,
+            job.submitted_by,
+            progress=progress)
+
+        if report.overwritten_rows:
+            errors.append([
+                _('These rows replaced questions that were already saved:'),
+                [_('Row #%(row)s') % {'row': row} for row in report.overwritten_rows],
+            ])
+
+    else:
+        raise ValueError('Unknown dataset job kind: {}'.format(job.kind))
+
+    job.set_status(
+        DatasetJob.STATUS_DONE,
+        dataset=dataset,
+        rows_processed=report.rows,
+        message=str(report),
+        errors=errors)
+    cache.delete(job.progress_cache_key)
+
+    return job
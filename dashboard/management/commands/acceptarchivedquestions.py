@@ -0,0 +1,33 @@
+"""
+Move archived (uncurated) questions to the Question table in bulk
+"""
+from django.core.management import BaseCommand, CommandError
+from dashboard.models import QuestionArchive
+from dashboard.analytics import queue_question_analytics_refresh
+from sawaliram_auth.models import User
+
+
+class Command(BaseCommand):
+    help = "Accept archived questions, curated by the given user"
+
+    def add_arguments(self, parser):
+        parser.add_argument('curator_email')
+        parser.add_argument(
+            '--submitted-by',
+            help='Only accept questions submitted by the user with this email')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        try:
+            curator = User.objects.get(email=options['curator_email'])
+        except User.DoesNotExist:
+            raise CommandError('No user with email "%s"' % options['curator_email'])
+
+        questions = QuestionArchive.objects.all()
+        if options['submitted_by']:
+            questions = questions.filter(submitted_by__email=options['submitted_by'])
+
+        accepted = questions.accept(curator, chunk_size=options['chunk_size'])
+        queue_question_analytics_refresh()
+
+        self.stdout.write('Accepted %s questions' % accepted)
@@ -0,0 +1,149 @@
+"""
+Show the query plans of the hot listing and analytics queries with and
+without their indexes, on generated data
+"""
+from django.core.management import BaseCommand
+from django.db import connection, models, transaction
+import time
+
+import numpy as np
+
+from dashboard.models import (
+    Answer,
+    AnswerTranslation,
+    Question,
+    TranslatedQuestion,
+)
+from sawaliram_auth.models import User
+
+# Models whose (B-tree) indexes are dropped for the "before" plans
+INDEXED_MODELS = [Question, Answer, AnswerTranslation, TranslatedQuestion]
+
+
+class Command(BaseCommand):
+    help = ("Compare the query plans of the hot queries with and without "
+            "their indexes. Data is generated in a transaction that is "
+            "rolled back.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user, question = self.generate_data(options['rows'])
+            queries = self.get_queries(user, question)
+
+            self.stdout.write(self.style.MIGRATE_HEADING('With indexes'))
+            self.explain(queries)
+
+            # DDL is transactional in Postgres: the indexes come back on
+            # rollback
+            with connection.cursor() as cursor:
+                for name in self.get_index_names():
+                    cursor.execute('DROP INDEX IF EXISTS "%s"' % name)
+                cursor.execute('ANALYZE')
+
+            self.stdout.write(self.style.MIGRATE_HEADING('Without indexes'))
+            self.explain(queries)
+
+            transaction.set_rollback(True)
+
+    def get_index_names(self):
+        return [
+            index.name
+            for model in INDEXED_MODELS
+            for index in model._meta.indexes
+            if type(index) is models.Index
+        ]
+
+    def generate_data(self, rows):
+        random = np.random.default_rng(0)
+
+        user = User.objects.create_user(
+            first_name='Benchmark',
+            last_name='User',
+            organisation='Sawaliram',
+            email='benchmark@sawaliram.org',
+            password=User.objects.make_random_password())
+
+        subjects = ['Biology', 'Chemistry', 'Physics', 'Mathematics', 'Arts & Recreation']
+        languages = ['en', 'hi', 'bn', 'ml', 'mr', 'ta', 'te']
+        genders = ['Male', 'Female', '']
+        states = ['Goa', 'Kerala', 'Maharashtra', 'Karnataka', 'Delhi']
+
+        questions = Question.objects.bulk_create([
+            Question(
+                question_text='Question %s' % number,
+                field_of_interest=random.choice(subjects),
+                language=random.choice(languages),
+                student_gender=random.choice(genders),
+                state=random.choice(states),
+                curated_by=user,
+                # most questions are answered
+                published_answer_count=int(random.random() < 0.9))
+            for number in range(rows)
+        ], batch_size=5000)
+
+        Answer.objects.bulk_create([
+            Answer(
+                question_id=question,
+                answer_text='Answer',
+                status=random.choice(['published', 'published', 'published', 'submitted', 'draft']),
+                submitted_by=user)
+            for question in questions
+        ], batch_size=5000)
+
+        TranslatedQuestion.objects.bulk_create([
+            TranslatedQuestion(
+                source=question,
+                language=random.choice(languages),
+                status=random.choice([-1, 0, 1]),
+                translated_by=user)
+            for question in questions[:rows // 10]
+        ], batch_size=5000)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        return user, questions[0]
+
+    def get_queries(self, user, question):
+        """The query shapes of the search, review and analytics pages"""
+
+        return [
+            ('Search, filtered by subject, newest first',
+                Question.objects
+                    .filter(field_of_interest__in=['Physics'])
+                    .order_by('-created_on', '-id')[:15]),
+            ('Search, filtered by language, newest first',
+                Question.objects
+                    .filter(language__in=['ml'])
+                    .order_by('-created_on', '-id')[:15]),
+            ('Answer Questions (unanswered), newest first',
+                Question.objects
+                    .filter(published_answer_count=0)
+                    .order_by('-created_on', '-id')[:15]),
+            ('Analytics, questions by gender and subject',
+                Question.objects
+                    .filter(student_gender='Female', field_of_interest='Physics')
+                    .values('id')),
+            ('Review Answers, questions with submitted answers',
+                Answer.objects
+                    .filter(status='submitted')
+                    .values('question_id')),
+            ('User profile, published answers',
+                Answer.objects.filter(submitted_by=user, status='published')[:15]),
+            ('Translation of a question in a language',
+                TranslatedQuestion.objects.filter(source=question, language='hi')),
+        ]
+
+    def explain(self, queries):
+        for title, queryset in queries:
+            start = time.perf_counter()
+            # a fresh clone, as querysets cache their results
+            list(queryset.all())
+            seconds = time.perf_counter() - start
+
+            self.stdout.write('{} ({:.1f}ms)'.format(title, seconds * 1000))
+            self.stdout.write(queryset.explain())
+            self.stdout.write('')
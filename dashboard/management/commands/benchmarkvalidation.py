@@ -0,0 +1,72 @@
+"""
+Time the validation of a generated curated sheet, from reading the
+workbook to the grouped errors, as a curation job does
+"""
+from django.core.management import BaseCommand
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from dashboard.excel import read_header, iter_rows, write_rows
+from dashboard.validation import (
+    CURATED_SHEET_COLUMNS,
+    validate_curated_sheet,
+)
+
+
+class Command(BaseCommand):
+    help = "Time reading and validating a generated curated sheet of questions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+
+        fd, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        try:
+            write_rows(path, CURATED_SHEET_COLUMNS, self.generate_rows(rows))
+
+            # reading alone, to tell its share of the total
+            start = time.perf_counter()
+            for row in iter_rows(path):
+                pass
+            read_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            errors = validate_curated_sheet(read_header(path), iter_rows(path))
+            seconds = time.perf_counter() - start
+        finally:
+            os.remove(path)
+
+        self.stdout.write(
+            'Read and validated {} rows in {:.3f}s (reading alone: {:.3f}s), '
+            '{} rows with errors'.format(rows, seconds, read_seconds, len(errors)))
+
+    def generate_rows(self, rows):
+        """Yield rows of the curated template, some of them invalid"""
+
+        random = np.random.default_rng(0)
+
+        def sometimes_empty(value, probability=0.01):
+            return None if random.random() < probability else value
+
+        for number in range(rows):
+            row = {
+                column: sometimes_empty('x', probability=0.2)
+                for column in CURATED_SHEET_COLUMNS
+            }
+            row['Question'] = sometimes_empty('Why is the sky blue?')
+            row['Question Language'] = sometimes_empty('en')
+            if random.random() < 0.01:
+                row['Question Language'] = 'English'
+            row['Context'] = sometimes_empty('Classroom')
+            row['Published (Yes/No)'] = 'Yes' if random.random() < 0.5 else 'No'
+            row['Contributor Name'] = sometimes_empty('Munin')
+            row['Field of Interest'] = sometimes_empty('Biology')
+            row['dataset_id'] = 1
+
+            yield [row[column] for column in CURATED_SHEET_COLUMNS]
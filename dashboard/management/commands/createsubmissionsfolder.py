@@ -21,6 +21,10 @@ class Command(BaseCommand):
             os.path.dirname(__file__), '../../../assets') \
             + '/submissions/unencoded'
 
+        path_to_job_submissions_dir = os.path.join(
+            os.path.dirname(__file__), '../../../assets') \
+            + '/submissions/jobs'
+
         if not os.path.exists(path_to_raw_submissions_dir):
             os.makedirs(path_to_raw_submissions_dir)
 
@@ -29,3 +33,6 @@ class Command(BaseCommand):
 
         if not os.path.exists(path_to_unencoded_submissions_dir):
             os.makedirs(path_to_unencoded_submissions_dir)
+
+        if not os.path.exists(path_to_job_submissions_dir):
+            os.makedirs(path_to_job_submissions_dir)
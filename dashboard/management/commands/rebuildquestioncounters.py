@@ -0,0 +1,26 @@
+"""
+Recount the answers and published translations stored on each question
+"""
+from django.core.management import BaseCommand
+from dashboard.models import Question
+
+
+class Command(BaseCommand):
+    help = "Rebuild the answer and translation counters of all questions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        pks = list(Question.objects.order_by('pk').values_list('pk', flat=True))
+
+        # update in chunks, so that only a few rows are locked at a time
+        updated = 0
+        for start in range(0, len(pks), chunk_size):
+            chunk = pks[start:start + chunk_size]
+            updated += Question.objects \
+                .filter(pk__gte=chunk[0], pk__lte=chunk[-1]) \
+                .update_counters()
+
+        self.stdout.write('Updated the counters of %s questions' % updated)
@@ -0,0 +1,15 @@
+# Generated by Django 3.2.4 on 2026-10-18 07:35
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0034_merge_20210510_1642'),
+        ('dashboard', '0035_merge_20210529_2232'),
+        ('dashboard', '0036_auto_20210608_1954'),
+    ]
+
+    operations = [
+    ]
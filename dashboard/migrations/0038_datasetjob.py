@@ -0,0 +1,36 @@
+# Generated by Django 3.2.4 on 2026-10-18 13:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('dashboard', '0037_merge_20261018_1305'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50)),
+                ('status', models.CharField(default='queued', max_length=50)),
+                ('excel_file', models.CharField(blank=True, default='', max_length=200)),
+                ('rows_total', models.IntegerField(default=0)),
+                ('rows_processed', models.IntegerField(default=0)),
+                ('message', models.CharField(blank=True, default='', max_length=500)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('updated_on', models.DateTimeField(auto_now=True)),
+                ('dataset', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='dashboard.dataset')),
+                ('submitted_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dataset_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'dataset_job',
+            },
+        ),
+    ]
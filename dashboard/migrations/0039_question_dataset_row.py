@@ -0,0 +1,22 @@
+# Generated by Django 3.2.4 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0038_datasetjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='dataset_row',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='question',
+            constraint=models.UniqueConstraint(fields=('dataset_id', 'dataset_row'), name='question_dataset_row_unique'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 3.2.4 on 2026-10-18 14:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Keep the search vectors of questions and articles up to date on every
+# write, including bulk inserts and updates that bypass Model.save()
+QUESTION_SEARCH_TRIGGER = '''
+CREATE FUNCTION question_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.question_text, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.question_text_english, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.field_of_interest, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW.school, '') || ' ' || coalesce(NEW.area, '') || ' ' || coalesce(NEW.state, '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(NEW.published_source, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER question_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON question
+    FOR EACH ROW EXECUTE PROCEDURE question_search_vector_update();
+
+UPDATE question SET search_vector = NULL;
+'''
+
+ARTICLE_SEARCH_TRIGGER = '''
+CREATE FUNCTION article_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.body, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER article_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON articles
+    FOR EACH ROW EXECUTE PROCEDURE article_search_vector_update();
+
+UPDATE articles SET search_vector = NULL;
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0039_question_dataset_row'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            QUESTION_SEARCH_TRIGGER,
+            reverse_sql='''
+                DROP TRIGGER question_search_vector_trigger ON question;
+                DROP FUNCTION question_search_vector_update();
+            '''),
+        migrations.RunSQL(
+            ARTICLE_SEARCH_TRIGGER,
+            reverse_sql='''
+                DROP TRIGGER article_search_vector_trigger ON articles;
+                DROP FUNCTION article_search_vector_update();
+            '''),
+        migrations.AddIndex(
+            model_name='question',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='question_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='articles_search_idx'),
+        ),
+    ]
@@ -0,0 +1,119 @@
+# Generated by Django 3.2.4 on 2026-10-18 15:10
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+from django.db.models import Q
+
+# English content is stemmed with the 'english' configuration. Postgres
+# has no dictionaries for the Indic languages, so their content uses
+# 'simple', which does not apply English stemming and stop words.
+SEARCH_CONFIG_FUNCTION = '''
+CREATE FUNCTION sawaliram_search_config(language text) RETURNS regconfig AS $$
+    SELECT CASE
+        WHEN language IN ('en', 'english') THEN 'english'::regconfig
+        ELSE 'simple'::regconfig
+    END
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION question_search_vector_update() RETURNS trigger AS $$
+DECLARE
+    config regconfig := sawaliram_search_config(NEW.language);
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector(config, coalesce(NEW.question_text, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.question_text_english, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.field_of_interest, '')), 'B') ||
+        setweight(to_tsvector(config, coalesce(NEW.school, '') || ' ' || coalesce(NEW.area, '') || ' ' || coalesce(NEW.state, '')), 'C') ||
+        setweight(to_tsvector(config, coalesce(NEW.published_source, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION article_search_vector_update() RETURNS trigger AS $$
+DECLARE
+    config regconfig := sawaliram_search_config(NEW.language);
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector(config, coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector(config, coalesce(NEW.body, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+UPDATE question SET search_vector = NULL WHERE language NOT IN ('en', 'english');
+UPDATE articles SET search_vector = NULL WHERE language NOT IN ('en', 'english');
+'''
+
+ENGLISH_ONLY_SEARCH_CONFIG = '''
+CREATE OR REPLACE FUNCTION question_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.question_text, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.question_text_english, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.field_of_interest, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW.school, '') || ' ' || coalesce(NEW.area, '') || ' ' || coalesce(NEW.state, '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(NEW.published_source, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION article_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.body, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP FUNCTION sawaliram_search_config(text);
+
+UPDATE question SET search_vector = NULL WHERE language NOT IN ('en', 'english');
+UPDATE articles SET search_vector = NULL WHERE language NOT IN ('en', 'english');
+'''
+
+# pg_trgm is used as a fallback for searches that the text search
+# configurations cannot tokenise. Some hosts do not ship the extension,
+# in which case the fallback is disabled (see dashboard.search).
+TRIGRAM_INDEXES = '''
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS question_text_trgm_idx ON question USING gin (question_text gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS articles_title_trgm_idx ON articles USING gin (title gin_trgm_ops);
+    END IF;
+END
+$$;
+'''
+
+CONTENT_LANGUAGES = ['bn', 'en', 'hi', 'mr', 'ml', 'ta', 'te']
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0040_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunSQL(SEARCH_CONFIG_FUNCTION, reverse_sql=ENGLISH_ONLY_SEARCH_CONFIG),
+        migrations.RunSQL(
+            TRIGRAM_INDEXES,
+            reverse_sql='''
+                DROP INDEX IF EXISTS question_text_trgm_idx;
+                DROP INDEX IF EXISTS articles_title_trgm_idx;
+            '''),
+    ] + [
+        migrations.AddIndex(
+            model_name='question',
+            index=django.contrib.postgres.indexes.GinIndex(condition=Q(language=code), fields=['search_vector'], name='question_search_%s_idx' % code),
+        )
+        for code in CONTENT_LANGUAGES
+    ] + [
+        migrations.AddIndex(
+            model_name='article',
+            index=django.contrib.postgres.indexes.GinIndex(condition=Q(language=code), fields=['search_vector'], name='articles_search_%s_idx' % code),
+        )
+        for code in CONTENT_LANGUAGES
+    ]
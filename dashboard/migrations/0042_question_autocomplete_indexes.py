@@ -0,0 +1,35 @@
+# Generated by Django 3.2.4 on 2026-10-18 15:40
+
+from django.db import migrations
+
+# Indexes for dashboard.search.autocomplete(): icontains and istartswith
+# lookups compare UPPER(question_text_english::text)
+AUTOCOMPLETE_INDEXES = '''
+CREATE INDEX question_text_english_prefix_idx
+    ON question (UPPER(question_text_english::text) text_pattern_ops);
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        CREATE INDEX IF NOT EXISTS question_text_english_trgm_idx
+            ON question USING gin (UPPER(question_text_english::text) gin_trgm_ops);
+    END IF;
+END
+$$;
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0041_search_language_config'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            AUTOCOMPLETE_INDEXES,
+            reverse_sql='''
+                DROP INDEX question_text_english_prefix_idx;
+                DROP INDEX IF EXISTS question_text_english_trgm_idx;
+            '''),
+    ]
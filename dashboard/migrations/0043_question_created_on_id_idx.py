@@ -0,0 +1,17 @@
+# Generated by Django 3.2.4 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0042_question_autocomplete_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['created_on', 'id'], name='question_created_on_id_idx'),
+        ),
+    ]
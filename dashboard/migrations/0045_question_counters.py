@@ -0,0 +1,54 @@
+# Generated by Django 3.2.4 on 2026-10-18 19:05
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+# Same as QuestionQuerySet.update_counters(), for existing questions
+FILL_COUNTERS = '''
+UPDATE question SET
+    published_answer_count = (
+        SELECT COUNT(*) FROM answer
+        WHERE answer.question_id_id = question.id AND answer.status = 'published'),
+    submitted_answer_count = (
+        SELECT COUNT(*) FROM answer
+        WHERE answer.question_id_id = question.id AND answer.status = 'submitted'),
+    published_translation_languages = ARRAY(
+        SELECT DISTINCT translated_question.language FROM translated_question
+        WHERE translated_question.source_id = question.id AND translated_question.status = 1
+        ORDER BY translated_question.language);
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0044_comment_target_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='published_answer_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='submitted_answer_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='published_translation_languages',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=100), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.RunSQL(FILL_COUNTERS, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(condition=models.Q(('published_answer_count', 0)), fields=['created_on', 'id'], name='question_unanswered_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['published_translation_languages'], name='question_translations_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 3.2.4 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0045_question_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question_id', 'status'], name='answer_question_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['submitted_by', 'status'], name='answer_submitter_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(condition=models.Q(('status', 'submitted')), fields=['question_id'], name='answer_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='answertranslation',
+            index=models.Index(fields=['translated_by', 'status', 'language'], name='answer_tr_translator_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='answertranslation',
+            index=models.Index(condition=models.Q(('status', 0)), fields=['-updated_on'], name='answer_tr_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='articletranslation',
+            index=models.Index(fields=['translated_by', 'status', 'language'], name='article_tr_translator_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='articletranslation',
+            index=models.Index(condition=models.Q(('status', 0)), fields=['-updated_on'], name='article_tr_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['field_of_interest', 'created_on'], name='question_subject_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['language', 'created_on'], name='question_language_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['state'], name='question_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['curriculum_followed'], name='question_curriculum_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['student_gender', 'field_of_interest'], name='question_gender_subject_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['student_gender', 'language'], name='question_gender_language_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='translatedquestion',
+            index=models.Index(fields=['translated_by', 'status', 'language'], name='question_tr_translator_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='translatedquestion',
+            index=models.Index(fields=['source', 'language'], name='question_tr_source_idx'),
+        ),
+    ]
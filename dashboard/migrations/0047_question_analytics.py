@@ -0,0 +1,89 @@
+from django.db import migrations
+
+# Question counts per value of every dimension of the analytics page,
+# computed by one GROUPING SETS pass over the question table. Each row is
+# (dimension, value, value2, count); value2 is only set for the two
+# dimension pairs. The view is refreshed periodically (see
+# dashboard.tasks.refreshQuestionAnalytics).
+QUESTION_ANALYTICS_VIEW = '''
+CREATE MATERIALIZED VIEW question_analytics AS
+SELECT
+    CASE
+        WHEN g_student_gender = 0 AND g_field_of_interest = 0 THEN 'gender_subject'
+        WHEN g_student_gender = 0 AND g_language = 0 THEN 'gender_language'
+        WHEN g_student_gender = 0 THEN 'student_gender'
+        WHEN g_language = 0 THEN 'language'
+        WHEN g_year_asked = 0 THEN 'year_asked'
+        WHEN g_medium_language = 0 THEN 'medium_language'
+        WHEN g_student_class = 0 THEN 'student_class'
+        WHEN g_question_format = 0 THEN 'question_format'
+        WHEN g_curriculum_followed = 0 THEN 'curriculum_followed'
+        WHEN g_context = 0 THEN 'context'
+        WHEN g_state = 0 THEN 'state'
+        ELSE 'total'
+    END AS dimension,
+    COALESCE(CASE
+        WHEN g_student_gender = 0 THEN student_gender
+        WHEN g_language = 0 THEN language
+        WHEN g_year_asked = 0 THEN year_asked
+        WHEN g_medium_language = 0 THEN medium_language
+        WHEN g_student_class = 0 THEN student_class
+        WHEN g_question_format = 0 THEN question_format
+        WHEN g_curriculum_followed = 0 THEN curriculum_followed
+        WHEN g_context = 0 THEN context
+        WHEN g_state = 0 THEN state
+    END, '') AS value,
+    COALESCE(CASE
+        WHEN g_student_gender = 0 AND g_field_of_interest = 0 THEN field_of_interest
+        WHEN g_student_gender = 0 AND g_language = 0 THEN language
+    END, '') AS value2,
+    count
+FROM (
+    SELECT
+        language, year_asked, student_gender, medium_language, student_class,
+        question_format, curriculum_followed, context, state, field_of_interest,
+        GROUPING(language) AS g_language,
+        GROUPING(year_asked) AS g_year_asked,
+        GROUPING(student_gender) AS g_student_gender,
+        GROUPING(medium_language) AS g_medium_language,
+        GROUPING(student_class) AS g_student_class,
+        GROUPING(question_format) AS g_question_format,
+        GROUPING(curriculum_followed) AS g_curriculum_followed,
+        GROUPING(context) AS g_context,
+        GROUPING(state) AS g_state,
+        GROUPING(field_of_interest) AS g_field_of_interest,
+        COUNT(*) AS count
+    FROM (
+        SELECT
+            language, student_gender, medium_language, student_class,
+            question_format, curriculum_followed, context, state,
+            field_of_interest,
+            EXTRACT(YEAR FROM question_asked_on)::integer::text AS year_asked
+        FROM question
+    ) AS questions
+    GROUP BY GROUPING SETS (
+        (language), (year_asked), (student_gender), (medium_language),
+        (student_class), (question_format), (curriculum_followed),
+        (context), (state),
+        (student_gender, field_of_interest), (student_gender, language),
+        ()
+    )
+) AS counts;
+
+-- required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX question_analytics_idx ON question_analytics (dimension, value, value2);
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0046_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            QUESTION_ANALYTICS_VIEW,
+            'DROP MATERIALIZED VIEW question_analytics;',
+        ),
+    ]
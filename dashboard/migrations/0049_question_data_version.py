@@ -0,0 +1,49 @@
+from django.db import migrations
+
+# Bump the question data version on every statement that changes the
+# analytics fields of questions, including bulk inserts and updates that
+# bypass Model.save(). Cached analytics are kept per version (see
+# dashboard.analytics.get_question_data_version).
+QUESTION_DATA_VERSION_TRIGGER = '''
+CREATE SEQUENCE question_data_version;
+
+CREATE FUNCTION question_data_version_bump() RETURNS trigger AS $$
+BEGIN
+    PERFORM nextval('question_data_version');
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER question_data_version_trigger
+    AFTER INSERT OR DELETE OR UPDATE OF
+        language, student_gender, field_of_interest, state,
+        curriculum_followed, medium_language, student_class,
+        question_format, context, question_asked_on
+    ON question
+    FOR EACH STATEMENT EXECUTE PROCEDURE question_data_version_bump();
+
+CREATE TRIGGER question_data_version_truncate_trigger
+    AFTER TRUNCATE ON question
+    FOR EACH STATEMENT EXECUTE PROCEDURE question_data_version_bump();
+'''
+
+DROP_QUESTION_DATA_VERSION_TRIGGER = '''
+DROP TRIGGER question_data_version_truncate_trigger ON question;
+DROP TRIGGER question_data_version_trigger ON question;
+DROP FUNCTION question_data_version_bump();
+DROP SEQUENCE question_data_version;
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0048_question_updated_on_idx'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            QUESTION_DATA_VERSION_TRIGGER,
+            DROP_QUESTION_DATA_VERSION_TRIGGER,
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+# Bump the question delete version on every statement that deletes
+# questions. The analytics cube only loads changed questions, by
+# updated_on, so it needs this to notice deletions (see
+# dashboard.analytics.get_question_delete_version).
+QUESTION_DELETE_VERSION_TRIGGER = '''
+CREATE SEQUENCE question_delete_version;
+
+CREATE FUNCTION question_delete_version_bump() RETURNS trigger AS $$
+BEGIN
+    PERFORM nextval('question_delete_version');
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER question_delete_version_trigger
+    AFTER DELETE ON question
+    FOR EACH STATEMENT EXECUTE PROCEDURE question_delete_version_bump();
+
+CREATE TRIGGER question_delete_version_truncate_trigger
+    AFTER TRUNCATE ON question
+    FOR EACH STATEMENT EXECUTE PROCEDURE question_delete_version_bump();
+'''
+
+DROP_QUESTION_DELETE_VERSION_TRIGGER = '''
+DROP TRIGGER question_delete_version_truncate_trigger ON question;
+DROP TRIGGER question_delete_version_trigger ON question;
+DROP FUNCTION question_delete_version_bump();
+DROP SEQUENCE question_delete_version;
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0049_question_data_version'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            QUESTION_DELETE_VERSION_TRIGGER,
+            DROP_QUESTION_DELETE_VERSION_TRIGGER,
+        ),
+    ]
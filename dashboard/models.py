@@ -1,7 +1,9 @@
 """Define the data models for all Sawaliram content"""
 
 import datetime
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.utils.http import urlencode
 
@@ -15,12 +17,17 @@ from dashboard.mixins.draftables import (
     DraftDraftableManager,
 )
 from dashboard.mixins.translations import (
+    TranslatableQuerySet,
     TranslationMixin,
     translatable,
 )
 from django.urls import reverse
 
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.contenttypes.fields import (
     GenericForeignKey,
     GenericRelation,
@@ -53,12 +60,145 @@ class Dataset(models.Model):
         return 'Dataset #{}'.format(self.id)
 
 
+class DatasetJob(models.Model):
+    """
+    Define the data model for background processing of uploaded Excel
+    sheets (validation, submission and curation of datasets).
+    """
+
+    class Meta:
+        db_table = 'dataset_job'
+
+    # Kinds
+
+    KIND_VALIDATE_NEW = 'validate-new'
+    KIND_VALIDATE_CURATED = 'validate-curated'
+    KIND_SUBMIT = 'submit'
+    KIND_CURATE = 'curate'
+
+    # Statuses
+
+    STATUS_QUEUED = 'queued'
+    STATUS_VALIDATING = 'validating'
+    STATUS_IMPORTING = 'importing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    kind = models.CharField(max_length=50)
+    status = models.CharField(max_length=50, default=STATUS_QUEUED)
+    excel_file = models.CharField(max_length=200, default='', blank=True)
+    rows_total = models.IntegerField(default=0)
+    rows_processed = models.IntegerField(default=0)
+    message = models.CharField(max_length=500, default='', blank=True)
+    # list of [heading, [error, ...]] pairs, in display order
+    errors = models.JSONField(default=list, blank=True)
+    dataset = models.ForeignKey(
+        'Dataset',
+        related_name='jobs',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True)
+    submitted_by = models.ForeignKey(
+        'sawaliram_auth.User',
+        related_name='dataset_jobs',
+        on_delete=models.CASCADE)
+    created_on = models.DateTimeField(auto_now_add=True)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    @property
+    def is_validation(self):
+        return self.kind in (self.KIND_VALIDATE_NEW, self.KIND_VALIDATE_CURATED)
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+    @property
+    def progress_cache_key(self):
+        return 'dataset_job_{}_progress'.format(self.id)
+
+    def set_status(self, status, **fields):
+        """
+        Update the status (and any other given fields) of the job
+        """
+
+        self.status = status
+        for field, value in fields.items():
+            setattr(self, field, value)
+        self.save()
+
+    def get_absolute_url(self):
+        return reverse('dashboard:dataset-job-status', kwargs={
+            'job_id': self.id,
+        })
+
+    def __str__(self):
+        return 'Dataset job #{} ({}, {})'.format(self.id, self.kind, self.status)
+
+
+class QuestionArchiveQuerySet(models.QuerySet):
+
+    # Fields copied from the archive to the curated question
+    ACCEPTED_FIELDS = [
+        'school',
+        'area',
+        'state',
+        'student_name',
+        'student_gender',
+        'student_class',
+        'question_text',
+        'question_text_english',
+        'question_format',
+        'language',
+        'contributor',
+        'contributor_role',
+        'context',
+        'medium_language',
+        'curriculum_followed',
+        'published',
+        'published_source',
+        'published_date',
+        'question_asked_on',
+        'notes',
+    ]
+
+    def accept(self, acceptor, chunk_size=500):
+        """
+        Move the archived questions to the Question table, curated by the
+        given acceptor (user).
+
+        Questions are moved in chunks, with one INSERT and one DELETE per
+        chunk, all in one transaction. Returns the number of questions
+        accepted.
+        """
+
+        accepted = 0
+
+        with transaction.atomic():
+            pks = list(self
+                .select_for_update()
+                .order_by('pk')
+                .values_list('pk', flat=True))
+
+            for start in range(0, len(pks), chunk_size):
+                chunk = QuestionArchive.objects.filter(pk__in=pks[start:start + chunk_size])
+                Question.objects.bulk_create([
+                    Question(curated_by=acceptor, **values)
+                    for values in chunk.values(*self.ACCEPTED_FIELDS)
+                ])
+                accepted += chunk.delete()[0]
+
+        return accepted
+
+
 class QuestionArchive(models.Model):
     """Define the data model for raw submissions by volunteers"""
 
     class Meta:
         db_table = 'question_archive'
 
+    objects = QuestionArchiveQuerySet.as_manager()
+
     school = models.CharField(max_length=100, blank=True)
     area = models.CharField(max_length=100, blank=True)
     state = models.CharField(max_length=100, default='', blank=True)
@@ -102,47 +242,88 @@ class QuestionArchive(models.Model):
         a Question one.
         """
 
-        q = Question()
-        q.school = self.school
-        q.area = self.area
-        q.state = self.state
-        q.student_name = self.student_name
-        q.student_gender = self.student_gender
-        q.student_class = self.student_class
-        q.question_text = self.question_text
-        q.question_text_english = self.question_text_english
-        q.question_format = self.question_format
-        q.language = self.language
-        q.contributor = self.contributor
-        q.contributor_role = self.contributor_role
-        q.context = self.context
-        q.medium_language = self.medium_language
-        q.curriculum_followed = self.curriculum_followed
-        q.published = self.published
-        q.published_source = self.published_source
-        q.published_date = self.published_date
-        q.question_asked_on = self.question_asked_on
-        q.notes = self.notes
-        q.created_on = self.created_on
-        q.updated_on = self.updated_on
-        q.submitted_by = self.submitted_by
-        q.curated_by = acceptor
-        try:
-            q.save()
-            self.delete()
-        except Exception as e:
-            print('Error accepting question: %s' % e)
+        QuestionArchive.objects.filter(pk=self.pk).accept(acceptor)
 
     def __str__(self):
         return 'Q{} (uncurated): {}'.format(self.id, self.question_text)
 
 
+class QuestionQuerySet(TranslatableQuerySet):
+
+    def update_counters(self):
+        """
+        Recount the answers and published translations of the questions
+        and store them in their counter fields, in one UPDATE. Returns
+        the number of questions updated.
+        """
+
+        def count_answers(status):
+            return Coalesce(
+                Subquery(Answer.objects
+                    .filter(question_id=OuterRef('pk'), status=status)
+                    .order_by()
+                    .values('question_id')
+                    .annotate(count=Count('id'))
+                    .values('count')),
+                0)
+
+        translation_languages = Coalesce(
+            Subquery(TranslatedQuestion.objects
+                .filter(source=OuterRef('pk'), status=TranslatedQuestion.STATUS_PUBLISHED)
+                .order_by()
+                .values('source')
+                .annotate(languages=ArrayAgg('language', distinct=True, ordering='language'))
+                .values('languages')),
+            Value([], output_field=ArrayField(models.CharField(max_length=100))))
+
+        return self.update(
+            published_answer_count=count_answers(Answer.STATUS_PUBLISHED),
+            submitted_answer_count=count_answers(Answer.STATUS_SUBMITTED),
+            published_translation_languages=translation_languages,
+        )
+
+
 @translatable
 class Question(models.Model):
     """Define the data model for questions curated by admins."""
 
     class Meta:
         db_table = 'question'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dataset_id', 'dataset_row'],
+                name='question_dataset_row_unique'),
+        ]
+        indexes = [
+            GinIndex(fields=['search_vector'], name='question_search_idx'),
+            # keyset pagination (see dashboard.pagination)
+            models.Index(fields=['created_on', 'id'], name='question_created_on_id_idx'),
+            # the default listing of Answer Questions
+            models.Index(
+                fields=['created_on', 'id'],
+                condition=models.Q(published_answer_count=0),
+                name='question_unanswered_idx'),
+            GinIndex(
+                fields=['published_translation_languages'],
+                name='question_translations_idx'),
+            # search filters, newest first
+            models.Index(fields=['field_of_interest', 'created_on'], name='question_subject_idx'),
+            models.Index(fields=['language', 'created_on'], name='question_language_idx'),
+            models.Index(fields=['state'], name='question_state_idx'),
+            models.Index(fields=['curriculum_followed'], name='question_curriculum_idx'),
+            # analytics counts
+            models.Index(fields=['student_gender', 'field_of_interest'], name='question_gender_subject_idx'),
+            models.Index(fields=['student_gender', 'language'], name='question_gender_language_idx'),
+            # incremental refresh of the analytics cube
+            models.Index(fields=['updated_on'], name='question_updated_on_idx'),
+        ] + [
+            # searches within one language only touch that language's rows
+            GinIndex(
+                fields=['search_vector'],
+                condition=models.Q(language=code),
+                name='question_search_%s_idx' % code)
+            for code, name in settings.CONTENT_LANGUAGES
+        ]
 
     translation_model = 'dashboard.PublishedTranslatedQuestion'
     translatable_fields = [
@@ -175,6 +356,8 @@ class Question(models.Model):
     question_asked_on = models.DateField(null=True, blank=True)
     notes = models.CharField(max_length=1000, default='', blank=True)
     dataset_id = models.CharField(max_length=100, default='', blank=True)
+    # row of the curated sheet the question was imported from
+    dataset_row = models.IntegerField(null=True, blank=True)
     created_on = models.DateTimeField(auto_now_add=True)
     updated_on = models.DateTimeField(auto_now=True)
     curated_by = models.ForeignKey(
@@ -200,10 +383,36 @@ class Question(models.Model):
     urban_or_rural = models.CharField(max_length=100, default='', blank=True)
     type_of_school = models.CharField(max_length=100, default='', blank=True)
     comments_on_coding_rationale = models.CharField(max_length=500, default='', blank=True)
+    # maintained by a database trigger, see dashboard.search
+    search_vector = SearchVectorField(null=True, editable=False)
+    # maintained by update_counters() wherever answers or translations
+    # change status; see also the rebuildquestioncounters command
+    published_answer_count = models.PositiveIntegerField(default=0, editable=False)
+    submitted_answer_count = models.PositiveIntegerField(default=0, editable=False)
+    published_translation_languages = ArrayField(
+        models.CharField(max_length=100),
+        default=list,
+        blank=True,
+        editable=False)
+
+    objects = QuestionQuerySet.as_manager()
 
     def __str__(self):
         return 'Q{}: {}'.format(self.id, self.question_text)
 
+    def update_counters(self):
+        """Recount the answers and published translations of the question"""
+
+        Question.objects.filter(pk=self.pk).update_counters()
+        self.refresh_from_db(fields=[
+            'published_answer_count',
+            'submitted_answer_count',
+            'published_translation_languages',
+        ])
+
+    def has_published_translation(self, language):
+        return language in self.published_translation_languages
+
 
 @translatable
 class Answer(models.Model):
@@ -220,6 +429,17 @@ class Answer(models.Model):
 
     class Meta:
         db_table = 'answer'
+        indexes = [
+            # answers of a question by status (counters, listings)
+            models.Index(fields=['question_id', 'status'], name='answer_question_status_idx'),
+            # answers of a user by status (profile, drafts)
+            models.Index(fields=['submitted_by', 'status'], name='answer_submitter_status_idx'),
+            # the review queue
+            models.Index(
+                fields=['question_id'],
+                condition=models.Q(status='submitted'),
+                name='answer_submitted_idx'),
+        ]
 
     answer_text = models.TextField()
     language = models.CharField(
@@ -249,6 +469,8 @@ class Answer(models.Model):
 
     comments = GenericRelation('dashboard.Comment')
 
+    objects = TranslatableQuerySet.as_manager()
+
     def __str__(self):
         '''Return unicode representation of this Answer'''
 
@@ -286,6 +508,18 @@ class AnswerTranslation(DraftableModel, TranslationMixin):
     Stores translated data for a given Answer
     '''
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['translated_by', 'status', 'language'],
+                name='answer_tr_translator_idx'),
+            # the review queue
+            models.Index(
+                fields=['-updated_on'],
+                condition=models.Q(status=DraftableModel.STATUS_SUBMITTED),
+                name='answer_tr_submitted_idx'),
+        ]
+
     # Where we're translating from
 
     source = models.ForeignKey(
@@ -578,6 +812,13 @@ class TranslatedQuestion(DraftableModel, TranslationMixin):
 
     class Meta:
         db_table = 'translated_question'
+        indexes = [
+            models.Index(
+                fields=['translated_by', 'status', 'language'],
+                name='question_tr_translator_idx'),
+            # the translation of a question in a language
+            models.Index(fields=['source', 'language'], name='question_tr_source_idx'),
+        ]
 
     # Where we're translating from
 
@@ -685,8 +926,20 @@ class Article(DraftableModel):
 
     comments = GenericRelation('dashboard.Comment')
 
+    # maintained by a database trigger, see dashboard.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         db_table = 'articles'
+        indexes = [
+            GinIndex(fields=['search_vector'], name='articles_search_idx'),
+        ] + [
+            GinIndex(
+                fields=['search_vector'],
+                condition=models.Q(language=code),
+                name='articles_search_%s_idx' % code)
+            for code, name in settings.CONTENT_LANGUAGES
+        ]
 
 
     def get_slug(self):
@@ -735,7 +988,7 @@ class SubmittedArticle(Article.get_submitted_model(), Article):
         })
 
 class PublishedArticle(Article.get_published_model(), Article):
-    objects = PublishedDraftableManager()
+    objects = PublishedDraftableManager.from_queryset(TranslatableQuerySet)()
     class Meta:
         proxy = True
 
@@ -744,6 +997,12 @@ class Comment(models.Model):
     Generic class for comments on any kind of model 🎉
     '''
 
+    class Meta:
+        indexes = [
+            # comments of a target, e.g. when counting them per answer
+            models.Index(fields=['content_type', 'object_id'], name='comment_target_idx'),
+        ]
+
     # Main field
     text = models.TextField()
 
@@ -782,6 +1041,18 @@ class ArticleTranslation(DraftableModel, TranslationMixin):
     Stores translated data for a given article
     '''
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['translated_by', 'status', 'language'],
+                name='article_tr_translator_idx'),
+            # the review queue
+            models.Index(
+                fields=['-updated_on'],
+                condition=models.Q(status=DraftableModel.STATUS_SUBMITTED),
+                name='article_tr_submitted_idx'),
+        ]
+
     # What we're translating
     source = models.ForeignKey(
         'Article',
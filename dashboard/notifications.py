@@ -0,0 +1,75 @@
+"""
+Sending a notification to many users at once.
+
+notify() takes the recipients as users or user IDs, including querysets
+of IDs like answer.comments.values_list('author', flat=True), which are
+resolved in one query. Each user gets the notification once, and all
+notifications are written with one INSERT. With background=True the
+notifications are created by a Celery task once the current transaction
+commits, so a request costs the same however many users are notified.
+If the task can't be queued, e.g. as the broker is down, they are
+created in the request instead.
+"""
+
+import logging
+
+from django.db import transaction
+from kombu.exceptions import OperationalError
+
+from sawaliram_auth.models import Notification
+
+logger = logging.getLogger(__name__)
+
+
+def get_user_ids(users):
+    """Return the set of IDs of some users or user IDs"""
+
+    user_ids = {getattr(user, 'pk', user) for user in users}
+    user_ids.discard(None)
+    return user_ids
+
+
+def notify(recipients, exclude=(), background=False, **fields):
+    """
+    Create a notification with the given fields for each of the
+    recipients that is not excluded. Returns the IDs of the users to be
+    notified.
+    """
+
+    user_ids = sorted(get_user_ids(recipients) - get_user_ids(exclude))
+    if not user_ids:
+        return user_ids
+
+    if background:
+        transaction.on_commit(lambda: create_notifications_in_background(user_ids, fields))
+    else:
+        create_notifications(user_ids, fields)
+
+    return user_ids
+
+
+def create_notifications(user_ids, fields):
+    """Create a notification with the given fields for each of the users"""
+
+    Notification.objects.bulk_create([
+        Notification(user_id=user_id, **fields)
+        for user_id in user_ids
+    ])
+    # bulk_create does not call Notification.save()
+    Notification.clear_count_cache(user_ids)
+
+
+def create_notifications_in_background(user_ids, fields):
+    """
+    Queue the creation of notifications, or create them now if the task
+    can't be queued
+    """
+
+    # imported here, as dashboard.tasks imports this module
+    from dashboard.tasks import createNotifications
+
+    try:
+        createNotifications.delay(user_ids, fields)
+    except OperationalError:
+        logger.exception('Could not queue notifications, creating them now')
+        create_notifications(user_ids, fields)
@@ -0,0 +1,299 @@
+"""
+Keyset (cursor) pagination for question listings.
+
+OFFSET paging reads and throws away every row before the requested page,
+so deep pages get slower linearly. Keyset pagination continues from the
+last row shown instead: rows are ordered by (created_on, id) and the next
+page is the first rows after that position, which an index on
+(created_on, id) finds directly. Page 500 costs the same as page 1.
+
+The position is passed around as an opaque, signed cursor token (see
+encode_cursor). The total is not needed to page; the search pages show
+the exact count that their facets query returns anyway.
+
+ResultCursor applies the same idea to stepping through the results of a
+listing one question at a time: the listing, its parameters and sort key
+are cached once, and the questions before and after the current one are
+found with keyset queries on the rebuilt listing.
+"""
+
+import copy
+import hashlib
+
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Q, Subquery
+from django.http import QueryDict
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+
+CURSOR_SALT = 'dashboard.pagination.cursor'
+
+# Sort orders of the search pages that can be paged by cursor, and
+# whether they are descending
+KEYSET_SORTS = {
+    'newest': True,
+    'oldest': False,
+}
+
+# Sort orders of the search pages as (field, descending) pairs, ending
+# with a unique field so that the order is total. Fields may also be
+# annotations, like the rank of search results.
+SORT_KEYS = {
+    'newest': [('created_on', True), ('id', True)],
+    'oldest': [('created_on', False), ('id', False)],
+    'comments': [('comment_count', False), ('id', False)],
+    'relevance': [('rank', True), ('id', True)],
+    'date': [('published_date', False), ('id', False)],
+}
+
+RESULT_CURSOR_TIMEOUT = 60 * 60 * 24
+
+
+def encode_cursor(row, direction, start_index):
+    """
+    Return a token for continuing from a row. `direction` is 'next' for
+    the rows after it and 'previous' for the rows before it; start_index
+    is the position of the first row of the page the token leads to.
+    """
+
+    return signing.dumps(
+        [row.created_on.isoformat(), row.pk, direction, start_index],
+        salt=CURSOR_SALT,
+        compress=True,
+    )
+
+
+def decode_cursor(token):
+    """
+    Return the ((created_on, id), direction, start_index) of a cursor
+    token, or None if the token is invalid
+    """
+
+    try:
+        created_on, pk, direction, start_index = signing.loads(token, salt=CURSOR_SALT)
+        created_on = parse_datetime(created_on)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+
+    if created_on is None or direction not in ('next', 'previous'):
+        return None
+
+    return (created_on, pk), direction, start_index
+
+
+class KeysetPage:
+    """A page of rows, with the tokens to the pages around it"""
+
+    def __init__(self, object_list, paginator, start_index, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.has_next_page = has_next
+        self.has_previous_page = has_previous
+        # 1-based position of the first row
+        self.start_index = start_index
+
+    def __repr__(self):
+        return '<Page starting at {}>'.format(self.start_index)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    @property
+    def end_index(self):
+        return self.start_index + len(self.object_list) - 1
+
+    @property
+    def next_cursor(self):
+        if not self.has_next_page:
+            return None
+        return encode_cursor(self.object_list[-1], 'next', self.end_index + 1)
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous_page:
+            return None
+        return encode_cursor(
+            self.object_list[0],
+            'previous',
+            max(self.start_index - self.paginator.per_page, 1))
+
+
+class KeysetPaginator:
+    """
+    Page through a queryset ordered by (created_on, id), newest first
+    unless descending is False
+    """
+
+    def __init__(self, object_list, per_page, descending=True):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.descending = descending
+
+    def get_page(self, cursor=None):
+        """
+        Return the page a cursor token leads to. The first page is
+        returned when there is no cursor, or it is invalid.
+        """
+
+        decoded = decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            position, direction, start_index = None, 'next', 1
+        else:
+            position, direction, start_index = decoded
+
+        forward = direction == 'next'
+
+        # rows are fetched walking away from the position, so going back
+        # means reading in reverse order
+        sort_key = SORT_KEYS['newest' if self.descending else 'oldest']
+        rows = self.object_list.order_by(*get_ordering(sort_key, reverse=not forward))
+
+        if position is not None:
+            created_on, pk = position
+            ascending = forward != self.descending
+            rows = rows.filter(
+                get_keyset_filter(sort_key, {'created_on': created_on, 'id': pk}, not forward),
+                # redundant, but lets the (created_on, id) index be scanned
+                # from the position on
+                **{'created_on__gte' if ascending else 'created_on__lte': created_on})
+
+        # fetch one row more to know whether there is a page beyond
+        object_list = list(rows[:self.per_page + 1])
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+
+        if forward:
+            has_next, has_previous = has_more, position is not None
+        else:
+            object_list.reverse()
+            has_next, has_previous = position is not None, has_more
+            if not has_previous:
+                # back on the first page
+                start_index = 1
+
+        return KeysetPage(object_list, self, start_index, has_next, has_previous)
+
+
+def get_ordering(sort_key, reverse=False):
+    """Return the order_by() arguments for a sort key"""
+
+    return [
+        ('-' if descending != reverse else '') + field
+        for field, descending in sort_key
+    ]
+
+
+def get_keyset_filter(sort_key, values, reverse=False):
+    """
+    Return the condition for the rows after the given values of a sort
+    key, or before them if reverse is True. Values can be expressions.
+    """
+
+    condition = Q()
+    for position, (field, descending) in reversed(list(enumerate(sort_key))):
+        lookup = 'lt' if descending != reverse else 'gt'
+        beyond = Q(**{field + '__' + lookup: values[field]})
+        if position == len(sort_key) - 1:
+            condition = beyond
+        else:
+            # ties on this field are broken by the following ones
+            condition = beyond | (Q(**{field: values[field]}) & condition)
+
+    return condition
+
+
+class ResultCursor:
+    """
+    The results of a listing of questions, for stepping through them one
+    at a time (e.g. with the Prev/Next buttons of Submit Answer).
+
+    Only the listing view, its parameters and the sort key are kept, in
+    the cache, under a key derived from them, so users browsing the same
+    listing share one entry and sessions only need to hold the key. The
+    results are rebuilt from them with the listing's get_questions(), so
+    nothing in the cache depends on the internals of Django's queries.
+    """
+
+    def __init__(self, queryset, sort_key):
+        self.queryset = queryset
+        self.sort_key = sort_key
+
+    @classmethod
+    def save(cls, listing, params, sort_key):
+        """
+        Cache the parameters of a listing (a SearchView) and return their
+        key
+        """
+
+        saved = (
+            type(listing).__module__ + '.' + type(listing).__qualname__,
+            params.urlencode(),
+            listing.similar_search,
+            sort_key,
+        )
+
+        key = 'result_cursor_' + hashlib.md5(repr(saved).encode('utf-8')).hexdigest()
+
+        cache.set(key, saved, RESULT_CURSOR_TIMEOUT)
+        return key
+
+    @classmethod
+    def load(cls, key, request):
+        """
+        Return the saved results under a key, for the user of a request,
+        or None if they expired
+        """
+
+        saved = cache.get(key)
+        if saved is None:
+            return None
+
+        path, params, similar_search, sort_key = saved
+
+        listing_request = copy.copy(request)
+        listing_request.GET = QueryDict(params)
+
+        listing = import_string(path)()
+        listing.similar_search = similar_search
+        queryset = listing.get_questions(listing_request)
+
+        return cls(queryset, [tuple(item) for item in sort_key])
+
+    def get_neighbours(self, pk):
+        """
+        Return the IDs of the results before and after the one with the
+        given ID; either is None at the ends of the results, and both are
+        None if the ID is not one of the results
+        """
+
+        # compare with the values of the current row in the database, as
+        # some (like a float4 rank) don't survive a round trip to Python
+        current = self.queryset.filter(pk=pk)
+        values = {
+            field: Subquery(current.values(field)[:1])
+            for field, descending in self.sort_key
+        }
+
+        previous_id, next_id = [
+            self.queryset
+                .filter(get_keyset_filter(self.sort_key, values, reverse))
+                .order_by(*get_ordering(self.sort_key, reverse))
+                .values_list('id', flat=True)
+                .first()
+            for reverse in (True, False)
+        ]
+
+        return previous_id, next_id
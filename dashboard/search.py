@@ -0,0 +1,149 @@
+"""
+Full-text search over questions and articles.
+
+Both tables keep a weighted search_vector column that is maintained by a
+database trigger (see migrations 0040 and 0041) and indexed with GIN:
+
+    Question: question text (A), field of interest (B),
+              school/area/state (C), publication name (D)
+    Article:  title (A), body (B)
+
+Each row is tokenised with the text search configuration of its
+language (SEARCH_CONFIGS), except for the English translation and the
+field of interest of questions, which are always tokenised in English.
+There is also one partial index per content
+language, so a search within a single language only reads that
+language's rows. When the text search finds nothing, and pg_trgm is
+installed, the search pages search again with similar=True, which
+matches questions and articles by trigram similarity instead.
+
+autocomplete() suggests English question texts for what has been typed
+so far, using a trigram index when pg_trgm is installed and a prefix
+index otherwise (see migration 0042).
+"""
+
+import functools
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramSimilarity,
+)
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.functions import Length
+
+from dashboard.models import Question, Article
+
+# Text search configuration per content language. Must match the
+# sawaliram_search_config() database function.
+SEARCH_CONFIGS = {
+    'en': 'english',
+    'english': 'english',
+}
+DEFAULT_SEARCH_CONFIG = 'simple'
+
+# Models with columns tokenised in English whatever the row's language
+# (see migration 0041)
+ENGLISH_COLUMN_MODELS = {Question}
+
+# Field matched by trigram similarity when the text search finds nothing
+TRIGRAM_FIELDS = {
+    Question: 'question_text',
+    Article: 'title',
+}
+
+
+def get_search_config(language):
+    """Return the text search configuration used for a language"""
+
+    return SEARCH_CONFIGS.get(language, DEFAULT_SEARCH_CONFIG)
+
+
+@functools.lru_cache(maxsize=None)
+def trigram_available():
+    """Return True if the pg_trgm extension is installed"""
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def get_search_query(query_text, language=None, model=None):
+    """
+    Return the query to match search vectors with. Without a language,
+    the text is looked up with every configuration in use. With one, it
+    is looked up with the language's configuration, and in English too
+    if the model has columns tokenised in English.
+    """
+
+    if language:
+        config = get_search_config(language)
+        query = SearchQuery(query_text, config=config)
+        if model in ENGLISH_COLUMN_MODELS and config != 'english':
+            query = query | SearchQuery(query_text, config='english')
+        return query
+
+    configs = sorted(set(SEARCH_CONFIGS.values()) | {DEFAULT_SEARCH_CONFIG})
+    query = SearchQuery(query_text, config=configs[0])
+    for config in configs[1:]:
+        query = query | SearchQuery(query_text, config=config)
+    return query
+
+
+def search(queryset, query_text, language=None, similar=False):
+    """
+    Filter a Question or Article queryset to the rows matching the query
+    (or whose ID is the query) and order them by relevance.
+
+    If a language is given, only rows in that language are searched.
+    With similar=True, rows are matched by the trigram similarity of
+    their TRIGRAM_FIELDS instead, for when the text search finds nothing
+    (only if trigram_available()).
+    """
+
+    if language:
+        queryset = queryset.filter(language=language)
+
+    if similar:
+        field = TRIGRAM_FIELDS[queryset.model._meta.concrete_model]
+        return queryset \
+            .filter(**{field + '__trigram_similar': query_text}) \
+            .annotate(rank=TrigramSimilarity(field, query_text)) \
+            .order_by('-rank', '-pk')
+
+    query = get_search_query(query_text, language, queryset.model._meta.concrete_model)
+    return queryset \
+        .filter(Q(pk__iexact=query_text) | Q(search_vector=query)) \
+        .annotate(rank=SearchRank(F('search_vector'), query)) \
+        .order_by('-rank', '-pk')
+
+
+def autocomplete(text, limit=8):
+    """
+    Return up to `limit` distinct English question texts that contain
+    the given text (or, without pg_trgm, start with it), best matches
+    first
+    """
+
+    questions = Question.objects.exclude(question_text_english='')
+
+    if trigram_available():
+        questions = questions \
+            .filter(question_text_english__icontains=text) \
+            .annotate(rank=TrigramSimilarity('question_text_english', text)) \
+            .order_by('-rank', '-pk')
+    else:
+        questions = questions \
+            .filter(question_text_english__istartswith=text) \
+            .order_by(Length('question_text_english'), '-pk')
+
+    suggestions = []
+    # over-fetch a little, as some questions share the same text
+    for question_text in questions.values_list('question_text_english', flat=True)[:limit * 2]:
+        if question_text not in suggestions:
+            suggestions.append(question_text)
+        if len(suggestions) == limit:
+            break
+
+    return suggestions
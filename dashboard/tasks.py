@@ -7,11 +7,19 @@ from sawaliram_auth.models import (
 )
 from dashboard.models import (
     Dataset,
+    DatasetJob,
     SubmittedArticle,
     PublishedArticle,
     Question,
     Answer
 )
+from dashboard.jobs import run_dataset_job, get_uncurated_sheet
+from dashboard.analytics import (
+    queue_question_analytics_refresh,
+    refresh_question_analytics,
+    warm_analytics_page_cache,
+)
+from dashboard.notifications import notify
 
 
 @shared_task
@@ -24,7 +32,7 @@ def updateDashboardTasksStats():
     cache.set('pending_access_requests', VolunteerRequest.objects.filter(status='pending').count())
     cache.set('new_datasets', Dataset.objects.filter(status='new').count())
     cache.set('submitted_articles', SubmittedArticle.objects.count())
-    cache.set('unanswered_questions', Question.objects.exclude(answers__status='published').count())
+    cache.set('unanswered_questions', Question.objects.filter(published_answer_count=0).count())
     cache.set('unreviewed_answers', Answer.objects.filter(status='submitted').count())
     cache.set('total_questions', Question.objects.count())
     cache.set('published_articles', PublishedArticle.objects.count())
@@ -34,3 +42,54 @@ def updateDashboardTasksStats():
         Answer.objects.filter(status='submitted').count() +
         PublishedArticle.objects.count()
     )
+
+
+@shared_task
+def processDatasetJob(job_id):
+    """
+    Validate and import the Excel sheet of a queued dataset job
+    """
+
+    job = DatasetJob.objects.get(id=job_id)
+
+    try:
+        run_dataset_job(job)
+    except Exception as e:
+        job.set_status(DatasetJob.STATUS_FAILED, message=str(e)[:500])
+        raise
+
+    if job.kind == DatasetJob.KIND_SUBMIT and job.status == DatasetJob.STATUS_DONE:
+        generateUncuratedSheet.delay(job.dataset_id)
+
+    if job.kind == DatasetJob.KIND_CURATE and job.status == DatasetJob.STATUS_DONE:
+        queue_question_analytics_refresh()
+
+
+@shared_task
+def generateUncuratedSheet(dataset_id):
+    """
+    Generate the curation sheet of a submitted dataset ahead of its
+    first download
+    """
+
+    get_uncurated_sheet(Dataset.objects.get(id=dataset_id))
+
+
+@shared_task
+def refreshQuestionAnalytics():
+    """
+    Recount the questions shown on the analytics page and cache the
+    page in every language
+    """
+
+    refresh_question_analytics()
+    warm_analytics_page_cache()
+
+
+@shared_task
+def createNotifications(user_ids, fields):
+    """
+    Create a notification with the given fields for each of the users
+    """
+
+    notify(user_ids, **fields)
@@ -2,10 +2,9 @@
 Defines a custom filter to check if a User belongs to a Group or not
 """
 from django import template
-from django.contrib.auth.models import Group
 
 register = template.Library()
 
 @register.filter(name='has_group')
 def has_group(user, group_name):
-    return user.groups.filter(name=group_name).exists()
\ No newline at end of file
+    return user.is_authenticated and user.has_group(group_name)
\ No newline at end of file
@@ -1,6 +1,78 @@
-from django.test import TestCase
+import datetime
+import io
+import os
+import tempfile
+from unittest import mock
+
+import pandas as pd
+from kombu.exceptions import OperationalError
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.contrib.auth.models import Group
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.http import QueryDict
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import translation
 from dashboard.models import *
+from dashboard.excel import iter_rows
+from dashboard.search import search, autocomplete, trigram_available
+from dashboard.facets import get_facets, CountedPaginator
+from dashboard.analytics import (
+    QuestionCube,
+    get_analytics_page_cache_key,
+    get_question_analytics,
+    get_question_data_version,
+    queue_question_analytics_refresh,
+    refresh_question_analytics,
+)
+from dashboard.pagination import (
+    SORT_KEYS,
+    KeysetPaginator,
+    ResultCursor,
+)
+from dashboard.ingestion import ingest_submitted_questions, curate_dataset
+from dashboard.jobs import run_dataset_job, get_uncurated_sheet, queue_dataset_job
+from dashboard.notifications import notify
+from dashboard.tasks import createNotifications, processDatasetJob, refreshQuestionAnalytics
+from dashboard.validation import (
+    NEW_SHEET_COLUMNS,
+    CURATED_SHEET_COLUMNS,
+    validate_curated_sheet,
+)
+from dashboard.views import AnswerQuestions
 from sawaliram_auth.models import User
+
+
+def write_excel_file(testcase, excel_sheet):
+    """Save a DataFrame as a temporary .xlsx file and return its path"""
+
+    excel_file = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
+
+    def remove():
+        # dataset jobs delete their file themselves
+        if os.path.exists(excel_file.name):
+            os.remove(excel_file.name)
+
+    testcase.addCleanup(remove)
+    excel_sheet.to_excel(excel_file.name, index=False)
+    return excel_file.name
+
+
+def create_user(first_name='Hugin'):
+    """Create a user with a test email address made from the first name"""
+
+    return User.objects.create_user(
+        first_name=first_name,
+        last_name='Hrafna',
+        organisation='Familiars of Odin',
+        email='{}@hrafnaguo.god'.format(first_name.lower()),
+        password='pass',
+    )
+
+
 class ArticleTranslationTests(TestCase):
     '''
     Check translations functionality of Articles, Questions and Answers.
@@ -189,3 +261,1052 @@ class QuestionTranslationTestCase(TestCase):
             set(dict(a.list_available_languages())),
             set(('en', 'bn'))
         )
+
+class SubmittedQuestionsIngestionTestCase(TestCase):
+    '''
+    Check that uploaded sheets are cleaned and saved to the archive
+    '''
+
+    def setUp(self):
+        self.user = create_user()
+
+        self.excel_sheet = pd.DataFrame({
+            'Question': [' Why is the sky blue? ', float('nan'), 'Why do cats purr?'],
+            'Question Language': ['en', 'en', 'en'],
+            'Context': ['Classroom', 'Classroom', float('nan')],
+            'Published (Yes/No)': ['Yes', 'No', float('nan')],
+            'Publication Name ': ['Chakmak', float('nan'), float('nan')],
+            'Student Class': [7, 8, float('nan')],
+        })
+
+    def test_ingest_submitted_questions(self):
+        dataset, report = ingest_submitted_questions(
+            iter_rows(write_excel_file(self, self.excel_sheet)),
+            self.user,
+            chunk_size=1,
+        )
+
+        self.assertEqual(dataset.status, 'new')
+        self.assertEqual(dataset.question_count, 3)
+        self.assertEqual(report.rows, 2)
+        self.assertEqual(QuestionArchive.objects.count(), 2)
+
+        first, second = QuestionArchive.objects.order_by('id')
+        self.assertEqual(first.question_text, 'Why is the sky blue?')
+        self.assertEqual(first.published_source, 'Chakmak')
+        self.assertEqual(first.student_class, '7')
+        self.assertTrue(first.published)
+        self.assertEqual(second.context, '')
+        self.assertFalse(second.published)
+        self.assertEqual(second.submitted_by, self.user)
+
+
+class DatasetJobTestCase(TestCase):
+    '''
+    Check that queued dataset jobs validate their sheet and record the result
+    '''
+
+    def setUp(self):
+        self.user = create_user()
+
+    def create_job(self, excel_sheet):
+        return DatasetJob.objects.create(
+            kind=DatasetJob.KIND_VALIDATE_NEW,
+            excel_file=write_excel_file(self, excel_sheet),
+            submitted_by=self.user,
+        )
+
+    def test_validation_job_records_row_errors(self):
+        excel_sheet = pd.DataFrame(columns=NEW_SHEET_COLUMNS)
+        excel_sheet['Question'] = ['Why is the sky blue?', 'Why do cats purr?']
+        excel_sheet['Question Language'] = ['en', 'en']
+        excel_sheet['Context'] = ['Classroom', float('nan')]
+        excel_sheet['Contributor Name'] = ['Munin', 'Munin']
+
+        job = run_dataset_job(self.create_job(excel_sheet))
+
+        self.assertEqual(job.status, DatasetJob.STATUS_DONE)
+        self.assertEqual(job.rows_total, 2)
+        self.assertEqual(
+            dict(job.errors),
+            {'Row #2': ['Context field cannot be empty.']})
+
+    def test_validation_job_without_errors(self):
+        excel_sheet = pd.DataFrame(columns=NEW_SHEET_COLUMNS)
+        excel_sheet['Question'] = ['Why is the sky blue?']
+        excel_sheet['Question Language'] = ['en']
+        excel_sheet['Context'] = ['Classroom']
+        excel_sheet['Contributor Name'] = ['Munin']
+
+        job = run_dataset_job(self.create_job(excel_sheet))
+
+        self.assertEqual(job.status, DatasetJob.STATUS_DONE)
+        self.assertEqual(job.errors, [])
+        self.assertEqual(job.rows_processed, 1)
+        # the uploaded file is not kept once the job is done
+        self.assertFalse(os.path.exists(job.excel_file))
+
+    def test_queue_without_broker(self):
+        job = self.create_job(pd.DataFrame(columns=NEW_SHEET_COLUMNS))
+
+        with mock.patch.object(processDatasetJob, 'delay', side_effect=OperationalError):
+            with self.assertLogs('dashboard.jobs', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    queue_dataset_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, DatasetJob.STATUS_FAILED)
+        self.assertTrue(job.message)
+        self.assertFalse(os.path.exists(job.excel_file))
+
+
+class ExcelValidationTestCase(TestCase):
+    '''
+    Check that the validation rules group their errors by row
+    '''
+
+    def test_validate_curated_sheet(self):
+        valid_row = {column: 'x' for column in CURATED_SHEET_COLUMNS}
+        valid_row['Question Language'] = 'en'
+        valid_row['Published (Yes/No)'] = 'No'
+
+        rows = [
+            dict(valid_row, _row=1),
+            dict(valid_row, _row=2, **{'Question Language': 'English', 'Field of Interest': None}),
+            dict(valid_row, _row=3, **{'Question Language': None}),
+            dict(valid_row, _row=4, **{'Published (Yes/No)': 'Yes', 'Publication Name': None}),
+        ]
+
+        errors = validate_curated_sheet(CURATED_SHEET_COLUMNS, iter(rows))
+
+        self.assertEqual(errors, [
+            ('Row #2', [
+                'Question Language must be an ISO 639-1 code.',
+                'Field of Interest cannot be empty.',
+            ]),
+            ('Row #3', ['Question Language field cannot be empty.']),
+            ('Row #4', ['If the question was published, you must mention the publication name.']),
+        ])
+
+    def test_curated_sheet_with_bad_template(self):
+        header = [column for column in CURATED_SHEET_COLUMNS if column != 'Context']
+        rows = [
+            dict({column: 'x' for column in header}, _row=1, **{
+                'Question Language': 'en',
+                'Field of Interest': None,
+            }),
+        ]
+
+        errors = validate_curated_sheet(header, iter(rows))
+
+        # the rows are still checked, by the rules on the columns present
+        self.assertEqual(errors, [
+            ('Problem(s) with the template:', [
+                'The columns of the Excel template are modified. Please use the standard template!',
+            ]),
+            ('Row #1', ['Field of Interest cannot be empty.']),
+        ])
+
+
+class QuestionArchiveAcceptTestCase(TestCase):
+    '''
+    Check that archived questions are moved to the Question table in bulk
+    '''
+
+    def setUp(self):
+        self.user = create_user()
+
+        for text in ['Why is the sky blue?', 'Why do cats purr?', 'Why is the sea salty?']:
+            QuestionArchive.objects.create(
+                question_text=text,
+                language='en',
+                published=True,
+                submitted_by=self.user,
+            )
+
+    def test_accept(self):
+        accepted = QuestionArchive.objects.exclude(
+            question_text='Why is the sea salty?').accept(self.user, chunk_size=1)
+
+        self.assertEqual(accepted, 2)
+        self.assertEqual(QuestionArchive.objects.count(), 1)
+        self.assertEqual(
+            set(Question.objects.values_list('question_text', flat=True)),
+            {'Why is the sky blue?', 'Why do cats purr?'})
+        self.assertTrue(all(q.published and q.curated_by == self.user
+                            for q in Question.objects.all()))
+
+
+class CurateDatasetTestCase(TestCase):
+    '''
+    Check that curated sheets are imported in chunks and can be imported again
+    '''
+
+    def setUp(self):
+        self.user = create_user()
+        self.dataset = Dataset.objects.create(submitted_by=self.user, status='new')
+
+    def curate(self, fields_of_interest):
+        excel_sheet = pd.DataFrame({
+            'Question': ['Why is the sky blue?', 'Why do cats purr?', 'Why is the sea salty?'],
+            'Question Language': ['en', 'en', 'en'],
+            'Published (Yes/No)': ['Yes', 'No', 'No'],
+            'Field of Interest': fields_of_interest,
+            'dataset_id': [self.dataset.id] * 3,
+        })
+        return curate_dataset(
+            iter_rows(write_excel_file(self, excel_sheet)),
+            self.dataset,
+            self.user,
+            chunk_size=2,
+        )
+
+    def test_curate_dataset_upserts(self):
+        report = self.curate(['Physics', 'Biology', 'History-Philosophy & Practice of Science'])
+
+        self.assertEqual(report.rows, 3)
+        self.assertEqual([rows for rows, seconds in report.chunks], [2, 1])
+        self.assertEqual(Dataset.objects.get(id=self.dataset.id).status, 'curated')
+        self.assertEqual(
+            Question.objects.get(dataset_row=3).field_of_interest,
+            'History, Philosophy & Practice of Science')
+
+        report = self.curate(['Physics', 'Zoology', 'Chemistry'])
+
+        self.assertEqual(Question.objects.count(), 3)
+        self.assertEqual(
+            list(Question.objects.order_by('dataset_row').values_list('field_of_interest', flat=True)),
+            ['Physics', 'Zoology', 'Chemistry'])
+        self.assertTrue(Question.objects.get(dataset_row=1).published)
+        # the unchanged first row is left as it is
+        self.assertEqual(report.overwritten_rows, [2, 3])
+
+    def test_curate_unchanged_sheet_another_day(self):
+        self.curate(['Physics', 'Biology', 'Chemistry'])
+
+        # empty cells, like the Publication Date, would get the defaults
+        # of the day of the new import
+        published_date = Question._meta.get_field('published_date')
+        with mock.patch.object(published_date, '_get_default', lambda: datetime.date(2030, 1, 1)):
+            report = self.curate(['Physics', 'Biology', 'Chemistry'])
+
+        self.assertEqual(report.overwritten_rows, [])
+        self.assertFalse(Question.objects.filter(published_date=datetime.date(2030, 1, 1)).exists())
+
+    def test_curate_job_rejects_unkeyed_questions(self):
+        # curated before questions were keyed on their sheet row
+        Question.objects.create(
+            question_text='Why is the sky blue?',
+            dataset_id=str(self.dataset.id),
+            curated_by=self.user)
+        self.dataset.status = 'curated'
+        self.dataset.save()
+
+        excel_sheet = pd.DataFrame(columns=CURATED_SHEET_COLUMNS)
+        excel_sheet['Question'] = ['Why is the sky blue?']
+        excel_sheet['Question Language'] = ['en']
+        excel_sheet['Context'] = ['Classroom']
+        excel_sheet['Contributor Name'] = ['Munin']
+        excel_sheet['Field of Interest'] = ['Physics']
+        excel_sheet['dataset_id'] = [self.dataset.id]
+
+        job = run_dataset_job(DatasetJob.objects.create(
+            kind=DatasetJob.KIND_CURATE,
+            excel_file=write_excel_file(self, excel_sheet),
+            submitted_by=self.user))
+
+        self.assertEqual(job.status, DatasetJob.STATUS_FAILED)
+        self.assertIn('already curated', job.message)
+        self.assertEqual(Question.objects.count(), 1)
+
+
+class UncuratedSheetTestCase(TestCase):
+    '''
+    Check that the curation sheet is generated from the raw copy and kept
+    '''
+
+    def setUp(self):
+        submissions_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(submissions_dir.cleanup)
+        os.makedirs(os.path.join(submissions_dir.name, 'raw'))
+        os.makedirs(os.path.join(submissions_dir.name, 'uncurated'))
+
+        patcher = mock.patch('dashboard.jobs.SUBMISSIONS_DIR', submissions_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        user = create_user()
+        self.dataset = Dataset.objects.create(submitted_by=user, status='new')
+
+        pd.DataFrame({
+            'Question': ['Why is the sky blue?', 'Why do cats purr?'],
+            'Question Language': ['en', 'en'],
+        }).to_excel(
+            os.path.join(submissions_dir.name, 'raw', 'dataset_{}_raw.xlsx'.format(self.dataset.id)),
+            index=False)
+
+    def test_get_uncurated_sheet(self):
+        path = get_uncurated_sheet(self.dataset)
+        modified = os.path.getmtime(path)
+
+        excel_sheet = pd.read_excel(path)
+        self.assertEqual(
+            list(excel_sheet),
+            ['Question', 'Question Language', 'Field of Interest', 'dataset_id'])
+        self.assertEqual(list(excel_sheet['dataset_id']), [self.dataset.id] * 2)
+
+        self.assertEqual(get_uncurated_sheet(self.dataset), path)
+        self.assertEqual(os.path.getmtime(path), modified)
+
+
+class SearchTestCase(TestCase):
+    '''
+    Check that search vectors are kept up to date and ranked by field weight
+    '''
+
+    def setUp(self):
+        self.user = create_user()
+
+    def test_search_questions(self):
+        by_school = Question.objects.create(
+            question_text='Why do cats purr?',
+            school='Rainbow School',
+            curated_by=self.user)
+        by_text = Question.objects.create(
+            question_text='Why is the rainbow curved?',
+            curated_by=self.user)
+        Question.objects.create(
+            question_text='Why is the sea salty?',
+            curated_by=self.user)
+
+        self.assertEqual(
+            list(search(Question.objects.all(), 'rainbow')),
+            [by_text, by_school])
+
+        Question.objects.filter(pk=by_school.pk).update(school='')
+        self.assertEqual(list(search(Question.objects.all(), 'rainbow')), [by_text])
+
+    def test_search_by_language(self):
+        english = Question.objects.create(
+            question_text='Why do cats purr?',
+            language='en',
+            curated_by=self.user)
+        hindi = Question.objects.create(
+            question_text='आसमान नीला क्यों है?',
+            question_text_english='Why is the sky blue?',
+            language='hi',
+            curated_by=self.user)
+
+        self.assertEqual(list(search(Question.objects.all(), 'cat')), [english])
+        self.assertEqual(list(search(Question.objects.all(), 'आसमान')), [hindi])
+        self.assertEqual(list(search(Question.objects.all(), 'sky', 'hi')), [hindi])
+        self.assertEqual(list(search(Question.objects.all(), 'cat', 'hi')), [])
+        self.assertEqual(list(search(Question.objects.all(), 'आसमान', 'hi')), [hindi])
+        self.assertEqual(list(search(Question.objects.all(), 'आसमान', 'en')), [])
+        # the English translation is stemmed in English in every language
+        self.assertEqual(list(search(Question.objects.all(), 'skies', 'hi')), [hindi])
+
+    def test_similar_search(self):
+        if not trigram_available():
+            self.skipTest('pg_trgm is not installed')
+
+        rainbow = Question.objects.create(
+            question_text='Why is the rainbow curved?',
+            language='en',
+            curated_by=self.user)
+
+        self.assertEqual(list(search(Question.objects.all(), 'rainbw')), [])
+        self.assertEqual(list(search(Question.objects.all(), 'rainbw', similar=True)), [rainbow])
+
+        # the search page falls back to similar words when nothing matches
+        response = self.client.get('/search', {'q': 'rainbw'}, secure=True)
+        self.assertEqual(list(response.context['questions']), [rainbow])
+
+    def test_autocomplete(self):
+        for text in ['Why is the sky blue?', 'Why is the sky blue?', 'Why is the sea salty?', 'How do birds fly?']:
+            Question.objects.create(question_text_english=text, curated_by=self.user)
+
+        self.assertCountEqual(
+            autocomplete('why is the s'),
+            ['Why is the sea salty?', 'Why is the sky blue?'])
+        self.assertEqual(len(autocomplete('why', limit=1)), 1)
+        self.assertEqual(autocomplete('how do'), ['How do birds fly?'])
+
+
+class FacetsTestCase(TestCase):
+    '''
+    Check that facet values, counts and totals come from one query
+    '''
+
+    def setUp(self):
+        user = create_user()
+
+        for language, state in [('en', 'Goa'), ('en', 'Kerala'), ('hi', 'Goa'), ('ml', 'Kerala')]:
+            Question.objects.create(
+                question_text='Why?',
+                language=language,
+                state=state,
+                field_of_interest='Physics',
+                curated_by=user)
+
+    def test_get_facets(self):
+        with self.assertNumQueries(1):
+            facets = get_facets(Question.objects.all(), {'language': ['en', 'hi'], 'state': ['Goa']})
+
+        self.assertEqual(facets.total, 4)
+        self.assertEqual(facets.filtered_total, 2)
+        self.assertEqual(facets.counts['language'], {'en': 2, 'hi': 1, 'ml': 1})
+        self.assertEqual(facets.counts['state'], {'Goa': 2, 'Kerala': 2})
+        self.assertEqual(facets.values('field_of_interest'), ['Physics'])
+        self.assertEqual(facets.values('curriculum_followed'), [])
+
+    def test_counted_paginator_corrects_count(self):
+        questions = Question.objects.order_by('id')
+
+        # questions were added since they were counted
+        paginator = CountedPaginator(questions, 3, 2)
+        page = paginator.get_page(1)
+        self.assertEqual(len(page), 3)
+        self.assertTrue(page.has_next())
+        self.assertEqual(len(paginator.get_page(2)), 1)
+        self.assertEqual(paginator.count, 4)
+
+        # questions were deleted since they were counted
+        paginator = CountedPaginator(questions, 2, 9)
+        page = paginator.get_page(4)
+        self.assertEqual(page.number, 2)
+        self.assertEqual(paginator.count, 4)
+        self.assertFalse(page.has_next())
+
+
+class KeysetPaginationTestCase(TestCase):
+    '''
+    Check that questions can be paged through by cursor
+    '''
+
+    def setUp(self):
+        user = create_user()
+
+        for number in range(23):
+            Question.objects.create(
+                question_text='Question %s' % number,
+                language='en',
+                curated_by=user)
+
+    def test_page_forward_and_back(self):
+        ordered_ids = list(Question.objects.order_by('-created_on', '-id').values_list('id', flat=True))
+        paginator = KeysetPaginator(Question.objects.all(), 10)
+
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            with self.assertNumQueries(1):
+                pages.append(paginator.get_page(pages[-1].next_cursor))
+
+        self.assertEqual([len(page) for page in pages], [10, 10, 3])
+        self.assertEqual([page.start_index for page in pages], [1, 11, 21])
+        self.assertEqual([question.id for page in pages for question in page], ordered_ids)
+        self.assertFalse(pages[0].has_previous())
+
+        previous_page = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual([question.id for question in previous_page], ordered_ids[10:20])
+        self.assertEqual(previous_page.start_index, 11)
+        self.assertTrue(previous_page.has_next())
+
+        first_page = paginator.get_page(previous_page.previous_cursor)
+        self.assertEqual([question.id for question in first_page], ordered_ids[:10])
+        self.assertFalse(first_page.has_previous())
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPaginator(Question.objects.all(), 10, descending=False)
+        page = paginator.get_page('not-a-cursor')
+
+        self.assertEqual(page.start_index, 1)
+        self.assertEqual(
+            [question.id for question in page],
+            list(Question.objects.order_by('created_on', 'id').values_list('id', flat=True)[:10]))
+
+
+class ResultCursorTestCase(TestCase):
+    '''
+    Check stepping through cached results one question at a time
+    '''
+
+    def setUp(self):
+        self.user = create_user()
+
+        for number in range(5):
+            for language in ['en', 'hi']:
+                Question.objects.create(
+                    question_text='Why is the sky blue? ' * (number + 1),
+                    language=language,
+                    curated_by=self.user)
+
+    def load(self, params, sort_key):
+        request = RequestFactory().get('/dashboard/answer-questions')
+        request.user = self.user
+        key = ResultCursor.save(AnswerQuestions(), QueryDict(params), sort_key)
+        return ResultCursor.load(key, request)
+
+    def test_neighbours(self):
+        questions = Question.objects.filter(language='en')
+        ordered_ids = list(questions.order_by('-created_on', '-id').values_list('id', flat=True))
+
+        results = self.load('language=en', SORT_KEYS['newest'])
+
+        self.assertEqual(results.get_neighbours(ordered_ids[0]), (None, ordered_ids[1]))
+        self.assertEqual(results.get_neighbours(ordered_ids[2]), (ordered_ids[1], ordered_ids[3]))
+        self.assertEqual(results.get_neighbours(ordered_ids[-1]), (ordered_ids[-2], None))
+
+        hindi_question = Question.objects.filter(language='hi').first()
+        self.assertEqual(results.get_neighbours(hindi_question.id), (None, None))
+
+    def test_neighbours_by_relevance(self):
+        questions = search(Question.objects.all(), 'sky', 'en')
+        ordered_ids = list(questions.values_list('id', flat=True))
+
+        results = self.load('q=sky&language=en', SORT_KEYS['relevance'])
+
+        self.assertEqual(
+            [results.get_neighbours(pk)[1] for pk in ordered_ids],
+            ordered_ids[1:] + [None])
+
+    def test_expired(self):
+        request = RequestFactory().get('/dashboard/answer-questions')
+        self.assertIsNone(ResultCursor.load('result_cursor_expired', request))
+
+
+class SearchPageQueriesTestCase(TestCase):
+    '''
+    Check that the number of queries to render a page of search results
+    doesn't depend on the number of answers and comments
+    '''
+
+    # queries for a page of results: facets, articles, questions,
+    # answers, credits and bookmarks
+    QUERY_BUDGET = 6
+
+    def setUp(self):
+        self.user = create_user()
+
+        self.questions = [
+            Question.objects.create(
+                question_text='Why is the sky blue?',
+                language='en',
+                curated_by=self.user)
+            for number in range(20)
+        ]
+
+    def add_answers(self):
+        for question in self.questions:
+            for status in ['published', 'submitted']:
+                answer = Answer.objects.create(
+                    question_id=question,
+                    answer_text='Because of Rayleigh scattering',
+                    status=status,
+                    submitted_by=self.user)
+                AnswerCredit.objects.create(
+                    answer=answer,
+                    credit_title='author',
+                    credit_user_name='Munin')
+                Comment.objects.create(
+                    text='Looks good',
+                    author=self.user,
+                    content_type=ContentType.objects.get_for_model(Answer),
+                    object_id=answer.id)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, secure=True)
+        self.assertContains(response, 'Rayleigh scattering')
+        return len(queries)
+
+    def test_search_page_query_budget(self):
+        self.add_answers()
+        queries_with_one_answer = self.count_queries('/search')
+
+        self.add_answers()
+        self.add_answers()
+        queries_with_three_answers = self.count_queries('/search')
+
+        self.assertEqual(queries_with_one_answer, queries_with_three_answers)
+        self.assertLessEqual(queries_with_three_answers, self.QUERY_BUDGET)
+
+    def test_cursor_paging_query_budget(self):
+        self.add_answers()
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/search', {'paging': 'cursor'}, secure=True)
+
+        self.assertEqual(len(response.context['questions']), 15)
+        # the exact count of the facets query is shown
+        self.assertEqual(response.context['result_size'], 20)
+        self.assertLessEqual(len(queries), self.QUERY_BUDGET)
+        self.assertFalse(any(query['sql'].startswith('EXPLAIN') for query in queries))
+
+    def test_review_answers_query_count(self):
+        reviewer = create_user('Munin')
+        reviewer.groups.add(Group.objects.create(name='volunteers'))
+        self.client.force_login(reviewer)
+
+        self.add_answers()
+        # the first visit also saves the result cursor in the session
+        self.count_queries('/dashboard/review-answers')
+        queries_with_one_answer = self.count_queries('/dashboard/review-answers')
+
+        self.add_answers()
+        self.add_answers()
+        queries_with_three_answers = self.count_queries('/dashboard/review-answers')
+
+        self.assertEqual(queries_with_one_answer, queries_with_three_answers)
+
+    def test_review_answers_result_cursor(self):
+        reviewer = create_user('Munin')
+        reviewer.groups.add(Group.objects.create(name='volunteers'))
+        self.client.force_login(reviewer)
+        self.add_answers()
+
+        self.client.get('/dashboard/review-answers', secure=True)
+        request = RequestFactory().get('/dashboard/review-answers')
+        request.user = reviewer
+        results = ResultCursor.load(self.client.session['result_cursor'], request)
+
+        # least discussed first, then by ID
+        ordered_ids = [question.id for question in self.questions]
+        self.assertEqual(results.get_neighbours(ordered_ids[0]), (None, ordered_ids[1]))
+        self.assertEqual(results.get_neighbours(ordered_ids[-1]), (ordered_ids[-2], None))
+
+
+class QuestionCountersTestCase(TestCase):
+    '''
+    Check the answer and translation counters stored on questions
+    '''
+
+    def setUp(self):
+        self.user = create_user()
+
+        self.question = Question.objects.create(
+            question_text='Why is the sky blue?',
+            language='en',
+            curated_by=self.user)
+        self.unanswered_question = Question.objects.create(
+            question_text='Why is grass green?',
+            language='en',
+            curated_by=self.user)
+
+    def test_update_counters(self):
+        for status in ['draft', 'submitted', 'submitted', 'published']:
+            Answer.objects.create(
+                question_id=self.question,
+                answer_text='Because of Rayleigh scattering',
+                status=status,
+                submitted_by=self.user)
+        for language, status in [('hi', TranslatedQuestion.STATUS_PUBLISHED), ('ml', TranslatedQuestion.STATUS_SUBMITTED)]:
+            TranslatedQuestion.objects.create(
+                source=self.question,
+                language=language,
+                status=status,
+                translated_by=self.user)
+
+        self.question.update_counters()
+
+        self.assertEqual(self.question.published_answer_count, 1)
+        self.assertEqual(self.question.submitted_answer_count, 2)
+        self.assertTrue(self.question.has_published_translation('hi'))
+        self.assertFalse(self.question.has_published_translation('ml'))
+
+        self.assertEqual(
+            list(Question.objects.filter(published_answer_count=0)),
+            [self.unanswered_question])
+        self.assertEqual(
+            list(Question.objects.filter(published_translation_languages__contains=['hi'])),
+            [self.question])
+
+    def test_rebuild_command(self):
+        Answer.objects.create(
+            question_id=self.question,
+            answer_text='Because of Rayleigh scattering',
+            status='published',
+            submitted_by=self.user)
+
+        call_command('rebuildquestioncounters', chunk_size=1, stdout=io.StringIO())
+
+        self.question.refresh_from_db()
+        self.unanswered_question.refresh_from_db()
+        self.assertEqual(self.question.published_answer_count, 1)
+        self.assertEqual(self.unanswered_question.published_answer_count, 0)
+
+
+class QuestionAnalyticsTestCase(TestCase):
+
+    def setUp(self):
+        self.user = create_user()
+
+        for language, gender, subject, year in [
+                ('en', 'Female', 'Physics', 2018),
+                ('en', 'Female', 'Biology', 2019),
+                ('hi', 'Male', 'Physics', None)]:
+            Question.objects.create(
+                question_text='Why is the sky blue?',
+                language=language,
+                student_gender=gender,
+                field_of_interest=subject,
+                state='Goa',
+                question_asked_on=datetime.date(year, 1, 1) if year else None,
+                curated_by=self.user)
+
+    def test_counts(self):
+        refresh_question_analytics()
+        analytics = get_question_analytics()
+
+        self.assertEqual(analytics.total, 3)
+        self.assertEqual(analytics.get_count('student_gender', 'Female'), 2)
+        self.assertEqual(analytics.get_count('student_gender', 'Non-binary'), 0)
+        self.assertEqual(analytics.get_count('gender_subject', 'Female', 'Physics'), 1)
+        self.assertEqual(analytics.get_count('gender_language', 'Male', 'hi'), 1)
+        self.assertEqual(analytics.get_count('state', 'Goa'), 3)
+        self.assertEqual(
+            analytics.get_values('year_asked'),
+            [{'year_asked': '', 'count': 1},
+             {'year_asked': '2018', 'count': 1},
+             {'year_asked': '2019', 'count': 1}])
+
+    def test_analytics_page(self):
+        cache.clear()
+        refresh_question_analytics()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/analytics/', secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['question_counter'], 3)
+        # the data version and the materialized view
+        self.assertEqual(len(queries), 2)
+
+        # cached until the questions change
+        with self.assertNumQueries(1):
+            self.client.get('/analytics/', secure=True)
+
+        Question.objects.filter(language='hi').update(state='Kerala')
+        refresh_question_analytics()
+        with self.assertNumQueries(2):
+            self.client.get('/analytics/', secure=True)
+
+    def test_data_version(self):
+        version = get_question_data_version()
+
+        # counters are not analytics fields
+        Question.objects.update(published_answer_count=1)
+        self.assertEqual(get_question_data_version(), version)
+
+        Question.objects.update(state='Kerala')
+        self.assertGreater(get_question_data_version(), version)
+
+    def test_refresh_without_broker(self):
+        Question.objects.update(state='Kerala')
+
+        with mock.patch.object(refreshQuestionAnalytics, 'delay', side_effect=OperationalError):
+            with self.assertLogs('dashboard.analytics', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    queue_question_analytics_refresh()
+
+        self.assertEqual(get_question_analytics().get_count('state', 'Kerala'), 3)
+
+    def test_warm_cache(self):
+        cache.clear()
+        refreshQuestionAnalytics()
+
+        version = get_question_data_version()
+        for language in ['en', 'hi']:
+            with translation.override(language):
+                self.assertEqual(
+                    cache.get(get_analytics_page_cache_key(version))['question_counter'],
+                    3)
+
+    def test_cube_counts(self):
+        cube = QuestionCube()
+        cube.refresh()
+
+        total, counts = cube.get_counts(['student_gender', 'year_asked'], {'language': ['en']})
+        self.assertEqual(total, 2)
+        self.assertEqual(counts, [
+            {'student_gender': 'Female', 'year_asked': '2018', 'count': 1},
+            {'student_gender': 'Female', 'year_asked': '2019', 'count': 1},
+        ])
+
+        question = Question.objects.get(language='hi')
+        question.language = 'en'
+        question.save()
+        cube.refresh()
+
+        self.assertEqual(cube.get_counts(filters={'language': ['en']})[0], 3)
+        self.assertEqual(cube.get_counts(filters={'language': ['hi']})[0], 0)
+
+        question.delete()
+        cube.refresh()
+
+        self.assertEqual(cube.get_counts()[0], 2)
+
+        # a deletion balanced by an insert leaves the count unchanged
+        Question.objects.filter(language='en').first().delete()
+        Question.objects.create(question_text='Why do cats purr?', language='hi', curated_by=self.user)
+        cube.refresh()
+
+        self.assertEqual(cube.get_counts(filters={'language': ['en']})[0], 1)
+        self.assertEqual(cube.get_counts(filters={'language': ['hi']})[0], 1)
+
+    def test_analytics_data(self):
+        with mock.patch('dashboard.analytics.question_cube', QuestionCube()):
+            response = self.client.get(
+                '/analytics/data',
+                {'group_by': 'field_of_interest', 'student_gender': 'Female', '_': '1700000000000'},
+                secure=True)
+            with self.assertNumQueries(0):
+                self.client.get('/analytics/data', {'group_by': 'state'}, secure=True)
+
+        self.assertEqual(response.json(), {
+            'total': 2,
+            'counts': [
+                {'field_of_interest': 'Biology', 'count': 1},
+                {'field_of_interest': 'Physics', 'count': 1},
+            ],
+        })
+
+        response = self.client.get('/analytics/data', {'group_by': 'password'}, secure=True)
+        self.assertEqual(response.status_code, 400)
+
+
+class NotifyTestCase(TestCase):
+    '''
+    Check that notifications reach each recipient once
+    '''
+
+    def setUp(self):
+        self.users = [create_user(name) for name in ['Hugin', 'Munin', 'Odin']]
+        hugin, munin, odin = self.users
+
+        question = Question.objects.create(
+            question_text='Why is the sky blue?',
+            language='en',
+            curated_by=hugin)
+        self.answer = Answer.objects.create(
+            question_id=question,
+            answer_text='Because of Rayleigh scattering',
+            status='submitted',
+            submitted_by=hugin)
+        for author in [hugin, munin, munin, odin]:
+            Comment.objects.create(
+                text='Looks good',
+                author=author,
+                content_type=ContentType.objects.get_for_model(Answer),
+                object_id=self.answer.id)
+
+    def test_notify(self):
+        hugin, munin, odin = self.users
+
+        with self.assertNumQueries(1):
+            user_ids = notify(
+                [hugin, munin.id, munin, None],
+                exclude=[hugin],
+                notification_type='comment',
+                title_text='Odin left a comment on your answer',
+                description_text='On your answer',
+                target_url='/')
+
+        self.assertEqual(user_ids, [munin.id])
+        self.assertEqual(munin.notifications.count(), 1)
+        self.assertEqual(hugin.notifications.count(), 0)
+
+    def test_approve_answer(self):
+        hugin, munin, odin = self.users
+        odin.groups.add(Group.objects.create(name='volunteers'))
+        self.client.force_login(odin)
+
+        # run the task in place of queuing it
+        with mock.patch.object(createNotifications, 'delay', side_effect=createNotifications):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    '/dashboard/question/{}/answers/{}/approve'.format(
+                        self.answer.question_id_id, self.answer.id),
+                    secure=True)
+
+        # the author once, the other commenter once, the publisher never
+        self.assertEqual(
+            list(hugin.notifications.values_list('title_text', flat=True)),
+            ['Odin Hrafna published your answer.'])
+        self.assertEqual(munin.notifications.count(), 1)
+        self.assertEqual(odin.notifications.count(), 0)
+
+    def test_notify_without_broker(self):
+        hugin, munin, odin = self.users
+
+        with mock.patch.object(createNotifications, 'delay', side_effect=OperationalError):
+            with self.assertLogs('dashboard.notifications', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    notify(
+                        [hugin, munin],
+                        background=True,
+                        notification_type='comment',
+                        title_text='Odin left a comment on your answer',
+                        description_text='On your answer',
+                        target_url='/')
+
+        self.assertEqual(hugin.notifications.count(), 1)
+        self.assertEqual(munin.notifications.count(), 1)
+
+    def test_comment(self):
+        hugin, munin, odin = self.users
+        munin.groups.add(Group.objects.create(name='volunteers'))
+        self.client.force_login(munin)
+
+        self.client.post(
+            '/dashboard/question/{}/answers/{}/comment/add'.format(
+                self.answer.question_id_id, self.answer.id),
+            {'text': 'Please cite a source'},
+            secure=True)
+
+        # the author once, the other reviewers once, the commenter never
+        self.assertEqual(
+            list(hugin.notifications.values_list('title_text', flat=True)),
+            ['Munin Hrafna left a comment on your answer.'])
+        self.assertEqual(odin.notifications.count(), 1)
+        self.assertEqual(munin.notifications.count(), 0)
+
+
+class UserProfileTestCase(TestCase):
+    '''
+    Check that profile tabs are loaded a page at a time
+    '''
+
+    def setUp(self):
+        self.hugin, self.munin = [create_user(name) for name in ['Hugin', 'Munin']]
+
+        question = Question.objects.create(
+            question_text='Why is the sky blue?',
+            language='en',
+            curated_by=self.hugin)
+        Answer.objects.bulk_create([
+            Answer(
+                question_id=question,
+                answer_text='Because of Rayleigh scattering ' * 100,
+                status='published',
+                submitted_by=self.hugin)
+            for number in range(12)
+        ])
+
+    def test_profile_page(self):
+        self.client.force_login(self.munin)
+
+        response = self.client.get(
+            '/user/{}/profile'.format(self.hugin.id), secure=True)
+
+        published_answers = response.context['published_answers']
+        self.assertEqual(response.context['answers_count'], 12)
+        self.assertEqual(len(published_answers), 10)
+        self.assertEqual(response.context['published_answers_more'], published_answers[-1].id)
+        self.assertNotIn('answer_text', published_answers[0].__dict__)
+
+    def test_tab_pages(self):
+        self.client.force_login(self.munin)
+        url = '/user/{}/profile/submissions/content'.format(self.hugin.id)
+        answer_ids = list(Answer.objects.order_by('-id').values_list('id', flat=True))
+
+        response = self.client.get(
+            url, {'list': 'published_answers', 'before': answer_ids[9]}, secure=True)
+
+        # only the cards of the list after the given one
+        self.assertEqual(
+            [answer.id for answer in response.context['published_answers']],
+            answer_ids[10:])
+        self.assertIsNone(response.context['published_answers_more'])
+        self.assertNotIn('submitted_questions', response.context)
+
+        response = self.client.get(url, {'list': 'drafts'}, secure=True)
+        self.assertEqual(response.status_code, 404)
+
+    def test_translation_draft_excerpt(self):
+        self.client.force_login(self.hugin)
+        AnswerTranslation.objects.create(
+            source=Answer.objects.first(),
+            language='hi',
+            answer_text='',
+            translated_by=self.hugin,
+            status=AnswerTranslation.STATUS_DRAFT)
+
+        response = self.client.get(
+            '/user/{}/profile/drafts/content'.format(self.hugin.id), secure=True)
+
+        source = response.context['translated_answer_drafts'][0].source
+        self.assertNotIn('answer_text', source.__dict__)
+        self.assertContains(response, 'Because of Rayleigh scattering')
+
+    def test_private_tab(self):
+        self.client.force_login(self.munin)
+
+        response = self.client.get(
+            '/user/{}/profile/drafts/content'.format(self.hugin.id), secure=True)
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get(
+            '/user/{}/profile/drafts/content'.format(self.munin.id), secure=True)
+        self.assertEqual(response.status_code, 200)
+
+
+class WithLanguageTestCase(TestCase):
+    '''
+    Check that with_language() translates a list in constant queries
+    '''
+
+    def setUp(self):
+        self.user = create_user()
+
+        for number in range(5):
+            question = Question.objects.create(
+                question_text='Question {}'.format(number),
+                language='en',
+                curated_by=self.user)
+            for language, status in [
+                    ('hi', TranslatedQuestion.STATUS_PUBLISHED),
+                    ('mr', TranslatedQuestion.STATUS_DRAFT)]:
+                TranslatedQuestion.objects.create(
+                    source=question,
+                    language=language,
+                    status=status,
+                    question_text='Question {} ({})'.format(number, language),
+                    translated_by=self.user)
+
+        # neither translated nor translatable
+        Question.objects.create(
+            question_text='Question in Hindi',
+            language='hi',
+            curated_by=self.user)
+
+    def test_with_language(self):
+        # the questions, their Hindi and their available translations
+        with self.assertNumQueries(3):
+            questions = list(Question.objects.with_language('hi').order_by('id'))
+            texts = [question.tr_question_text for question in questions]
+            languages = [question.list_available_languages() for question in questions]
+
+        self.assertEqual(texts, [
+            'Question 0 (hi)',
+            'Question 1 (hi)',
+            'Question 2 (hi)',
+            'Question 3 (hi)',
+            'Question 4 (hi)',
+            'Question in Hindi',
+        ])
+        self.assertEqual(
+            [[code for code, name in question_languages] for question_languages in languages],
+            [['en', 'hi']] * 5 + [['hi']])
+
+    def test_unpublished_translation(self):
+        question = Question.objects.with_language('mr').first()
+
+        self.assertFalse(question.is_translated)
+        self.assertEqual(question.tr_question_text, 'Question 0')
+
+        # set_language() still takes precedence
+        question.set_language('hi')
+        self.assertEqual(question.tr_question_text, 'Question 0 (hi)')
@@ -11,6 +11,8 @@ urlpatterns = [
     path('question/validate-new', views.ValidateNewExcelSheet.as_view(), name='validate-new-excel-sheet'),
     path('question/validate-curated', views.ValidateCuratedExcelSheet.as_view(), name='validate-curated-excel-sheet'),
     path('question/curate', views.CurateDataset.as_view(), name='curate-dataset'),
+    path('dataset/<int:dataset_id>/uncurated', views.DownloadUncuratedDataset.as_view(), name='download-uncurated-dataset'),
+    path('jobs/<int:job_id>', views.DatasetJobStatus.as_view(), name='dataset-job-status'),
     path('question/<int:question_id>/answer/new', views.SubmitAnswerView.as_view(), name='submit-answer'),
     path('manage-content', views.ManageContentView.as_view(), name='manage-content'),
     path('manage-users', views.ManageUsersView.as_view(), name='manage-users'),
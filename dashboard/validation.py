@@ -0,0 +1,218 @@
+"""
+Validate submitted and curated Excel sheets against the Sawaliram
+templates.
+
+Each template has a declarative list of rules. A rule checks one
+condition for a whole block of rows at once by returning a boolean mask
+over a DataFrame (True where the row is invalid); the masks are then
+combined to group the error messages by row.
+
+Validators take the header of a sheet and an iterable of its rows (see
+dashboard.excel.iter_rows), which are checked in blocks of
+VALIDATION_CHUNK_SIZE rows so that memory stays bounded. They return the
+errors found as a list of (heading, [error, ...]) pairs, ready to be
+rendered by dashboard/includes/excel-validation-errors.html. An empty
+list means the sheet is valid. Problems with the template of a new sheet
+are reported on their own; a curated sheet also has its rows checked,
+by the rules whose columns it has.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Columns of the template used to submit new questions
+NEW_SHEET_COLUMNS = [
+    'Question',
+    'Question Language',
+    'English translation of the question',
+    'How was the question originally asked?',
+    'Context',
+    'Date of asking the question',
+    'Student Name',
+    'Gender',
+    'Student Class',
+    'School Name',
+    'Curriculum followed',
+    'Medium of instruction',
+    'Area',
+    'State',
+    'Published (Yes/No)',
+    'Publication Name',
+    'Publication Date',
+    'Notes',
+    'Contributor Name',
+    'Contributor Role',
+]
+
+# Columns of the sheet generated for curation
+CURATED_SHEET_COLUMNS = NEW_SHEET_COLUMNS + [
+    'Field of Interest',
+    'dataset_id',
+]
+
+TEMPLATE_ERRORS_HEADING = 'Problem(s) with the template:'
+
+# Number of rows checked at once
+VALIDATION_CHUNK_SIZE = 10000
+
+
+class Required:
+    """The column must not be empty"""
+
+    def __init__(self, column, message):
+        self.column = column
+        self.columns = [column]
+        self.message = message
+
+    def mask(self, frame):
+        return frame[self.column].isna()
+
+
+class LanguageCode:
+    """A non-empty value in the column must be an ISO 639-1 code"""
+
+    def __init__(self, column, message):
+        self.column = column
+        self.columns = [column]
+        self.message = message
+
+    def mask(self, frame):
+        values = frame[self.column]
+        return values.notna() & (values.astype(str).str.len() != 2)
+
+
+class RequiredIf:
+    """The column must not be empty when another column has a given value"""
+
+    def __init__(self, column, condition_column, condition_value, message):
+        self.column = column
+        self.condition_column = condition_column
+        self.condition_value = condition_value
+        self.columns = [column, condition_column]
+        self.message = message
+
+    def mask(self, frame):
+        return frame[self.condition_column].eq(self.condition_value) & frame[self.column].isna()
+
+
+NEW_SHEET_RULES = [
+    Required('Question', 'Question field cannot be empty.'),
+    Required('Question Language', 'Question Language field cannot be empty.'),
+    Required('Context', 'Context field cannot be empty.'),
+    RequiredIf(
+        'Publication Name', 'Published (Yes/No)', 'Yes',
+        'If the question was published, you must mention the publication name.'),
+    Required('Contributor Name', 'You must mention the name of the contributor.'),
+]
+
+CURATED_SHEET_RULES = [
+    Required('Question', 'Question field cannot be empty.'),
+    Required('Question Language', 'Question Language field cannot be empty.'),
+    LanguageCode('Question Language', 'Question Language must be an ISO 639-1 code.'),
+    Required('Context', 'Context field cannot be empty.'),
+    RequiredIf(
+        'Publication Name', 'Published (Yes/No)', 'Yes',
+        'If the question was published, you must mention the publication name.'),
+    Required('Contributor Name', 'You must mention the name of the contributor.'),
+    Required('Field of Interest', 'Field of Interest cannot be empty.'),
+]
+
+
+def get_template_errors(header, standard_columns):
+    """
+    Check that the sheet has exactly the columns of the template
+    """
+
+    general_errors = []
+
+    if len(header) != len(standard_columns):
+        general_errors.append('The columns of the Excel template are modified. Please use the standard template!')
+
+    for column in header:
+        if column not in standard_columns:
+            general_errors.append('"' + str(column) + '" is not a standard column. Please use the standard template!')
+
+    return general_errors
+
+
+def validate_frame(frame, rules):
+    """
+    Apply the rules to a DataFrame and return the errors of each invalid
+    row as (row label, [error, ...]) pairs, in row order. Rows are
+    labelled by the frame's index.
+    """
+
+    if frame.empty:
+        return []
+
+    masks = np.column_stack([
+        rule.mask(frame).to_numpy(dtype=bool) for rule in rules
+    ])
+    messages = [rule.message for rule in rules]
+
+    labels = frame.index
+    return [
+        (labels[position], [messages[rule] for rule in np.flatnonzero(masks[position])])
+        for position in np.flatnonzero(masks.any(axis=1))
+    ]
+
+
+def iter_frames(header, rows, chunk_size):
+    """Group rows into DataFrames indexed by their row number"""
+
+    columns = header + ['_row']
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield pd.DataFrame.from_records(chunk, columns=columns, index='_row')
+            chunk = []
+
+    if chunk:
+        yield pd.DataFrame.from_records(chunk, columns=columns, index='_row')
+
+
+def validate_sheet(header, rows, standard_columns, rules,
+                   check_rows_of_bad_template=False, chunk_size=VALIDATION_CHUNK_SIZE):
+    """
+    Validate the rows of a sheet against a template and its rules. The
+    rows are not checked if the sheet doesn't follow the template, unless
+    check_rows_of_bad_template is True.
+    """
+
+    file_errors = []
+    general_errors = get_template_errors(header, standard_columns)
+    if general_errors:
+        file_errors.append((TEMPLATE_ERRORS_HEADING, general_errors))
+        if not check_rows_of_bad_template:
+            return file_errors
+
+        # rules on missing columns can't be applied
+        rules = [
+            rule for rule in rules
+            if all(column in header for column in rule.columns)
+        ]
+        if not rules:
+            return file_errors
+
+    for frame in iter_frames(header, rows, chunk_size):
+        file_errors.extend(
+            ('Row #' + str(row), row_errors)
+            for row, row_errors in validate_frame(frame, rules)
+        )
+
+    return file_errors
+
+
+def validate_new_sheet(header, rows):
+    """Validate a sheet of newly submitted questions"""
+
+    return validate_sheet(header, rows, NEW_SHEET_COLUMNS, NEW_SHEET_RULES)
+
+
+def validate_curated_sheet(header, rows):
+    """Validate a curated sheet before it is imported as questions"""
+
+    return validate_sheet(
+        header, rows, CURATED_SHEET_COLUMNS, CURATED_SHEET_RULES,
+        check_rows_of_bad_template=True)
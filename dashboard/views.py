@@ -19,7 +19,7 @@ from django.contrib.auth.models import Group
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.translation import get_language_info
 from django.utils.decorators import method_decorator
-from django.db.models import Q, Subquery
+from django.db.models import Q, Count, Subquery
 from django.core.paginator import Paginator
 from django.contrib.contenttypes.models import ContentType
 from django.views import View
@@ -30,18 +30,19 @@ from django.views.generic import (
     DeleteView,
 )
 from django.http import (
-    HttpResponse,
     Http404,
+    JsonResponse,
+    FileResponse,
 )
 from django.contrib import messages
 from django.core.exceptions import (
-    ObjectDoesNotExist,
     PermissionDenied,
     SuspiciousOperation,
     ImproperlyConfigured,
 )
 from django.core.cache import cache
 from django.urls import reverse
+from django.template.loader import render_to_string
 
 from django.conf import settings
 
@@ -51,7 +52,6 @@ from sawaliram_auth.decorators import (
 )
 from dashboard.models import (
     LANGUAGE_CODES,
-    QuestionArchive,
     Question,
     TranslatedQuestion,
     DraftTranslatedQuestion,
@@ -73,10 +73,22 @@ from dashboard.models import (
     DraftArticleTranslation,
     Comment,
     Dataset,
+    DatasetJob,
     AnswerTranslationCredit,
     ArticleTranslationCredit)
 
-from sawaliram_auth.models import Notification, User, VolunteerRequest
+from dashboard.jobs import (
+    create_dataset_job,
+    get_job_progress,
+    get_uncurated_sheet,
+    queue_dataset_job,
+)
+from dashboard.analytics import queue_question_analytics_refresh
+from dashboard.search import search
+from dashboard.pagination import ResultCursor
+from dashboard.notifications import notify
+
+from sawaliram_auth.models import User, VolunteerRequest
 from public_website.views import SearchView
 
 import pandas as pd
@@ -127,162 +139,72 @@ class SubmitQuestionsView(View):
         return render(request, 'dashboard/submit-questions.html', context)
 
     def post(self, request):
-        """Save dataset to archive and return success message"""
-
-        # save the questions in the archive
-        excel_sheet = pd.read_excel(request.FILES.get('excel_file'))
-        columns = list(excel_sheet)
-
-        column_name_mapping = {
-            'Question': 'question_text',
-            'Question Language': 'language',
-            'English translation of the question': 'question_text_english',
-            'How was the question originally asked?': 'question_format',
-            'Context': 'context',
-            'Date of asking the question': 'question_asked_on',
-            'Student Name': 'student_name',
-            'Gender': 'student_gender',
-            'Student Class': 'student_class',
-            'School Name': 'school',
-            'Curriculum followed': 'curriculum_followed',
-            'Medium of instruction': 'medium_language',
-            'Area': 'area',
-            'State': 'state',
-            'Published (Yes/No)': 'published',
-            'Publication Name': 'published_source',
-            'Publication Date': 'published_date',
-            'Notes': 'notes',
-            'Contributor Name': 'contributor',
-            'Contributor Role': 'contributor_role'
-        }
+        """Queue the dataset to be saved to the archive"""
 
-        for index, row in excel_sheet.iterrows():
-            question = QuestionArchive()
-
-            # only save the question if the question field is non-empty
-            if not row['Question'] != row['Question']:
-
-                for column in columns:
-                    column = column.strip()
-
-                    # check if the value is not nan
-                    if not row[column] != row[column]:
-
-                        if column == 'Published (Yes/No)':
-                            setattr(
-                                question,
-                                column_name_mapping[column],
-                                True if row[column] == 'Yes' else False)
-                        else:
-                            setattr(
-                                question,
-                                column_name_mapping[column],
-                                row[column].strip() if isinstance(row[column], str) else row[column])
-
-                question.submitted_by = request.user
-                question.save()
-
-        # create an entry for the dataset
-        dataset = Dataset()
-        dataset.question_count = len(excel_sheet.index)
-        dataset.submitted_by = request.user
-        dataset.status = 'new'
-        dataset.save()
-
-        # create raw file for archiving
-        BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        raw_filename = 'dataset_' + str(dataset.id) + '_raw.xlsx'
-        writer = pd.ExcelWriter(
-            os.path.join(BASE_DIR, 'assets/submissions/raw/' + raw_filename))
-        excel_sheet.to_excel(writer, 'Sheet 1')
-        writer.save()
-
-        # create file for curation
-        excel_sheet['Field of Interest'] = ''
-        excel_sheet['dataset_id'] = dataset.id
-        uncurated_filename = 'dataset_' + str(dataset.id) + '_uncurated.xlsx'
-        writer = pd.ExcelWriter(
-            os.path.join(BASE_DIR, 'assets/submissions/uncurated/' + uncurated_filename))
-        excel_sheet.to_excel(writer, 'Sheet 1')
-        writer.save()
+        dataset_job = create_dataset_job(
+            DatasetJob.KIND_SUBMIT,
+            request.FILES.get('excel_file'),
+            request.user)
+        queue_dataset_job(dataset_job)
 
         messages.success(request, (_('Thank you for the questions! We will get to work preparing the questions to be answered and translated.')))
         context = {
             'grey_background': 'True',
             'page_title': _('Submit Questions'),
             'enable_breadcrumbs': 'Yes',
+            'dataset_job': dataset_job,
         }
         return render(request, 'dashboard/submit-questions.html', context)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(login_required, name='dispatch')
 class ValidateNewExcelSheet(View):
 
     def post(self, request):
-        """Validate excel sheet and return status/errors"""
-        excel_file = pd.read_excel(request.FILES.get('excel_file'))
-
-        file_errors = {}
-        general_errors = []
-        standard_columns = [
-            'Question',
-            'Question Language',
-            'English translation of the question',
-            'How was the question originally asked?',
-            'Context',
-            'Date of asking the question',
-            'Student Name',
-            'Gender',
-            'Student Class',
-            'School Name',
-            'Curriculum followed',
-            'Medium of instruction',
-            'Area',
-            'State',
-            'Published (Yes/No)',
-            'Publication Name',
-            'Publication Date',
-            'Notes',
-            'Contributor Name',
-            'Contributor Role'
-        ]
-
-        if len(list(excel_file)) != 20:
-            general_errors.append('The columns of the Excel template are modified. Please use the standard template!')
-
-        for column in list(excel_file):
-            if column not in standard_columns:
-                general_errors.append('"' + column + '" is not a standard column. Please use the standard template!')
-
-        if general_errors:
-            file_errors['Problem(s) with the template:'] = general_errors
-            response = render(request, 'dashboard/includes/excel-validation-errors.html', {'errors': file_errors})
-            return HttpResponse(response)
-
-        for index, row in excel_file.iterrows():
-            row_errors = []
-
-            if row['Question'] != row['Question']:
-                row_errors.append('Question field cannot be empty.')
-            if row['Question Language'] != row['Question Language']:
-                row_errors.append('Question Language field cannot be empty.')
-            if row['Context'] != row['Context']:
-                row_errors.append('Context field cannot be empty.')
-            if row['Published (Yes/No)'] == 'Yes' and row['Publication Name'] != row['Publication Name']:
-                row_errors.append('If the question was published, you must mention the publication name.')
-            if row['Contributor Name'] != row['Contributor Name']:
-                row_errors.append('You must mention the name of the contributor.')
-
-            if row_errors:
-                # Adding 1 to compensate for 0 indexing
-                file_errors['Row #' + str(index + 1)] = row_errors
-
-        if file_errors:
-            response = render(request, 'dashboard/includes/excel-validation-errors.html', {'errors': file_errors})
-        else:
-            response = 'validated'
+        """Queue the excel sheet for validation and return the job"""
+
+        dataset_job = create_dataset_job(
+            DatasetJob.KIND_VALIDATE_NEW,
+            request.FILES.get('excel_file'),
+            request.user)
+        queue_dataset_job(dataset_job)
 
-        return HttpResponse(response)
+        return JsonResponse({
+            'job_id': dataset_job.id,
+            'status_url': dataset_job.get_absolute_url(),
+        })
+
+
+@method_decorator(login_required, name='dispatch')
+class DatasetJobStatus(View):
+
+    def get(self, request, job_id):
+        """Return the progress of a dataset job, for polling"""
+
+        dataset_job = get_object_or_404(
+            DatasetJob,
+            id=job_id,
+            submitted_by=request.user)
+
+        errors = ''
+        if dataset_job.errors:
+            errors = render_to_string(
+                'dashboard/includes/excel-validation-errors.html',
+                {'errors': dict(dataset_job.errors)},
+                request=request)
+
+        return JsonResponse({
+            'id': dataset_job.id,
+            'kind': dataset_job.kind,
+            'status': dataset_job.status,
+            'is_finished': dataset_job.is_finished,
+            'rows_total': dataset_job.rows_total,
+            'rows_processed': get_job_progress(dataset_job),
+            'message': dataset_job.message,
+            'dataset_id': dataset_job.dataset_id,
+            'errors': errors,
+        })
 
 
 @method_decorator(login_required, name='dispatch')
@@ -427,187 +349,67 @@ class ManageContentView(View):
 
 
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(login_required, name='dispatch')
 class ValidateCuratedExcelSheet(View):
     def post(self, request):
-        """Validate excel sheet and return status/errors"""
-        excel_file = pd.read_excel(request.FILES.get('excel_file'))
-
-        file_errors = {}
-        general_errors = []
-        standard_columns = [
-            'Question',
-            'Question Language',
-            'English translation of the question',
-            'How was the question originally asked?',
-            'Context',
-            'Date of asking the question',
-            'Student Name',
-            'Gender',
-            'Student Class',
-            'School Name',
-            'Curriculum followed',
-            'Medium of instruction',
-            'Area',
-            'State',
-            'Published (Yes/No)',
-            'Publication Name',
-            'Publication Date',
-            'Notes',
-            'Contributor Name',
-            'Contributor Role',
-            'Field of Interest',
-            'dataset_id'
-        ]
-
-        if len(list(excel_file)) != 22:
-            general_errors.append('The columns of the Excel template are modified. Please use the standard template!')
-
-        for column in list(excel_file):
-            if column not in standard_columns:
-                general_errors.append('"' + column + '" is not a standard column. Please use the standard template!')
-
-        if general_errors:
-            file_errors['Problem(s) with the template:'] = general_errors
-
-        for index, row in excel_file.iterrows():
-            row_errors = []
-
-            if row['Question'] != row['Question']:
-                row_errors.append('Question field cannot be empty.')
-            if row['Question Language'] != row['Question Language']:
-                row_errors.append('Question Language field cannot be empty.')
-            if len(row['Question Language']) != 2:
-                row_errors.append('Question Language must be an ISO 639-1 code.')
-            if row['Context'] != row['Context']:
-                row_errors.append('Context field cannot be empty.')
-            if row['Published (Yes/No)'] == 'Yes' and row['Publication Name'] != row['Publication Name']:
-                row_errors.append('If the question was published, you must mention the publication name.')
-            if row['Contributor Name'] != row['Contributor Name']:
-                row_errors.append('You must mention the name of the contributor.')
-            if row['Field of Interest'] != row['Field of Interest']:
-                row_errors.append('Field of Interest cannot be empty.')
-
-            if row_errors:
-                # Adding 1 to compensate for 0 indexing
-                file_errors['Row #' + str(index + 1)] = row_errors
-
-        if file_errors:
-            response = render(request, 'dashboard/includes/excel-validation-errors.html', {'errors': file_errors})
-        else:
-            response = 'validated'
+        """Queue the excel sheet for validation and return the job"""
 
-        return HttpResponse(response)
+        dataset_job = create_dataset_job(
+            DatasetJob.KIND_VALIDATE_CURATED,
+            request.FILES.get('excel_file'),
+            request.user)
+        queue_dataset_job(dataset_job)
+
+        return JsonResponse({
+            'job_id': dataset_job.id,
+            'status_url': dataset_job.get_absolute_url(),
+        })
 
 
 @method_decorator(login_required, name='dispatch')
 @method_decorator(volunteer_permission_required, name='dispatch')
 class CurateDataset(View):
     def post(self, request):
-        """Save the data to Question table"""
-
-        excel_sheet = pd.read_excel(request.FILES.get('excel_file'))
-        columns = list(excel_sheet)
-
-        column_name_mapping = {
-            'Question': 'question_text',
-            'Question Language': 'language',
-            'English translation of the question': 'question_text_english',
-            'How was the question originally asked?': 'question_format',
-            'Context': 'context',
-            'Date of asking the question': 'question_asked_on',
-            'Student Name': 'student_name',
-            'Gender': 'student_gender',
-            'Student Class': 'student_class',
-            'School Name': 'school',
-            'Curriculum followed': 'curriculum_followed',
-            'Medium of instruction': 'medium_language',
-            'Area': 'area',
-            'State': 'state',
-            'Published (Yes/No)': 'published',
-            'Publication Name': 'published_source',
-            'Publication Date': 'published_date',
-            'Notes': 'notes',
-            'Contributor Name': 'contributor',
-            'Contributor Role': 'contributor_role',
-            'Field of Interest': 'field_of_interest',
-            'dataset_id': 'dataset_id',
-        }
+        """Queue the curated data to be saved to the Question table"""
 
-        # verify the dataset_id
-        dataset_id = list(excel_sheet['dataset_id'])[0]
+        dataset_job = create_dataset_job(
+            DatasetJob.KIND_CURATE,
+            request.FILES.get('excel_file'),
+            request.user)
+        queue_dataset_job(dataset_job)
 
-        try:
-            dataset = Dataset.objects.get(id=dataset_id)
-        except ObjectDoesNotExist:
-            messages.error(request, (_('We could not find that dataset by ID. Make sure you did not edit any other field except "Field of Interest".')))
-
-            datasets = Dataset.objects.all().order_by('-created_on')
-            context = {
-                'grey_background': 'True',
-                'page_title': _('Manage Content'),
-                'datasets': datasets
-            }
-            return render(request, 'dashboard/manage-content.html', context)
-
-        if dataset.status == 'curated':
-            messages.error(request, (_('This dataset is already curated. Make sure you are uploading the correct file.')))
-
-            datasets = Dataset.objects.all().order_by('-created_on')
-            context = {
-                'grey_background': 'True',
-                'page_title': _('Manage Content'),
-                'datasets': datasets
-            }
-            return render(request, 'dashboard/manage-content.html', context)
-
-        for index, row in excel_sheet.iterrows():
-            question = Question()
-
-            for column in columns:
-                column = column.strip()
-
-                # check if the value is not nan
-                if not row[column] != row[column]:
-
-                    if column == 'Published (Yes/No)':
-                        setattr(
-                            question,
-                            column_name_mapping[column],
-                            True if row[column] == 'Yes' else False)
-                    elif column == 'Field of Interest':
-                        if row[column] == 'History-Philosophy & Practice of Science':
-                            value = 'History, Philosophy & Practice of Science'
-                        else:
-                            value = row[column]
-                        setattr(
-                            question,
-                            column_name_mapping[column],
-                            value.strip() if isinstance(value, str) else value)
-                    else:
-                        setattr(
-                            question,
-                            column_name_mapping[column],
-                            row[column].strip() if isinstance(row[column], str) else row[column])
-
-            question.curated_by = request.user
-            question.save()
-
-        # update status of the dataset
-        dataset.status = 'curated'
-        dataset.save()
-
-        # return to Manage Content and show success message
-        messages.success(request, (_('Questions saved successfully! These will now be available for answering and translation.')))
+        # return to Manage Content and show the job's progress
+        messages.success(request, (_('We are saving the questions. They will be available for answering and translation once this is done.')))
 
         datasets = Dataset.objects.all().order_by('-created_on')
         context = {
             'grey_background': 'True',
             'page_title': _('Manage Content'),
-            'datasets': datasets
+            'datasets': datasets,
+            'dataset_job': dataset_job,
         }
         return render(request, 'dashboard/manage-content.html', context)
 
 
+@method_decorator(login_required, name='dispatch')
+@method_decorator(volunteer_permission_required, name='dispatch')
+class DownloadUncuratedDataset(View):
+    def get(self, request, dataset_id):
+        """Return the sheet to curate a dataset with"""
+
+        dataset = get_object_or_404(Dataset, id=dataset_id)
+
+        try:
+            path = get_uncurated_sheet(dataset)
+        except FileNotFoundError:
+            raise Http404(_('The submitted file of this dataset is missing.'))
+
+        return FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=os.path.basename(path))
+
+
 @method_decorator(login_required, name='dispatch')
 @method_decorator(volunteer_permission_required, name='dispatch')
 class ViewQuestionsView(SearchView):
@@ -626,6 +428,8 @@ class ViewQuestionsView(SearchView):
 @method_decorator(login_required, name='dispatch')
 @method_decorator(volunteer_permission_required, name='dispatch')
 class AnswerQuestions(SearchView):
+    default_paging = 'cursor'
+
     def get_querysets(self, request):
         '''
         Returns a dict of querysets, one for each data type
@@ -649,29 +453,11 @@ class AnswerQuestions(SearchView):
 
         if 'q' in request.GET and request.GET.get('q') != '':
             if not search_categories:
-                results['questions'] = Question.objects.filter(
-                            Q(pk__iexact=request.GET.get('q')) |
-                            Q(question_text__search=request.GET.get('q')) |
-                            Q(question_text_english__search=request.GET.get('q')) |
-                            Q(school__search=request.GET.get('q')) |
-                            Q(area__search=request.GET.get('q')) |
-                            Q(state__search=request.GET.get('q')) |
-                            Q(field_of_interest__search=request.GET.get('q')) |
-                            Q(published_source__search=request.GET.get('q'))
-                        )
+                results['questions'] = search(Question.objects.all(), request.GET.get('q'), self.get_search_language(request), self.similar_search)
 
             else:
                 if 'questions' in search_categories:
-                    results['questions'] = Question.objects.filter(
-                            Q(pk__iexact=request.GET.get('q')) |
-                            Q(question_text__search=request.GET.get('q')) |
-                            Q(question_text_english__search=request.GET.get('q')) |
-                            Q(school__search=request.GET.get('q')) |
-                            Q(area__search=request.GET.get('q')) |
-                            Q(state__search=request.GET.get('q')) |
-                            Q(field_of_interest__search=request.GET.get('q')) |
-                            Q(published_source__search=request.GET.get('q'))
-                        )
+                    results['questions'] = search(Question.objects.all(), request.GET.get('q'), self.get_search_language(request), self.similar_search)
                 else:
                     results['questions'] = Question.objects.none()
 
@@ -716,50 +502,32 @@ class AnswerQuestions(SearchView):
 class ReviewAnswersList(SearchView):
     def get_querysets(self, request):
         results = {}
+
+        # count comments on the submitted answers only: the filter
+        # constrains the join the count is made over
+        query_set = Question.objects.filter(
+                            answers__status='submitted',
+                        ).exclude(
+                            answers__submitted_by=request.user,
+                        ).annotate(
+                            comment_count=Count('answers__comments', distinct=True),
+                        )
+
         if 'q' in request.GET and request.GET.get('q') != '':
-            query_set = Question.objects.filter(
-                                answers__status='submitted',
-                            ).exclude(
-                                answers__submitted_by=request.user,
-                            ).distinct()
-            results['questions'] = query_set.filter(
-                    Q(question_text__search=request.GET.get('q')) |
-                    Q(question_text_english__search=request.GET.get('q')) |
-                    Q(school__search=request.GET.get('q')) |
-                    Q(area__search=request.GET.get('q')) |
-                    Q(state__search=request.GET.get('q')) |
-                    Q(field_of_interest__search=request.GET.get('q'))
-            )
-            return results
+            results['questions'] = search(query_set, request.GET.get('q'), self.get_search_language(request), self.similar_search)
         else:
-            ques = Question.objects.filter(
-                                answers__status='submitted',
-                            ).exclude(
-                                answers__submitted_by=request.user,
-                            ).distinct()
-            temp = {}
-            temp2 = []
-
-            for q in ques:
-                a = q.answers.all()   
-                for ans in a:
-                    comment = ans.comments.all()
-                    temp[q] = comment.count()
-
-            sorted_tuples = sorted(temp.items(), key=lambda item: item[1])
-            sorted_dict = {k: v for k, v in sorted_tuples}
-            
-            res = sorted_dict.keys()
-            for b in res:
-                temp2.append(b.id)
-            
-            clauses = ' '.join(['WHEN id=%s THEN %s' % (pk, i) for i, pk in enumerate(temp2)])
-            ordering = 'CASE %s END' % clauses
+            # least discussed first
+            results['questions'] = query_set.order_by('comment_count', 'id')
 
-            results['questions'] = Question.objects.filter(id__in=temp2).extra(
-            select={'ordering': ordering}, order_by=('ordering',))
+        return results
 
-            return results
+    def sort_questions(self, questions, sort_by):
+        if sort_by == 'comments':
+            return questions.order_by('comment_count', 'id')
+        return super().sort_questions(questions, sort_by)
+
+    def get_listed_answers(self, request):
+        return Answer.objects.exclude(status=Answer.STATUS_PUBLISHED)
 
     def get_page_title(self, request):
         return _('Review Answers')
@@ -771,6 +539,22 @@ class ReviewAnswersList(SearchView):
 @method_decorator(login_required, name='dispatch')
 @method_decorator(volunteer_permission_required, name='dispatch')
 class SubmitAnswerView(View):
+    def get_neighbours(self, request, question_id):
+        '''
+        Return the IDs of the questions before and after this one in the
+        results the user came from, or '' if there are none
+        '''
+
+        if 'result_cursor' not in request.session:
+            return '', ''
+
+        results = ResultCursor.load(request.session['result_cursor'], request)
+        if results is None:
+            return '', ''
+
+        prev_item_id, next_item_id = results.get_neighbours(question_id)
+        return prev_item_id or '', next_item_id or ''
+
     def get(self, request, question_id):
         """Return the view to answer a question"""
 
@@ -781,15 +565,7 @@ class SubmitAnswerView(View):
         question_to_answer = Question.objects.get(pk=question_id)
 
         # get next/prev item IDs
-        prev_item_id, next_item_id = '', ''
-        if 'result_id_list' in request.session:
-            result_id_list = request.session['result_id_list']
-            if question_id in result_id_list:
-                current_item_id = result_id_list.index(question_id)
-                if current_item_id != 0:
-                    prev_item_id = result_id_list[current_item_id - 1]
-                if current_item_id != len(result_id_list) - 1:
-                    next_item_id = result_id_list[current_item_id + 1]
+        prev_item_id, next_item_id = self.get_neighbours(request, question_id)
 
         context = {
             'question': question_to_answer,
@@ -827,15 +603,7 @@ class SubmitAnswerView(View):
         question_to_answer = Question.objects.get(pk=question_id)
 
         # get next/prev item IDs
-        prev_item_id, next_item_id = '', ''
-        if 'result_id_list' in request.session:
-            result_id_list = request.session['result_id_list']
-            if question_id in result_id_list:
-                current_item_id = result_id_list.index(question_id)
-                if current_item_id != 0:
-                    prev_item_id = result_id_list[current_item_id - 1]
-                if current_item_id != len(result_id_list) - 1:
-                    next_item_id = result_id_list[current_item_id + 1]
+        prev_item_id, next_item_id = self.get_neighbours(request, question_id)
 
         context = {
             'question': question_to_answer,
@@ -901,6 +669,9 @@ class SubmitAnswerView(View):
             answer.language = request.POST.get('language')
             answer.save()
 
+            if request.POST.get('mode') != 'edit':
+                question_to_answer.update_counters()
+
             # Save credits
             # delete existing credits for the answer, if any
             for credit in answer.credits.all():
@@ -925,43 +696,20 @@ class SubmitAnswerView(View):
                 messages.success(request, (_('Your answer has been updated!')))
 
                 # create notifications for users who commented on the answer
-                commentor_id_list = list(answer.comments.all()
-                                        .values_list('author')
-                                        .distinct('author'))
-                for commentor_id in commentor_id_list:
-                    if question_to_answer.language.lower() != 'english':
-                        question_text = question_to_answer.question_text_english
-                    else:
-                        question_text = question_to_answer.question_text
-
-                    edit_notification = Notification(
-                        notification_type='updated',
-                        title_text=str(request.user.get_full_name()) + ' updated their answer.',
-                        description_text="You commented on an answer for question '" + question_text + "'",
-                        target_url=reverse('dashboard:review-answer', kwargs={'question_id': question_to_answer.id, 'answer_id': answer.id}),
-                        user=User.objects.get(pk=max(commentor_id))
-                    )
-                    edit_notification.save()
-
-                # create notifications for users who commented on the answer
-                commentor_id_list = list(answer.comments.all()
-                                        .values_list('author')
-                                        .distinct('author'))
-                for commentor_id in commentor_id_list:
-                    if question_to_answer.language.lower() != 'english':
-                        question_text = question_to_answer.question_text_english
-                    else:
-                        question_text = question_to_answer.question_text
-
-                    edit_notification = Notification(
-                        notification_type='updated',
-                        title_text=str(request.user.get_full_name()) + ' updated their answer',
-                        description_text="You commented on an answer for question '" + question_text + "'",
-                        target_url=reverse('dashboard:review-answer', kwargs={'question_id': question_to_answer.id, 'answer_id': answer.id}),
-                        user=User.objects.get(pk=max(commentor_id))
-                    )
-                    edit_notification.save()
-
+                if question_to_answer.language.lower() != 'english':
+                    question_text = question_to_answer.question_text_english
+                else:
+                    question_text = question_to_answer.question_text
+
+                notify(
+                    answer.comments.values_list('author', flat=True),
+                    exclude=[request.user],
+                    background=True,
+                    notification_type='updated',
+                    title_text=str(request.user.get_full_name()) + ' updated their answer.',
+                    description_text="You commented on an answer for question '" + question_text + "'",
+                    target_url=reverse('dashboard:review-answer', kwargs={'question_id': question_to_answer.id, 'answer_id': answer.id}),
+                )
 
             else:
                 messages.success(request, (_('Thanks ' + request.user.first_name + '! Your answer will be reviewed soon!')))
@@ -1045,6 +793,7 @@ class ApproveAnswerView(View):
         answer.status = 'published'
         answer.published_on = datetime.now()
         answer.save()
+        answer.question_id.update_counters()
 
         messages.success(request, (_('Thanks ' + request.user.first_name + ' for publishing the answer, it will now be visible to all users.')))
 
@@ -1056,36 +805,26 @@ class ApproveAnswerView(View):
         else:
             question_text = question_answered.question_text
 
-        published_notification = Notification(
+        notify(
+            [answer.submitted_by_id],
             notification_type='published',
             title_text=str(request.user.get_full_name()) + ' published your answer.',
             description_text="Your answer to the question '" + question_text + "'",
             target_url=reverse('public_website:view-answer', kwargs={'question_id': question_answered.id, 'answer_id': answer.id}),
-            user=answer.submitted_by
         )
-        published_notification.save()
-
-        # create notifications for users who commented on the answer
-        commentor_id_list = list(answer.comments.all()
-          .values_list('author')
-          .distinct('author'))
-        for commentor_id in commentor_id_list:
-            # do not create notification for the user who is publishing
-            # the answer
-            if max(commentor_id) != request.user.id:
-                if question_answered.language.lower() != 'en':
-                    question_text = question_answered.question_text_english
-                else:
-                    question_text = question_answered.question_text
 
-                published_notification = Notification(
-                    notification_type='published',
-                    title_text=str(request.user.get_full_name()) + ' published ' + answer.submitted_by.first_name + "'s answer.",
-                    description_text="You commented on an answer for question '" + question_text + "'",
-                    target_url=reverse('dashboard:review-answer', kwargs={'question_id': question_answered.id, 'answer_id': answer.id}),
-                    user=User.objects.get(pk=max(commentor_id))
-                )
-                published_notification.save()
+        # create notifications for users who commented on the answer,
+        # except for the user who is publishing it and its author, who
+        # was notified above
+        notify(
+            answer.comments.values_list('author', flat=True),
+            exclude=[request.user, answer.submitted_by_id],
+            background=True,
+            notification_type='published',
+            title_text=str(request.user.get_full_name()) + ' published ' + answer.submitted_by.first_name + "'s answer.",
+            description_text="You commented on an answer for question '" + question_text + "'",
+            target_url=reverse('dashboard:review-answer', kwargs={'question_id': question_answered.id, 'answer_id': answer.id}),
+        )
 
         return redirect('dashboard:review-answers')
 
@@ -1107,6 +846,7 @@ class DeleteSubmittedAnswer(View):
 
         if answer.submitted_by == request.user:
             answer.delete()
+            answer.question_id.update_counters()
         else:
             raise PermissionDenied(_('You can only delete your own answers.'))
 
@@ -1451,75 +1191,51 @@ class CreateCommentView(CommentMixin, FormView):
 
         messages.success(self.request, 'Your comment has been posted.')
 
-        if hasattr(self.target, 'author'):
-            # Create notification for the comment
-
-            if self.target.author != self.request.user:
-                
-                Notification.objects.create(
-                    notification_type='comment',
-                    title_text=('{} left a comment on your {}.'
-                        .format(
-                            self.request.user.get_full_name(),
-                            self.target._meta.verbose_name,
-                        )),
-                    description_text=('Commented on {}'
-                        .format(self.target)),
-                    target_url=self.target.get_absolute_url(),
-                    user=self.target.author,
-                )
+        notification = {
+            'notification_type': 'comment',
+            'description_text': 'Commented on {}'.format(self.target),
+            'target_url': self.target.get_absolute_url(),
+        }
+        commentors = self.target.comments.values_list('author', flat=True)
+        author = getattr(self.target, 'author', None)
+        translator_id = getattr(self.target, 'translated_by_id', None)
 
-        if hasattr(self.target, 'comments'):
-            # Create notification for the comment for other reviewers
-
-            if self.target.translated_by != self.request.user:
-                for u in set([c.author for c in self.target.comments.all()]):
-                    
-                    if u != self.request.user:
-                        Notification.objects.create(
-                            notification_type='comment',
-                            title_text=('{} left a comment on your {}'
-                                .format(
-                                    self.request.user.get_full_name(),
-                                    self.target._meta.verbose_name,
-                                )),
-                            description_text=('Commented on {}'
-                                .format(self.target)),
-                            target_url=self.target.get_absolute_url(),
-                            user=u,
-                        )
-        if hasattr(self.target, 'translated_by'):
-            # Create notification for the comment for Translator
-
-            if self.target.translated_by != self.request.user and self.target.translated_by != None:
-                Notification.objects.create(
-                    notification_type='comment',
-                    title_text=('{} left a comment on your {}'
-                        .format(
-                            self.request.user.get_full_name(),
-                            self.target._meta.verbose_name,
-                        )),
-                    description_text=('Commented on {}'
-                        .format(self.target)),
-                    target_url=self.target.get_absolute_url(),
-                    user=self.target.translated_by,
-                )      
-            else:
-                for u in set([c.author for c in self.target.comments.all()]):
-                    
-                    if u != self.target.translated_by:
-                        Notification.objects.create(
-                            notification_type='comment',
-                            title_text=('{} (Translator) left a comment on {}'
-                                .format(
-                                    self.request.user.get_full_name(),
-                                    self.target._meta.verbose_name,
-                                )),
-                            description_text=('Commented on {}'
-                                .format(self.target)),
-                            target_url=self.target.get_absolute_url(),
-                            user=u,
-                        )
+        if author is not None:
+            # Create notification for the comment
+            notify(
+                [author],
+                exclude=[self.request.user],
+                title_text=('{} left a comment on your {}.'
+                    .format(
+                        self.request.user.get_full_name(),
+                        self.target._meta.verbose_name,
+                    )),
+                **notification)
+
+        if translator_id != self.request.user.id:
+            # Create notification for the comment for other reviewers and
+            # for the translator
+            notify(
+                list(commentors) + [translator_id],
+                exclude=[self.request.user, author],
+                title_text=('{} left a comment on your {}'
+                    .format(
+                        self.request.user.get_full_name(),
+                        self.target._meta.verbose_name,
+                    )),
+                **notification)
+        else:
+            # Create notification for the translator's comment for the
+            # reviewers
+            notify(
+                commentors,
+                exclude=[translator_id],
+                title_text=('{} (Translator) left a comment on {}'
+                    .format(
+                        self.request.user.get_full_name(),
+                        self.target._meta.verbose_name,
+                    )),
+                **notification)
 
         return super().form_valid(form)
 
@@ -1603,23 +1319,14 @@ class TranslateAnswersList(SearchView):
                                     answers__translations__isnull=True,
                                 ).distinct()
 
-                results['questions'] = query_set.filter(
-                        Q(question_text__search=request.GET.get('q')) |
-                        Q(question_text_english__search=request.GET.get('q')) |
-                        Q(school__search=request.GET.get('q')) |
-                        Q(area__search=request.GET.get('q')) |
-                        Q(state__search=request.GET.get('q')) |
-                        Q(field_of_interest__search=request.GET.get('q'))
-                )
+                results['questions'] = search(query_set, request.GET.get('q'), self.get_search_language(request), self.similar_search)
 
-                results['articles'] = (PublishedArticle.objects.filter(
-                    translations__isnull=True,
-                )
-                .filter(
-                    Q(title__search=request.GET.get('q')) |
-                    Q(body__search=request.GET.get('q'))
-                )
-                .distinct())
+                results['articles'] = search(
+                    PublishedArticle.objects.filter(
+                        translations__isnull=True,
+                    ).distinct(),
+                    request.GET.get('q'),
+                    self.get_search_language(request))
             else:
                 if 'questions' in search_categories:
                     results['questions'] = Question.objects.filter(
@@ -1661,6 +1368,9 @@ class TranslateAnswersList(SearchView):
         return filters
 
 
+    def get_listed_answers(self, request):
+        return super().get_listed_answers(request).select_related('submitted_by')
+
     def get_page_title(self, request):
         return 'Translate Content'
 
@@ -2292,6 +2002,11 @@ class DeleteQuestionTranslation(BaseDeleteTranslation):
     model = TranslatedQuestion
     template_name = 'dashboard/translations/question_delete.html'
 
+    def delete(self, request, *args, **kwargs):
+        response = super().delete(request, *args, **kwargs)
+        self.object.source.update_counters()
+        return response
+
 
 class BaseReview(DetailView):
     '''
@@ -2402,7 +2117,8 @@ class BaseApproveTranslation(View):
         # Send out notifications...
 
         # ...to the translator
-        Notification.objects.create(
+        notify(
+            [p.translated_by_id],
             notification_type='published',
             title_text=('{} published your {}.'
                 .format(
@@ -2412,11 +2128,11 @@ class BaseApproveTranslation(View):
             description_text=('Published {}'
                 .format(p)),
             target_url = p.get_absolute_url(),
-            user=p.translated_by,
         )
 
         # ...to the original author
-        Notification.objects.create(
+        notify(
+            [p.source.author],
             notification_type='published',
             title_text=((
                 '{user} translated your {source_type}'
@@ -2429,23 +2145,22 @@ class BaseApproveTranslation(View):
                 )), 
             description_text='Translated {}'.format(p.source),
             target_url=p.get_absolute_url(),
-            user=p.source.author,
         )
 
         # ...to the peer reviewers
-        for u in set([c.author for c in p.comments.all()]):
-            if u != self.request.user and u != p.translated_by:
-                Notification.objects.create(
-                    notification_type='published',
-                    title_text=((
-                        'The translation by {} that you commented on '
-                        'has been published.')
-                        .format(p.translated_by.get_full_name())
-                        ),
-                    description_text='Translated {}'.format(p.source),
-                    target_url=p.get_absolute_url(),
-                    user=u,
-                )
+        notify(
+            p.comments.values_list('author', flat=True),
+            exclude=[self.request.user, p.translated_by_id],
+            background=True,
+            notification_type='published',
+            title_text=((
+                'The translation by {} that you commented on '
+                'has been published.')
+                .format(p.translated_by.get_full_name())
+                ),
+            description_text='Translated {}'.format(p.source),
+            target_url=p.get_absolute_url(),
+        )
 
         # Create success message and return
         messages.success(request, self.success_message)
@@ -2486,6 +2201,7 @@ class ApproveAnswerTranslation(BaseApproveTranslation):
         # Also process and publish the question
         question = self.get_question_object()
         question.publish(self.request.user)
+        question.source.update_counters()
 
         return response
 
@@ -2541,6 +2257,8 @@ class AdminBulkUpdateField(View):
         queryset = self.get_queryset(request.GET.get('ids'))
 
         updated = queryset.update(**{field_name: new_value})
+        if queryset.model is Question:
+            queue_question_analytics_refresh()
         messages.success(request,
             _('%s items updated successfully.') % updated)
 
@@ -102,6 +102,70 @@ function disableSubmitExcelButtonOnPageLoad() {
     });
 }
 
+function showExcelSheetReadError() {
+    $('.validation-errors h5').html(
+        '<i class="far fa-times-circle red"></i> We are not able to read this file. Please get in touch with us to get help!'
+    )
+    $('.validation-errors h5').css('margin-bottom', '2rem');
+    $('.submit-excel').prop('disabled', true)
+}
+
+function pollDatasetJob(status_url, on_finished, on_error) {
+    $.ajax({
+        url: status_url,
+        type: 'GET',
+        success: function(job) {
+            if (job.is_finished) {
+                on_finished(job);
+            }
+            else {
+                setTimeout(function() {
+                    pollDatasetJob(status_url, on_finished, on_error);
+                }, 1000);
+            }
+        },
+        error: on_error
+    });
+}
+
+function trackDatasetJobProgress() {
+    var progress = $('.dataset-job-progress');
+
+    var show_progress = function(job) {
+        if (job.status == 'importing') {
+            progress.find('span').text(job.rows_processed + ' of ' + job.rows_total + ' rows saved');
+        }
+        else if (job.status == 'validating' || job.status == 'queued') {
+            progress.find('span').text('Checking for errors...');
+        }
+    };
+
+    var poll = function() {
+        $.ajax({
+            url: progress.data('url'),
+            type: 'GET',
+            success: function(job) {
+                show_progress(job);
+                if (!job.is_finished) {
+                    setTimeout(poll, 1000);
+                }
+                else if (job.status == 'done') {
+                    progress.find('i').attr('class', 'far fa-check-circle green');
+                    progress.find('span').text('Done! ' + job.rows_processed + ' rows saved.');
+                    progress.find('.error-list').html(job.errors);
+                }
+                else {
+                    progress.find('i').attr('class', 'far fa-times-circle red');
+                    progress.find('span').text(job.message);
+                    progress.find('.error-list').html(job.errors);
+                }
+            }
+        });
+    };
+
+    poll();
+}
+
 function processSelectedExcelSheet() {
     $('#excelFileBrowser').change(function() {
 
@@ -123,7 +187,7 @@ function processSelectedExcelSheet() {
             var excel_file = $('#excelFileBrowser')[0].files[0];
             form_data.append('excel_file', excel_file)
 
-            // validate the excel file
+            // queue the excel file for validation
             $.ajax({
                 url: $(this).data('url'),
                 type: 'POST',
@@ -131,28 +195,28 @@ function processSelectedExcelSheet() {
                 contentType: false,
                 processData: false,
                 success: function(response) {
-                    if (response == 'validated') {
-                        $('.validation-errors h5').html(
-                            '<i class="far fa-check-circle green"></i> No errors found. Great job!'
-                        )
-                        $('.validation-errors h5').css('margin-bottom', '2rem');
-                        $('.submit-excel').prop('disabled', false)
-                    }
-                    else {  
-                        $('.validation-errors h5').html(
-                            '<i class="far fa-times-circle red"></i> We found some errors in your excel file:'
-                        )
-                        $('.validation-errors .error-list').html(response)
-                        $('.submit-excel').prop('disabled', true)
-                    }
+                    pollDatasetJob(response.status_url, function(job) {
+                        if (job.status == 'done' && !job.errors) {
+                            $('.validation-errors h5').html(
+                                '<i class="far fa-check-circle green"></i> No errors found. Great job!'
+                            )
+                            $('.validation-errors h5').css('margin-bottom', '2rem');
+                            $('.validation-errors .error-list').html('')
+                            $('.submit-excel').prop('disabled', false)
+                        }
+                        else if (job.errors) {
+                            $('.validation-errors h5').html(
+                                '<i class="far fa-times-circle red"></i> We found some errors in your excel file:'
+                            )
+                            $('.validation-errors .error-list').html(job.errors)
+                            $('.submit-excel').prop('disabled', true)
+                        }
+                        else {
+                            showExcelSheetReadError();
+                        }
+                    }, showExcelSheetReadError);
                 },
-                error: function(response) {
-                    $('.validation-errors h5').html(
-                        '<i class="far fa-times-circle red"></i> We are not able to read this file. Please get in touch with us to get help!'
-                    )
-                    $('.validation-errors h5').css('margin-bottom', '2rem');
-                    $('.submit-excel').prop('disabled', true)
-                }
+                error: showExcelSheetReadError
             });
         }
         else {
@@ -170,6 +234,19 @@ function setupResultsPagination() {
         current_params.set('page', $(this).data('page'));
         location.href = window.location.origin + window.location.pathname + '?' + current_params.toString();
     });
+
+    // keyset pagination: move to the page a cursor token leads to
+    $('.cursor-button').click(function() {
+        var current_params = new URLSearchParams(location.search);
+        current_params.delete('page');
+        if ($(this).data('cursor')) {
+            current_params.set('cursor', $(this).data('cursor'));
+        }
+        else {
+            current_params.delete('cursor');
+        }
+        location.href = window.location.origin + window.location.pathname + '?' + current_params.toString();
+    });
 }
 
 function setupSearchResultsFilterPreservation() {
@@ -217,6 +294,7 @@ function setupSearchResultsFilter() {
             }
             else {
                 current_params.delete('page');
+                current_params.delete('cursor');
                 current_params.append($(this).data('param'), $(this).data('value'));
                 location.href = window.location.origin + window.location.pathname + '?' + current_params.toString();
             }
@@ -535,6 +613,50 @@ function setupUserProfileMenuTabs() {
         event.preventDefault();
         $(this).tab('show');
     });
+
+    // tabs with a data-url are loaded when first opened
+    $('#userProfileMenuTabs .nav-link').on('show.bs.tab', function(event) {
+        var tab_pane = $(event.target.hash);
+        var tab_content = tab_pane.find('.user-profile-tab-content');
+        if (tab_pane.data('url') && $.trim(tab_content.html()) == '') {
+            loadUserProfileTab(tab_content, tab_pane.data('url'));
+        }
+    });
+
+    // each list of a tab is continued on its own: the next cards of the
+    // list replace its Show more button
+    $(document).on('click', '.profile-tab-more', function() {
+        var more_button = $(this);
+        var list_name = more_button.data('list');
+        $.ajax({
+            url: more_button.parents('.tab-pane').data('url'),
+            type: 'GET',
+            data: {
+                list: list_name,
+                before: more_button.data('before'),
+            },
+            success: function(response) {
+                var list = $('<div>').html(response).find('.profile-list[data-list="' + list_name + '"]');
+                more_button.replaceWith(list.contents());
+            },
+            error: function(response) {
+                console.log(response);
+            },
+        });
+    });
+}
+
+function loadUserProfileTab(tab_content, url) {
+    $.ajax({
+        url: url,
+        type: 'GET',
+        success: function(response) {
+            tab_content.html(response);
+        },
+        error: function(response) {
+            console.log(response);
+        },
+    });
 }
 
 function setupMobileCloseUserProfileContent() {
@@ -564,12 +686,13 @@ function setupChooseProfilePictureModal() {
 
 function setupToggleCardDrawer() {
 
-    $('.open-card-drawer').click(function() {
+    // delegated, as profile tabs load their cards after the page
+    $(document).on('click', '.open-card-drawer', function() {
         $(this).parent('.card-controls').next('.card-drawer').css('display', 'flex');
         $(this).hide();
     });
 
-    $('.close-card-drawer').click(function() {
+    $(document).on('click', '.close-card-drawer', function() {
         $(this).parent('.card-drawer').css('display', 'none');
         $(this).parents('.card').find('.open-card-drawer').show();
     });
@@ -579,6 +702,7 @@ function setupGeneralContentSort() {
     $('.sort-by-option').click(function() {
         var current_params = new URLSearchParams(location.search);
         current_params.set('sort-by', $(this).data('sort'));
+        current_params.delete('cursor');
         location.href = window.location.origin + window.location.pathname + '?' + current_params.toString();
     });
 }
@@ -751,6 +875,10 @@ if (window.location.pathname.includes('/dashboard/question/submit') || window.lo
     processSelectedExcelSheet();
 }
 
+if ($('.dataset-job-progress').length) {
+    trackDatasetJobProgress();
+}
+
 if (window.location.pathname.includes('/dashboard/manage-users')) {
     setupUserListFilter();
     setupResultsPagination();
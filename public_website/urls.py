@@ -9,6 +9,7 @@ app_name = 'public_website'
 urlpatterns = [
     path('user/<int:user_id>/profile', views.UserProfileView.as_view(), name='user-profile'),
     path('user/<int:user_id>/profile/<str:active_tab>', views.UserProfileView.as_view(), name='user-profile'),
+    path('user/<int:user_id>/profile/<str:tab>/content', views.UserProfileTab.as_view(), name='user-profile-tab'),
     path('update-organisation-info', views.UpdateOrganisationInfo.as_view(), name='update-organisation-info'),
     path('update-user-password', views.UpdateUserPassword.as_view(), name='update-user-password'),
     path('update-user-name', views.UpdateUserName.as_view(), name='update-user-name'),
@@ -32,5 +33,6 @@ urlpatterns = [
     path('resources', views.ResourcesPage.as_view(), name='resources'),
     path('articles', views.ArticlesPage.as_view(), name='articles'),
     path('analytics/', views.AnalyticsPage.as_view(), name='analytics'),
+    path('analytics/data', views.AnalyticsData.as_view(), name='analytics-data'),
     path('suggest/', views.Suggestions.as_view(), name='suggestions'),
 ]
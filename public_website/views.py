@@ -17,9 +17,9 @@ from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth.hashers import check_password, make_password
 from django.http import Http404, JsonResponse
-from django.db.models import Q
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce, Left
 from django.db.models.query import QuerySet
-from django.core.paginator import Paginator
 from django.urls import reverse
 from django.core.exceptions import PermissionDenied
 from django.template.loader import render_to_string
@@ -27,6 +27,7 @@ from django.http import HttpResponse
 from django.core.mail import send_mail
 
 from django.conf import settings
+from django.core.cache import cache
 from public_website.forms import ContactPageForm
 from django.views.generic import FormView
 from django.urls import reverse
@@ -50,6 +51,19 @@ from dashboard.models import (
     AnswerTranslationCredit,
     ArticleTranslationCredit,
 )
+from dashboard.search import search, autocomplete, trigram_available
+from dashboard.facets import get_facets, CountedPaginator
+from dashboard.analytics import (
+    CUBE_FIELDS,
+    get_analytics_page_context,
+    get_question_cube,
+)
+from dashboard.pagination import (
+    KEYSET_SORTS,
+    SORT_KEYS,
+    KeysetPaginator,
+    ResultCursor,
+)
 from sawaliram_auth.models import User, Bookmark, Notification
 from public_website.models import AnswerUserComment, ContactUsSubmission
 
@@ -57,17 +71,10 @@ import re
 import random
 import urllib
 from pprint import pprint
-import json
 import requests
-import collections
 from .lang import *
 from django.db.models import Count
-import datetime
-from datetime import timedelta
-from datetime import datetime as ts
-import os
-import time
-import csv
+import hashlib
 
 
 
@@ -108,6 +115,14 @@ class SetLanguageView(View):
 
 class SearchView(View):
 
+    # 'pages' for numbered pages, 'cursor' for keyset pagination; can
+    # be chosen per request with the 'paging' parameter
+    default_paging = 'pages'
+
+    # set when the text search found nothing, to search again for
+    # similar words (see dashboard.search.search)
+    similar_search = False
+
     filters = {
         'search_categories': [],
         'question_categories': [],
@@ -163,42 +178,16 @@ class SearchView(View):
 
         if 'q' in request.GET and request.GET.get('q') != '':
             if not search_categories:
-                results['questions'] = Question.objects.filter(
-                            Q(pk__iexact=request.GET.get('q')) |
-                            Q(question_text__search=request.GET.get('q')) |
-                            Q(question_text_english__search=request.GET.get('q')) |
-                            Q(school__search=request.GET.get('q')) |
-                            Q(area__search=request.GET.get('q')) |
-                            Q(state__search=request.GET.get('q')) |
-                            Q(field_of_interest__search=request.GET.get('q')) |
-                            Q(published_source__search=request.GET.get('q'))
-                        )
-                results['articles'] = PublishedArticle.objects.filter(
-                            Q(title__search=request.GET.get('q')) |
-                            Q(pk__iexact=request.GET.get('q')) |
-                            Q(body__search=request.GET.get('q'))
-                        ).order_by('-updated_on')
+                results['questions'] = search(Question.objects.all(), request.GET.get('q'), self.get_search_language(request), self.similar_search)
+                results['articles'] = search(PublishedArticle.objects.all(), request.GET.get('q'), self.get_search_language(request), self.similar_search)
             else:
                 if 'questions' in search_categories:
-                    results['questions'] = Question.objects.filter(
-                            Q(pk__iexact=request.GET.get('q')) |
-                            Q(question_text__search=request.GET.get('q')) |
-                            Q(question_text_english__search=request.GET.get('q')) |
-                            Q(school__search=request.GET.get('q')) |
-                            Q(area__search=request.GET.get('q')) |
-                            Q(state__search=request.GET.get('q')) |
-                            Q(field_of_interest__search=request.GET.get('q')) |
-                            Q(published_source__search=request.GET.get('q'))
-                        )
+                    results['questions'] = search(Question.objects.all(), request.GET.get('q'), self.get_search_language(request), self.similar_search)
                 else:
                     results['questions'] = Question.objects.none()
 
                 if 'articles' in search_categories:
-                    results['articles'] = PublishedArticle.objects.filter(
-                            Q(title__search=request.GET.get('q')) |
-                            Q(pk__iexact=request.GET.get('q')) |
-                            Q(body__search=request.GET.get('q'))
-                        ).order_by('-updated_on')
+                    results['articles'] = search(PublishedArticle.objects.all(), request.GET.get('q'), self.get_search_language(request), self.similar_search)
                 else:
                     results['articles'] = PublishedArticle.objects.none()
         else:
@@ -242,6 +231,126 @@ class SearchView(View):
         else:
             return ""
 
+    def get_listed_answers(self, request):
+        """
+        Returns the answers to show under each question (can be
+        overridden by subclasses)
+        """
+        return Answer.objects.filter(status=Answer.STATUS_PUBLISHED)
+
+    def prefetch_answers(self, request, questions):
+        """
+        Fetches the listed answers of the questions, with their credits
+        and number of comments, in a fixed number of queries
+        """
+        answers = self.get_listed_answers(request) \
+            .annotate(comment_count=Count('comments')) \
+            .prefetch_related('credits')
+
+        return questions.prefetch_related(
+            Prefetch('answers', queryset=answers, to_attr='listed_answers'))
+
+    def filter_by_category(self, questions):
+        """
+        Returns the questions in the selected question categories
+        (answered, unanswered)
+        """
+        # TODO: Generalise the category filter
+        question_categories = self.filters.get('question_categories', [])
+        if len(question_categories) != 0:
+            questions_queryset = []
+
+            if 'answered' in question_categories:
+                answered_questions = questions.filter(published_answer_count__gt=0)
+                questions_queryset = answered_questions
+
+            if 'unanswered' in question_categories:
+                unanswered_questions = questions.filter(published_answer_count=0)
+
+                if isinstance(questions_queryset, QuerySet):
+                    questions_queryset = questions_queryset | unanswered_questions
+                else:
+                    questions_queryset = unanswered_questions
+
+            questions = questions_queryset
+
+        return questions
+
+    def get_selected_facets(self, request):
+        """
+        Returns the values the results are filtered by, per facet field
+        """
+        parameters = {
+            'field_of_interest': 'subject',
+            'state': 'state',
+            'curriculum_followed': 'curriculum',
+            'language': 'language',
+        }
+        return {
+            field: [urllib.parse.unquote(item) for item in request.GET.getlist(parameter)]
+            for field, parameter in parameters.items()
+        }
+
+    def filter_by_facets(self, questions, selected_facets):
+        """
+        Returns the questions matching the selected facet values
+        """
+        for field, values in selected_facets.items():
+            if values:
+                questions = questions.filter(**{field + '__in': values})
+        return questions
+
+    def get_sort_by(self, request):
+        """
+        Returns the sort order of the results; by default, newest first,
+        or the most relevant first when searching, and the least
+        discussed first on Review Answers
+        """
+        if self.get_page_title(request) == _('Review Answers'):
+            return request.GET.get('sort-by', 'comments')
+        elif self.get_search_query(request):
+            return request.GET.get('sort-by', 'relevance')
+        else:
+            return request.GET.get('sort-by', 'newest')
+
+    def sort_questions(self, questions, sort_by):
+        """
+        Returns the questions in the given sort order
+        """
+        if sort_by == 'newest':
+            questions = questions.order_by('-created_on', '-id')
+        if sort_by == 'oldest':
+            questions = questions.order_by('created_on', 'id')
+        # 'comments' and 'relevance' are ordered by get_querysets
+        if sort_by == "date":
+            questions = questions.order_by('published_date', 'id')
+        return questions
+
+    def get_questions(self, request):
+        """
+        Returns the questions of the listing for the request's
+        parameters, in the order they are listed in; used to step
+        through them (see dashboard.pagination.ResultCursor)
+        """
+        self.set_filters(request.GET)
+        questions = self.get_querysets(request).get('questions')
+        if questions is None:
+            return Question.objects.none()
+
+        questions = self.filter_by_category(questions)
+        questions = self.filter_by_facets(questions, self.get_selected_facets(request))
+        return self.sort_questions(questions, self.get_sort_by(request))
+
+    def get_search_language(self, request):
+        """
+        Returns the language to search in, if the results are filtered
+        by exactly one language
+        """
+        languages = request.GET.getlist('language')
+        if len(languages) == 1:
+            return urllib.parse.unquote(languages[0])
+        return None
+
     def get(self, request):
 
         # load page from session if arriving from Submit Answer/Review Answer
@@ -261,8 +370,14 @@ class SearchView(View):
 
         results = self.get_querysets(request)
 
-        questions = results.get('questions') or Question.objects.none()
-        articles = results.get('articles') or Article.objects.none()
+        # checked against None, as the truth value of a queryset would
+        # fetch all of its rows
+        questions = results.get('questions')
+        if questions is None:
+            questions = Question.objects.none()
+        articles = results.get('articles')
+        if articles is None:
+            articles = Article.objects.none()
 
         # get values for filter
         subjects = [
@@ -279,128 +394,122 @@ class SearchView(View):
             'Arts & Recreation',
         ]
 
-        # TODO: Generalise the category filter
         question_categories = self.filters.get('question_categories', [])
-        if len(question_categories) != 0:
-            questions_queryset = []
-
-            if 'answered' in question_categories:
-                answered_questions = questions.filter(answers__status='published')
-                questions_queryset = answered_questions
-
-            if 'unanswered' in question_categories:
-                unanswered_questions = questions.exclude(answers__status='published')
-
-                if type(questions_queryset) is QuerySet:
-                    questions_queryset = questions_queryset | unanswered_questions
-                else:
-                    questions_queryset = unanswered_questions
-
-            questions = questions_queryset
-
-
-        available_subjects = list(questions.order_by()
-                                        .values_list('field_of_interest', flat=True)
-                                        .distinct('field_of_interest')
-                                        .values_list('field_of_interest'))
-
-        # convert list of tuples to list of strings
-        available_subjects = [''.join(item) for item in available_subjects]
-
-        states = questions.order_by() \
-            .values_list('state') \
-            .distinct('state') \
-            .values('state') \
-            .exclude(state__exact='') \
-            .exclude(state__isnull=True)
-
-        curriculums = questions.order_by() \
-                            .values_list('curriculum_followed') \
-                            .distinct('curriculum_followed') \
-                            .values('curriculum_followed') \
-                            .exclude(curriculum_followed__exact='') \
-                            .exclude(curriculum_followed__isnull=True)
-
-        languages = questions.order_by() \
-            .values_list('language') \
-            .distinct('language') \
-            .values('language') \
-            .exclude(language__exact='') \
-            .exclude(language__isnull=True)
+        questions = self.filter_by_category(questions)
 
         # apply filters if any
-        subjects_to_filter_by = [urllib.parse.unquote(item) for item in request.GET.getlist('subject')]
-        if subjects_to_filter_by:
-            questions = questions.filter(field_of_interest__in=subjects_to_filter_by)
-
-        states_to_filter_by = [urllib.parse.unquote(item) for item in request.GET.getlist('state')]
-        if states_to_filter_by:
-            questions = questions.filter(state__in=states_to_filter_by)
+        selected_facets = self.get_selected_facets(request)
+        subjects_to_filter_by = selected_facets['field_of_interest']
+        states_to_filter_by = selected_facets['state']
+        curriculums_to_filter_by = selected_facets['curriculum_followed']
+        languages_to_filter_by = selected_facets['language']
+
+        # get values and counts for filters, and the number of results,
+        # in one query
+        facets = get_facets(questions, selected_facets)
+
+        available_subjects = facets.values('field_of_interest')
+        subject_counts = [
+            (subject, facets.counts['field_of_interest'].get(subject, 0))
+            for subject in subjects
+        ]
+        states = [
+            {'state': state, 'count': facets.counts['state'][state]}
+            for state in facets.values('state')
+        ]
+        curriculums = [
+            {'curriculum_followed': curriculum, 'count': facets.counts['curriculum_followed'][curriculum]}
+            for curriculum in facets.values('curriculum_followed')
+        ]
+        languages = [
+            {'language': language, 'count': facets.counts['language'][language]}
+            for language in facets.values('language')
+        ]
 
-        curriculums_to_filter_by = [urllib.parse.unquote(item) for item in request.GET.getlist('curriculum')]
-        if curriculums_to_filter_by:
-            questions = questions.filter(curriculum_followed__in=curriculums_to_filter_by)
+        questions = self.filter_by_facets(questions, selected_facets)
 
-        languages_to_filter_by = [urllib.parse.unquote(item) for item in request.GET.getlist('language')]
         if languages_to_filter_by:
-            questions = questions.filter(language__in=languages_to_filter_by)
             articles = articles.filter(language__in=languages_to_filter_by) # TODO support translations
 
+        question_count = facets.filtered_total
+        article_count = articles.count()
+
+        if (not facets.total and not article_count
+                and self.get_search_query(request)
+                and not self.similar_search
+                and trigram_available()):
+            # nothing matched the text search: look for similar words
+            self.similar_search = True
+            return self.get(request)
 
-        # sort the questions if sort-by parameter exists
-        # default: newest and comments(for Review Answers page)
-        page_title = self.get_page_title(request)
-        if page_title == _('Review Answers'):
-            sort_by = request.GET.get('sort-by', 'comments')
-        else:
-            sort_by = request.GET.get('sort-by', 'newest')
 
+        page_title = self.get_page_title(request)
+        sort_by = self.get_sort_by(request)
+        questions = self.sort_questions(questions, sort_by)
 
         if sort_by == 'newest':
-            questions = questions.order_by('-created_on')
             articles = articles.order_by('-published_on')
-        if sort_by == 'oldest':
-            questions = questions.order_by('created_on')
-            articles = articles.order_by('published_on')
-        if sort_by == 'comments':
-            questions = questions
-            articles = articles
-        if sort_by == "date":
-            questions = questions.order_by('published_date')
+        if sort_by == 'oldest' or sort_by == 'date':
             articles = articles.order_by('published_on')
 
-        # save list of IDs for Submit Answer/Review Answer
+        # save the results for the Prev/Next buttons of Submit Answer
         if page_title == _('Review Answers') or page_title == _('Answer Questions'):
-            result_id_list = [id['id'] for id in questions.values('id')]
-            request.session['result_id_list'] = result_id_list
+            sort_key = SORT_KEYS.get(sort_by)
+            if sort_by == 'relevance' and not self.get_search_query(request):
+                # results are only ranked when searching
+                sort_key = None
+            if sort_by == 'comments' and page_title != _('Review Answers'):
+                # only answers under review have their comments counted
+                sort_key = None
+
+            result_cursor = ResultCursor.save(self, request.GET, sort_key) if sort_key else None
+            if result_cursor:
+                if request.session.get('result_cursor') != result_cursor:
+                    request.session['result_cursor'] = result_cursor
+            elif 'result_cursor' in request.session:
+                del request.session['result_cursor']
         
 
         ITEMS_PER_PAGE = 15
 
-        paginator = Paginator(questions, ITEMS_PER_PAGE)
-        page = request.GET.get('page', 1)
+        questions = self.prefetch_answers(request, questions)
 
+        # keyset pagination only works for the orderings by creation date
+        paging = request.GET.get('paging', self.default_paging)
+        cursor_pagination = paging == 'cursor' and sort_by in KEYSET_SORTS
+        search_categories = self.filters.get('search_categories', [])
 
-        # Adding the number of questions/articles being shown based on the page number
-        start_index = (int(page)-1)*ITEMS_PER_PAGE + 1
+        if cursor_pagination:
+            paginator = KeysetPaginator(questions, ITEMS_PER_PAGE, descending=KEYSET_SORTS[sort_by])
+            questions_page_one = paginator.get_page(request.GET.get('cursor'))
 
-        search_categories = self.filters.get('search_categories', [])
+            page = 1 if questions_page_one.start_index == 1 else None
+            start_index = questions_page_one.start_index
+            end_index = questions_page_one.end_index
 
-        if ('articles' in search_categories and not 'questions' in search_categories):
-            if (start_index + ITEMS_PER_PAGE <=  articles.count()):
-                end_index = start_index + ITEMS_PER_PAGE
-            else:
-                end_index = articles.count()
+            # the facet count is cached, so it may be a little behind
+            question_count = max(question_count, end_index)
         else:
-            if (start_index + ITEMS_PER_PAGE <= questions.count()):
-                end_index = start_index + ITEMS_PER_PAGE
-            else:
-                end_index = questions.count() + articles.count()
-        print(start_index, end_index)
+            paginator = CountedPaginator(questions, ITEMS_PER_PAGE, question_count)
+            questions_page_one = paginator.get_page(request.GET.get('page', 1))
 
+            # the cached count is corrected when the page is fetched
+            question_count = paginator.count
+            page = questions_page_one.number
 
+            # Adding the number of questions/articles being shown based on the page number
+            start_index = (int(page)-1)*ITEMS_PER_PAGE + 1
 
-        questions_page_one = paginator.get_page(page)
+            if ('articles' in search_categories and not 'questions' in search_categories):
+                if (start_index + ITEMS_PER_PAGE <= article_count):
+                    end_index = start_index + ITEMS_PER_PAGE
+                else:
+                    end_index = article_count
+            else:
+                if (start_index + ITEMS_PER_PAGE <= question_count):
+                    end_index = start_index + ITEMS_PER_PAGE
+                else:
+                    end_index = question_count + article_count
 
         # get list of IDs of bookmarked items
         bookmark_id_list = Bookmark.objects.filter(user_id=request.user.id) \
@@ -413,10 +522,11 @@ class SearchView(View):
             'page_title': page_title,
             'enable_breadcrumbs': self.get_enable_breadcrumbs(request),
             'questions': questions_page_one,
-            'result_size': questions.count(), 
+            'result_size': question_count,
             'start_index': start_index,
             'end_index': end_index,
             'subjects': subjects,
+            'subject_counts': subject_counts,
             'available_subjects': available_subjects,
             'states': states,
             'curriculums': curriculums,
@@ -428,15 +538,16 @@ class SearchView(View):
             'bookmarks': bookmarks,
             'search_query': self.get_search_query(request),
             'sort_by': sort_by,
-            'question_categories': question_categories
+            'question_categories': question_categories,
+            'cursor_pagination': cursor_pagination,
         }
 
         # only show articles on first page
         # TODO: make pagination smarter and inclusive
         # of all data types
-        if articles and page == 1:
+        if article_count and page == 1:
             context['articles'] = articles
-            context['result_size'] = context['result_size'] + articles.count()
+            context['result_size'] = context['result_size'] + article_count
 
         # create list of active categories
         if page_title == _('Search') or page_title == _('Translate Content'):
@@ -607,63 +718,217 @@ class DeleteUserCommentOnAnswer(View):
         )
 
 
+class UserProfileTab(View):
+    '''
+    Return the cards of one tab of a user profile, a page at a time. The
+    profile page loads its tabs from here when they are first opened, so
+    it doesn't fetch every answer and article of the user up front. Each
+    list of a tab is paged on its own, by ID: ?list=<name>&before=<id>
+    returns the next cards of that list only.
+    '''
+
+    templates = {
+        'drafts': 'public_website/includes/profile-drafts.html',
+        'notifications': 'public_website/includes/profile-notifications.html',
+        'submissions': 'public_website/includes/profile-submissions.html',
+        'bookmarks': 'public_website/includes/profile-bookmarks.html',
+    }
+    # tabs that are only shown to the user themselves
+    private_tabs = {'drafts', 'notifications', 'bookmarks'}
+    # cards per list and page
+    page_size = 10
+    # characters of answer and article text fetched for the card excerpts
+    excerpt_length = 1000
+
+    def get(self, request, user_id, tab):
+        if tab not in self.templates:
+            raise Http404
+
+        selected_user = get_object_or_404(User, id=user_id)
+        if tab in self.private_tabs and selected_user != request.user:
+            raise Http404
+
+        list_name = request.GET.get('list')
+        try:
+            before = int(request.GET.get('before', ''))
+        except ValueError:
+            before = None
+
+        lists = self.get_lists(selected_user, tab)
+        if list_name is not None:
+            if list_name not in lists:
+                raise Http404
+            lists = {list_name: lists[list_name]}
+
+        context = self.get_context(selected_user, lists, before)
+        return HttpResponse(render_to_string(self.templates[tab], context, request))
+
+    @classmethod
+    def get_context(cls, selected_user, lists, before=None):
+        '''
+        Return the first page_size cards of each list, newest first, or
+        the ones before the card with the given ID. <list>_more is the ID
+        to continue the list from, or None if there are no more cards.
+        '''
+
+        context = {
+            'selected_user': selected_user,
+        }
+        for name, queryset in lists.items():
+            if before is not None:
+                queryset = queryset.filter(pk__lt=before)
+
+            # one extra card tells if there are more
+            items = list(queryset.order_by('-pk')[:cls.page_size + 1])
+            context[name] = items[:cls.page_size]
+            context[name + '_more'] = items[cls.page_size - 1].pk if len(items) > cls.page_size else None
+
+        return context
+
+    @classmethod
+    def with_excerpt(cls, queryset, field, source_field=None):
+        '''
+        Fetch the start of a text field as excerpt instead of all of it,
+        and for translations, the start of a field of their source as
+        source_excerpt
+        '''
+
+        queryset = queryset.defer(field).annotate(excerpt=Left(field, cls.excerpt_length))
+        if source_field:
+            queryset = queryset.defer('source__' + source_field).annotate(
+                source_excerpt=Left('source__' + source_field, cls.excerpt_length))
+        return queryset
+
+    @classmethod
+    def get_lists(cls, selected_user, tab):
+        user_id = selected_user.id
+
+        if tab == 'drafts':
+            return {
+                'answer_drafts': cls.with_excerpt(
+                    Answer.objects.filter(submitted_by=user_id, status='draft'),
+                    'answer_text').select_related('question_id'),
+                'article_drafts': cls.with_excerpt(
+                    ArticleDraft.objects.filter(author=user_id), 'body'),
+                'translated_answer_drafts': cls.with_excerpt(
+                    DraftAnswerTranslation.objects.filter(translated_by=user_id),
+                    'answer_text', 'answer_text').select_related('source', 'source__question_id'),
+                'translated_article_drafts': cls.with_excerpt(
+                    DraftArticleTranslation.objects.filter(translated_by=user_id),
+                    'body', 'body').select_related('source'),
+            }
+
+        if tab == 'notifications':
+            return {
+                'notifications': Notification.objects.filter(user=user_id),
+            }
+
+        if tab == 'submissions':
+            return {
+                'submitted_questions': Dataset.objects.filter(submitted_by=user_id),
+                'submitted_answers': cls.with_excerpt(
+                    Answer.objects.filter(submitted_by=user_id, status='submitted'),
+                    'answer_text').select_related('question_id'),
+                'published_answers': cls.with_excerpt(
+                    Answer.objects.filter(submitted_by=user_id, status='published'),
+                    'answer_text').select_related('question_id'),
+                'submitted_articles': cls.with_excerpt(
+                    SubmittedArticle.objects.filter(author=user_id), 'body'),
+                'published_articles': cls.with_excerpt(
+                    PublishedArticle.objects.filter(author=user_id), 'body'),
+                'submitted_answer_translations': cls.with_excerpt(
+                    SubmittedAnswerTranslation.objects.filter(translated_by=user_id),
+                    'answer_text').select_related('source', 'source__question_id'),
+                'submitted_article_translations': cls.with_excerpt(
+                    SubmittedArticleTranslation.objects.filter(translated_by=user_id),
+                    'body').select_related('source'),
+                'published_answer_translations': cls.with_excerpt(
+                    PublishedAnswerTranslation.objects.filter(translated_by=user_id),
+                    'answer_text').select_related('source', 'source__question_id'),
+                'published_article_translations': cls.with_excerpt(
+                    PublishedArticleTranslation.objects.filter(translated_by=user_id),
+                    'body').select_related('source'),
+            }
+
+        if tab == 'bookmarks':
+            return {
+                'bookmarked_questions': selected_user.bookmarks
+                    .filter(content_type='question')
+                    .select_related('question'),
+                'bookmarked_articles': selected_user.bookmarks
+                    .filter(content_type='article'),
+            }
+
+        return {}
+
+
 class UserProfileView(View):
 
     def get(self, request, user_id, active_tab='settings'):
 
-        if not User.objects.filter(id=user_id).exists():
-            raise Http404
+        selected_user = get_object_or_404(
+            User.objects.annotate(**self.get_count_annotations()),
+            id=user_id)
+
+        # the tab shown first is rendered with the page, the others are
+        # loaded when opened
+        if selected_user != request.user:
+            loaded_tab = 'submissions'
+        elif active_tab in UserProfileTab.templates:
+            loaded_tab = active_tab
         else:
-            selected_user = User.objects.get(id=user_id)
-            answer_drafts = Answer.objects.filter(submitted_by=user_id, status='draft')
-            article_drafts = ArticleDraft.objects.filter(author=user_id)
-            translated_answer_drafts = DraftAnswerTranslation.objects.filter(translated_by=user_id)
-            translated_article_drafts = DraftArticleTranslation.objects.filter(translated_by=user_id)
-            notifications = Notification.objects.filter(user=user_id)
-            submitted_questions = Dataset.objects.filter(submitted_by=user_id)
-            submitted_answers = Answer.objects.filter(submitted_by=user_id, status='submitted')
-            submitted_articles = SubmittedArticle.objects.filter(author=user_id)
-            submitted_answer_translations = SubmittedAnswerTranslation.objects.filter(translated_by=user_id)
-            submitted_article_translations = SubmittedArticleTranslation.objects.filter(translated_by=user_id)
-            published_answers = Answer.objects.filter(submitted_by=user_id, status='published')
-            published_articles = PublishedArticle.objects.filter(author=user_id)
-            published_answer_translations = PublishedAnswerTranslation.objects.filter(translated_by=user_id)
-            published_article_translations = PublishedArticleTranslation.objects.filter(translated_by=user_id)
-            bookmarked_questions = selected_user.bookmarks.filter(content_type='question')
-            bookmarked_articles = selected_user.bookmarks.filter(content_type='article')
-            context = {
-                'dashboard': 'False',
-                # Translators: This is the title for the User Profile page
-                'page_title': _("%(name)s's Profile") % {
-                    'name': selected_user.first_name,
-                },
-                'selected_user': selected_user,
-                'answer_drafts': answer_drafts,
-                'article_drafts': article_drafts,
-                'translated_answer_drafts': translated_answer_drafts,
-                'translated_article_drafts': translated_article_drafts,
-                'notifications': notifications,
-                'submitted_questions': submitted_questions,
-                'submitted_answers': submitted_answers,
-                'submitted_articles': submitted_articles,
-                'submitted_answer_translations': submitted_answer_translations,
-                'submitted_article_translations': submitted_article_translations,
-                'published_articles': published_articles,
-                'published_answers': published_answers,
-                'published_answer_translations': published_answer_translations,
-                'published_article_translations': published_article_translations,
-                'answers_count': len(submitted_answers) + len(published_answers),
-                'translations_count': (
-                    submitted_answer_translations.count() +
-                    submitted_article_translations.count() +
-                    published_answer_translations.count() +
-                    published_article_translations.count()
-                ),
-                'bookmarked_questions': bookmarked_questions,
-                'bookmarked_articles': bookmarked_articles,
-                'active_tab': active_tab,
-            }
-            return render(request, 'public_website/user-profile.html', context)
+            loaded_tab = None
+
+        context = {
+            'dashboard': 'False',
+            # Translators: This is the title for the User Profile page
+            'page_title': _("%(name)s's Profile") % {
+                'name': selected_user.first_name,
+            },
+            'selected_user': selected_user,
+            'dataset_count': selected_user.dataset_count,
+            'answers_count': selected_user.answers_count,
+            'article_count': selected_user.article_count,
+            'translations_count': selected_user.translations_count,
+            'active_tab': active_tab,
+            'loaded_tab': loaded_tab,
+        }
+        if loaded_tab:
+            context.update(UserProfileTab.get_context(
+                selected_user,
+                UserProfileTab.get_lists(selected_user, loaded_tab)))
+
+        return render(request, 'public_website/user-profile.html', context)
+
+    def get_count_annotations(self):
+        '''
+        Return the submission counts of the profile as annotations on
+        User, so they are fetched with the user in one query
+        '''
+
+        def count_of(queryset, user_field):
+            return Coalesce(
+                Subquery(queryset
+                    .filter(**{user_field: OuterRef('pk')})
+                    .order_by()
+                    .values(user_field)
+                    .annotate(count=Count('id'))
+                    .values('count')),
+                0)
+
+        return {
+            'dataset_count': count_of(Dataset.objects.all(), 'submitted_by'),
+            'answers_count': count_of(
+                Answer.objects.filter(status__in=['submitted', 'published']),
+                'submitted_by'),
+            'article_count': count_of(PublishedArticle.objects.all(), 'author'),
+            'translations_count': (
+                count_of(SubmittedAnswerTranslation.objects.all(), 'translated_by') +
+                count_of(SubmittedArticleTranslation.objects.all(), 'translated_by') +
+                count_of(PublishedAnswerTranslation.objects.all(), 'translated_by') +
+                count_of(PublishedArticleTranslation.objects.all(), 'translated_by')
+            ),
+        }
 
 
 class UpdateUserName(View):
@@ -882,290 +1147,55 @@ class ArticlesPage(View):
 
 
 class AnalyticsPage(View):
-
-    #Dictionary to hold {state_name:state_ISO_code}
-    state_code = {'lakshadweep': 'LD', 'andaman and nicobar islands': 'AN', 'andaman & nicobar': 'AN', 'maharashtra': 'MH', 
-                'andhra pradesh': 'AP', 'meghalaya': 'ML', 'arunachal pradesh': 'AR', 'manipur': 'MN', 'assam': 'AS', 
-                'madhya pradesh': 'MP', 'bihar': 'BR', 'mizoram': 'MZ', 'chandigarh': 'CH', 'nagaland': 'NL', 
-                'chhattisgarh': 'CT', 'odisha': 'OR', 'daman and diu': 'DD', 'punjab': 'PB', 'delhi': 'DL', 
-                'puducherry': 'PY', 'dadra and nagar haveli': 'DN', 'rajasthan': 'RJ', 'goa': 'GA', 'sikkim': 'SK', 
-                'gujarat': 'GJ', 'telangana': 'TG', 'himachal pradesh': 'HP', 'tamil nadu': 'TN', 'haryana': 'HR', 
-                'tripura': 'TR', 'jharkhand': 'JH', 'uttar pradesh': 'UP', 'jammu and kashmir': 'JK', 'jammu & kashmir': 'JK', 'uttarakhand': 'UT', 
-                'karnataka': 'KA', 'west bengal': 'WB', 'kerala': 'KL'}
-
     def get(self, request):
         """
         Returns the home page of analytics app.
         """
-        # Translators: For all the language names in the database we need tranlation 
-        # Each function getABC() returns the data for the ABC which is then added to context.
-
-        year_labels, year_counts = self.getYearAsked()
-        lang_names, lang_counts = self.getQuestionLanguages()
-        gender_labels, gender_counts = self.getGenderStat()
-        mlang_names, mlang_counts = self.getMediumLanguage()
-        class_labels, class_counts = self.getStudentClassStat()
-        # Stats for doughnut charts
-        format_labels, format_counts = self.getQuestionFormatStats()
-        curriculum_labels, curriculum_counts = self.getCurriculumStats()
-        context_labels, context_counts = self.getContextStats()
-        states, codes, counts = self.getMapStats()
-        
-        return render(request, 'public_website/analytics-home.html', 
-            {"page_title": _('Analytics'), 
-            "question_counter": self.getQuestionCount(),
-            "lang_names" : self.fix(lang_names, apply_ = True),
-            "lang_counts" : self.fix(lang_counts),
-            "year_labels" : self.fix(year_labels, apply_ = True),
-            "year_counts" : self.fix(year_counts),
-            "gender_counts" : self.fix(gender_counts),
-            "gender_labels" : self.fix(gender_labels, apply_ = True),
-            "mlang_names" : self.fix(mlang_names, apply_ = True),
-            "mlang_counts" : self.fix(mlang_counts),
-            "class_labels" : self.fix(map(str, class_labels), apply_ = True),
-            "class_counts" : self.fix(class_counts),
-            "format_labels" : self.fix(format_labels, apply_ = True),
-            "format_counts" : self.fix(format_counts),
-            "curriculum_labels" : self.fix(curriculum_labels, apply_ = True),
-            "curriculum_counts" : self.fix(curriculum_counts),
-            "context_labels" : self.fix(context_labels, apply_ = True),
-            "context_counts" : self.fix(context_counts),
-            "state_names" : self.fix(states, apply_ = True),
-            "state_codes" : self.fix(codes),
-            "state_counts" : self.fix(counts),
-            "languageGenderDictionary": self.getLanguageGenderDictionary(),
-            "genderSubjectDictionary": self.getGenderSubjectDictionary(),
-            })
-
-
-    def getQuestionCount(self, params = None):
-        return Question.objects.count()
-
-
-    def getQuestionLanguages(self, params=None):
-        distinct = Question.objects.values('language').annotate(count=Count('language'))
-        lang_names = []         # list to hold the name of the language
-        lang_counts = []        # list to hold the count of question for the language corresponding to name in lang_names 
-        for lang in distinct:
-            lang_code = lang['language']
-            if lang_code in language_name:
-                lang_name = language_name[lang_code]
-            else:
-                lang_name = lang_code
 
-            if lang_name in lang_names:
-                # if the language name is twice in the list for any reason then reject it. (Workaround)
-                # Note: This is caused due to nonuniform labelling of languages in Database. 
-                continue
+        context = get_analytics_page_context()
+        return render(request, 'public_website/analytics-home.html', context)
 
-            lang_names.append(lang_name)
-            lang_counts.append(lang['count'])
 
-        return lang_names, lang_counts
+class AnalyticsData(View):
+    def get(self, request):
+        '''
+        Return the number of questions per combination of the fields in
+        group_by (comma-separated), among the questions matching the
+        parameters named after analytics fields, e.g.
+        ?group_by=year_asked&state=Goa&state=Kerala. Other parameters,
+        like cache busters, are ignored.
+        '''
 
+        group_by = [field for field in request.GET.get('group_by', '').split(',') if field]
+        filters = {
+            field: request.GET.getlist(field)
+            for field in CUBE_FIELDS
+            if field in request.GET
+        }
 
-    def getYearAsked(self, params = None):
-        distinct = Question.objects.values('question_asked_on').annotate(count=Count('question_asked_on'))
-        year_tuples = [(tple['question_asked_on'].year if tple['question_asked_on'] else None, tple['count']) for tple in distinct ]
-        year_dict = {}
-        for year, count in year_tuples:
-            if year is None:  #Some tuples might be None due to null value in database
-                continue
-            if year not in year_dict:
-                year_dict[year] = count
-            else:
-                year_dict[year] += count
-        # Now we shall generate the lists of year labels and counts
-        year_label, year_count = [], []
-        ordered_tuples = collections.OrderedDict(sorted(year_dict.items()))
-        year_labels = list(map(str, ordered_tuples.keys()))
-        year_counts = list(ordered_tuples.values())
-        return year_labels, year_counts
-
-
-    def getGenderStat(self, params = None):
-        gender_list = ["Male", "Female", "Non-binary", ""]
-        gender_data = []
-        for gender in gender_list:
-                gender_data.append(Question.objects.filter(student_gender = gender).count())
-        return ["Male", "Female", "Non-binary", "Not known"], gender_data
-
-    def getGenderSubjectDictionary(self, params= None):
-        gender_list = ["Male", "Female", "Non-binary", ""]
-        # following list is used due to inconsistent naming in database for history, philosophy and practice of science
-        history_and_philosophy = [
-                'History-Philosophy and Practice of Science', 
-                'History - Philosophy and Practice of Science', 
-                'History - Philosophy & Practice of Science', 
-                'History, Philosophy & Practice of Science'
-        ]
+        unknown_fields = [field for field in group_by if field not in CUBE_FIELDS]
+        if unknown_fields:
+            return JsonResponse(
+                {'error': _('Unknown fields: %s') % ', '.join(unknown_fields)},
+                status=400)
+
+        total, counts = get_question_cube().get_counts(group_by, filters)
+        return JsonResponse({'total': total, 'counts': counts})
 
-        #dictionary to hold name of the subject as the key, and all its aliases in the database in a list as the value
-        non_stems_subjects = {
-                'Humans & Society': ['Humans & Society'], 
-                'Geography & History': ['Geography & History'], 
-                'Arts & Recreation':['Arts & Recreation'], 
-                'Language & Literature':['Language & Literature']
-        }
-        stems_subjects = {
-                'Mathematics':['Mathematics'], 
-                'Earth & Environment': ['Earth & Environment'], 
-                'Biology': ['Biology'], 
-                'Chemistry': ['Chemistry'], 
-                'Physics':['Physics'], 
-                'Technology & Applied Science':['Technology & Applied Science'], 
-                'History, Philosophy and Practice of Science': history_and_philosophy
-        }  # history/philosophy is part of STEMS : Update as per JR's comment on Zulip
-           # Earth & Environment is part of STEMS
-        
-        genderSubjectDictionary = {'Male': {}, 'Female': {}, 'Non-binary': {}, 'Not known': {}}
-        for gender in gender_list:
-            for subject_name in stems_subjects:
-                genderSubjectDictionary[_(gender) if gender!='' else _("Not known")][_(subject_name)]  \
-                =  sum([Question.objects.filter(student_gender = gender, field_of_interest = subject_alias).count() for subject_alias in stems_subjects[subject_name]])
-            
-            for subject_name in non_stems_subjects:
-                genderSubjectDictionary[_(gender) if gender!='' else _("Not known")][_(subject_name)]   \
-                =  sum([Question.objects.filter(student_gender = gender, field_of_interest = subject_alias).count() for subject_alias in non_stems_subjects[subject_name]])
-
-        return genderSubjectDictionary
-
-    def getLanguageGenderDictionary(self, params = None):
-        gender_list = ["Male", "Female", "Non-binary", ""]
-        language_list = list(map(lambda x: x[0], Question.objects.order_by().values_list('language').distinct()))
-        lang_names = [language_name[lang] if lang in language_name else lang for lang in language_list]  # get the proper names of languages
-        languageGenderDictionary = {lang_name: {} for lang_name in lang_names}
-        for lang_index in range(len(language_list)):
-            for gender in gender_list:
-                lang = language_list[lang_index]
-                lang_name = lang_names[lang_index]
-                languageGenderDictionary[_(lang_name)][_(gender) if gender!='' else _("Not known")] = Question.objects.filter(student_gender = gender, language = lang).count()
-        return languageGenderDictionary
-
-    def getMediumLanguage(self, params = None):
-        distinct = Question.objects.values('medium_language').annotate(count=Count('medium_language'))
-        mlang_names = []         # list to hold the name of the language
-        mlang_counts = []        # list to hold the count of question for the language corresponding to name in lang_names 
-        for lang in distinct:
-            lang_code = lang['medium_language']
-            if lang_code in language_name:              # This won't work here because medium is not stored using language code
-                lang_name = language_name[lang_code]    # Might be useful if the database if updated and medium language is stored using code
-            else:
-                lang_name = lang_code
-            if lang_name in mlang_names:
-                # if the language name is twice in the list for any reason then reject it. (Workaround)
-                continue
-            if lang_name == "":         # null values for languages are captured as "Other" 
-                lang_name = "Other"  
-            mlang_names.append(lang_name)
-            mlang_counts.append(lang['count'])
-        return mlang_names, mlang_counts
-
-    def getStudentClassStat(self, params = None):
-        distinct = Question.objects.values('student_class').annotate(count=Count('student_class'))
-        class_tuples = sorted([(tple['student_class'] if tple['student_class'] else "Not known", tple['count']) for tple in distinct], key = lambda item : item[0])
-        # Cleaning tuples as classes are stored as 10, 10.0 ... etc
-        ## Can use: clases_names = {"4,5,6": "Primary", "10,11": "Secondary", "6,7,8": "Middle School" }.update({i:i for i in range(1,13)})
-        dct = {i:0 for i in range(1,13)}
-        for tple in class_tuples:
-            student_class = tple[0]
-            student_count = tple[1]
-            if student_count < 5 : # 5 is arbitrary here. Change it as per the requirements. 
-                # ignore if count of student from this class is less than 5
-                continue
-            try:
-                st_class = int(float(student_class))
-            except:
-                st_class = student_class
-            dct[st_class] = (dct[st_class] + student_count) if st_class in dct else student_count
-        return map(list, zip(*(dct.items())))
-
-
-    def getQuestionFormatStats(self):
-        distinct = Question.objects.values('question_format').annotate(count=Count('question_format'))
-        format_tuples = sorted([(tple['question_format'] if tple['question_format'] else "Other", tple['count']) for tple in distinct], key = lambda item : item[0])
-        return map(list, zip(*format_tuples))
-
-    def getCurriculumStats(self):
-        distinct = Question.objects.values('curriculum_followed').annotate(count=Count('curriculum_followed'))
-        curriculum_tuples = sorted([(tple['curriculum_followed'] if tple['curriculum_followed'] else "Other", tple['count']) for tple in distinct], key = lambda item : item[0])
-        return map(list, zip(*curriculum_tuples))
-
-    def getContextStats(self):
-        distinct = Question.objects.values('context').annotate(count=Count('context'))
-        context_tuples = sorted([
-                (tple['context'] 
-                if (tple['context'] and tple['context'] != "Other (elaborate in the Notes column)") 
-                else "Other", tple['count']) for tple in distinct],
-            key = lambda item : item[0])
-        return map(list, zip(*context_tuples))
-
-    def getMapStats(self):
-        distinct = Question.objects.values('state').annotate(count=Count('state'))    # place from where question is asked is in column state
-        states, codes, counts = list(), list(), list()
-        for stateCountPairDict in distinct:
-            state = stateCountPairDict['state']
-            if state.lower() not in self.state_code:
-                continue
-            states.append(state)
-            codes.append(self.state_code[state.lower()])
-            counts.append(stateCountPairDict['count'])
-        return states, codes, counts
-
-    def getCountryStats(self):
-        ###TODO: For World Map
-        pass
-
-    @staticmethod
-    def fix(lst, apply_ = False):
-        """
-        Method to convert the list into JSON list.
-        If apply_translation is True, then map _ function to all the string values
-        """
-        if apply_:
-            lst = list(map(_, lst))
-        return json.dumps(lst)
-        
 
 class Suggestions(View):
     def get(self, request):
-        lst_dir = os.path.abspath(os.path.join(os.path.dirname( __file__ ),"../assets/suggestions/")) 
-
-        if not os.path.exists(lst_dir):
-            os.makedirs(lst_dir)
-
-        f_path = os.path.abspath(os.path.join(lst_dir, 'suggestions.csv'))
+        """Return the questions that best match the typed search text"""
 
-        sugg_lst = []
+        text = request.GET.get('q', '').strip()
+        if len(text) < 2:
+            return JsonResponse({'suggestion': []})
 
-        if not os.path.isfile(f_path):
-            ques = Question.objects.all()
-            with open(f_path, 'w', newline='' , encoding='utf-8') as f:
-                writer = csv.writer(f, delimiter=',')
-                for i in ques:
-                    if not i.question_text_english == "":
-                        sugg_lst.append(i.question_text_english)
-                        writer.writerow([i.question_text_english])
+        # memcached keys cannot contain spaces or non-ASCII characters
+        cache_key = 'suggestions_' + hashlib.md5(text.lower().encode('utf-8')).hexdigest()
+        suggestions = cache.get(cache_key)
+        if suggestions is None:
+            suggestions = autocomplete(text)
+            cache.set(cache_key, suggestions, 60 * 10)
 
-            return JsonResponse({"suggestion": sugg_lst})
-        else:
-            modTimestamp = os.path.getmtime(os.path.abspath(os.path.join(lst_dir, 'suggestions.csv')))
-            modificationTime = ts.fromtimestamp(modTimestamp)             
-            current_time = datetime.datetime.now() 
-
-            if (current_time - modificationTime) > timedelta(1): 
-                ques = Question.objects.all()
-                with open(f_path, 'w', newline='' , encoding='utf-8') as f:
-                    writer = csv.writer(f, delimiter=',')
-                    for i in ques:
-                        if not i.question_text_english == "":
-                            sugg_lst.append(i.question_text_english)
-                            writer.writerow([i.question_text_english])
-
-                return JsonResponse({"suggestion": sugg_lst})
-            else:
-                with open(f_path, 'r',encoding='utf-8') as f:
-                    reader = csv.reader(f)
-                    for i in reader:
-                        sugg_lst.append(''.join(i))
-                return JsonResponse({"suggestion": sugg_lst})
\ No newline at end of file
+        return JsonResponse({'suggestion': suggestions})
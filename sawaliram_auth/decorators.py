@@ -18,7 +18,7 @@ def permission_required(group_name):
     def _permission_required(function):
         @wraps(function)
         def wrap(request, *args, **kwargs):
-            if request.user.groups.filter(name=group_name).exists():
+            if request.user.is_authenticated and request.user.has_group(group_name):
                 return function(request, *args, **kwargs)
             else:
                 return redirect('sawaliram_auth:request-access')
@@ -32,7 +32,7 @@ def permission_required(group_name):
 def volunteer_permission_required(function):
     @wraps(function)
     def wrap(request, *args, **kwargs):
-        if request.user.groups.filter(name='volunteers').exists():
+        if request.user.is_authenticated and request.user.has_group('volunteers'):
             return function(request, *args, **kwargs)
         else:
             return redirect('sawaliram_auth:request-access')
@@ -4,7 +4,8 @@ from django.contrib.auth.models import (
     BaseUserManager,
     AbstractBaseUser,
     PermissionsMixin)
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 
 
 class UserManager(BaseUserManager):
@@ -73,6 +74,37 @@ class User(AbstractBaseUser, PermissionsMixin):
         """
         return self.is_superuser
 
+    def get_group_names(self):
+        """
+        Return the names of the user's groups. They are loaded once and
+        kept on the instance, i.e. for the rest of the request for
+        request.user, like the permission cache of Django's ModelBackend.
+        """
+        if not hasattr(self, '_group_names_cache'):
+            self._group_names_cache = frozenset(self.groups.values_list('name', flat=True))
+        return self._group_names_cache
+
+    def has_group(self, group_name):
+        """
+        Return whether the user belongs to the group with the given name
+        """
+        return group_name in self.get_group_names()
+
+    def get_notification_count(self):
+        """
+        Return the number of notifications of the user. It is kept in the
+        cache, and counted again after notifications are added or removed,
+        or at the latest after Notification.COUNT_CACHE_TIMEOUT.
+        """
+        count = cache.get(Notification.get_count_cache_key(self.id))
+        if count is None:
+            count = self.notifications.count()
+            cache.set(
+                Notification.get_count_cache_key(self.id),
+                count,
+                Notification.COUNT_CACHE_TIMEOUT)
+        return count
+
 
 class Profile(models.Model):
     """Define the data model for user profile"""
@@ -151,3 +183,31 @@ class Notification(models.Model):
         on_delete=models.CASCADE)
     created_on = models.DateTimeField(auto_now_add=True)
     updated_on = models.DateTimeField(auto_now=True)
+
+    # Seconds the notification count of a user is cached for, so that
+    # changes that don't clear it (e.g. queryset deletes) show up anyway
+    COUNT_CACHE_TIMEOUT = 60 * 10
+
+    @staticmethod
+    def get_count_cache_key(user_id):
+        return 'notification_count_{}'.format(user_id)
+
+    @classmethod
+    def clear_count_cache(cls, user_ids):
+        """
+        Recount the notifications of the given users on next use. The
+        counts are cleared once the current transaction commits, so that
+        they can't be counted again meanwhile from the old rows.
+        """
+        keys = [cls.get_count_cache_key(user_id) for user_id in user_ids]
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+    def save(self, *args, **kwargs):
+        super(Notification, self).save(*args, **kwargs)
+        Notification.clear_count_cache([self.user_id])
+
+    def delete(self, *args, **kwargs):
+        user_id = self.user_id
+        result = super(Notification, self).delete(*args, **kwargs)
+        Notification.clear_count_cache([user_id])
+        return result
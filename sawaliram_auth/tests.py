@@ -1,4 +1,6 @@
 from django.test import TestCase
+from django.contrib.auth.models import Group
+from django.core.cache import cache
 from sawaliram_auth.models import *
 
 class CreateSuperUserTest(TestCase):
@@ -15,3 +17,81 @@ class CreateSuperUserTest(TestCase):
         u.save()
 
         assert u.is_superuser
+
+
+class GroupMembershipTest(TestCase):
+    '''
+    Checks that group membership is looked up once per user instance
+    '''
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            first_name='Hugin',
+            last_name='Hrafna',
+            organisation='Familiars of Odin',
+            email='hugin@hrafnaguo.god',
+            password='pass',
+        )
+        Group.objects.get_or_create(name='volunteers')[0].user_set.add(self.user)
+        Group.objects.get_or_create(name='admins')
+
+    def test_has_group(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(self.user.has_group('volunteers'))
+            self.assertFalse(self.user.has_group('admins'))
+            self.assertTrue(self.user.has_group('volunteers'))
+
+    def test_permission_required(self):
+        self.client.login(email='hugin@hrafnaguo.god', password='pass')
+
+        response = self.client.get('/dashboard/answer-questions', secure=True)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/dashboard/manage-users', secure=True)
+        self.assertRedirects(response, '/users/request-access', fetch_redirect_response=False)
+
+
+class NotificationCountTest(TestCase):
+    '''
+    Checks that the notification count is cached and kept up to date
+    '''
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            first_name='Hugin',
+            last_name='Hrafna',
+            organisation='Familiars of Odin',
+            email='hugin@hrafnaguo.god',
+            password='pass',
+        )
+
+    def notify(self):
+        return Notification.objects.create(
+            notification_type='comment',
+            title_text='Munin left a comment on your answer',
+            description_text='On your answer',
+            target_url='/',
+            user=self.user)
+
+    def test_notification_count(self):
+        notification = self.notify()
+        self.notify()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.user.get_notification_count(), 2)
+            self.assertEqual(self.user.get_notification_count(), 2)
+
+        # counted again once the deletion is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            notification.delete()
+            self.assertEqual(self.user.get_notification_count(), 2)
+        self.assertEqual(self.user.get_notification_count(), 1)
+
+    def test_header(self):
+        self.notify()
+        self.client.login(email='hugin@hrafnaguo.god', password='pass')
+
+        response = self.client.get('/', secure=True)
+        self.assertEqual(response.context['notification_count'], 1)
+        self.assertContains(response, '<span class="notification-dot">1</span>')
@@ -208,7 +208,7 @@ class RequestAccess(View):
             )
             new_volunteer_request.save()
 
-        if request.user.groups.filter(name='volunteers').exists():
+        if request.user.has_group('volunteers'):
             messages.success(request, 'Your access request has been submitted!')
             return redirect('public_website:user-profile', user_id=request.user.id, active_tab='settings')
         else: